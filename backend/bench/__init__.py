@@ -0,0 +1,6 @@
+"""Benchmarks for the chart, quote and WebSocket paths, run offline.
+
+See ``python -m bench --help``. The providers are replaced by fakes with
+injectable latency (``bench.fixtures``), so no run touches Yahoo or Binance
+unless recording fixtures with ``python -m bench record``.
+"""
@@ -0,0 +1,108 @@
+"""Command line entry point: ``python -m bench`` from the backend directory.
+
+    python -m bench                          # every suite, compared to bench/baseline.json
+    python -m bench micro --sizes 1000,10000
+    python -m bench rest ws --latency 0.05 --jitter 0.02
+    python -m bench --save                   # make this run the new baseline
+    python -m bench record -o bench/recorded.json AAPL stocks BTC/USDT crypto
+
+Exits with status 1 when a case regressed past ``--tolerance``.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Never read or write the on-disk history, nor warm caches behind the cases' backs
+os.environ["CHARTBANK_HISTORY_DIR"] = ""
+os.environ["CHARTBANK_PREFETCH"] = "0"
+os.environ["CHARTBANK_WARMUP"] = "0"
+
+from bench import harness  # noqa: E402
+from bench.fixtures import fake_upstream, record  # noqa: E402
+
+DEFAULT_BASELINE = str(Path(__file__).resolve().parent / "baseline.json")
+
+SUITES = ("micro", "rest", "ws")
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["record"]:
+        return _record(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="python -m bench", description="ChartBank benchmarks")
+    parser.add_argument("suites", nargs="*", help="micro, rest and/or ws (default: all)")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="micro: series lengths")
+    parser.add_argument("--repeat", type=int, default=20, help="micro: timed calls per case")
+    parser.add_argument("--requests", type=int, default=1000, help="rest: requests per case")
+    parser.add_argument("--concurrency", type=int, default=50, help="rest: requests in flight")
+    parser.add_argument("--clients", type=int, default=200, help="ws: simulated clients")
+    parser.add_argument("--symbols", type=int, default=10, help="ws: symbols each client watches")
+    parser.add_argument("--tick", type=float, default=0.1, help="ws: seconds between updates")
+    parser.add_argument("--duration", type=float, default=5.0, help="ws: seconds per case")
+    parser.add_argument("--latency", type=float, default=0.0, help="injected upstream latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to (s)")
+    parser.add_argument("--recordings", help="replay upstream responses saved by 'record'")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep the providers' real rate limits (default: lifted)")
+    parser.add_argument("--memory", action="store_true",
+                        help="rest/ws: trace peak memory (slows the run; micro always traces)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=harness.DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+    suites = args.suites or SUITES
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    results = []
+    with fake_upstream(args.latency, args.jitter, recordings=args.recordings,
+                       rate_limits=args.rate_limits) as upstream:
+        if "micro" in suites:
+            from bench import micro
+            sizes = [int(n) for n in args.sizes.split(",")]
+            results += micro.run(sizes, args.repeat)
+        if "rest" in suites:
+            from bench import load
+            results += load.rest(args.requests, args.concurrency, args.memory)
+        if "ws" in suites:
+            from bench import load
+            results += load.websocket(upstream, args.clients, args.symbols, args.tick,
+                                      args.duration, args.memory)
+
+    print(harness.report(results))
+    if args.save:
+        harness.save(results, args.baseline)
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    regressions = harness.compare(results, harness.load(args.baseline), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        print("\n".join("  " + line for line in regressions))
+        return 1
+    print(f"\nno regressions against {args.baseline}")
+    return 0
+
+
+def _record(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench record",
+                                     description="save live upstream responses for replay")
+    parser.add_argument("pairs", nargs="+", help="SYMBOL MARKET [SYMBOL MARKET ...]")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--intervals", default="1m,5m,1h,1d")
+    args = parser.parse_args(argv)
+    if len(args.pairs) % 2:
+        parser.error("pairs come as SYMBOL MARKET")
+    pairs = [(market, symbol) for symbol, market in zip(args.pairs[::2], args.pairs[1::2])]
+    record(pairs, args.intervals.split(","), args.output)
+    print(f"recorded {len(pairs)} symbol(s) to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
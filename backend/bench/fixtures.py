@@ -0,0 +1,226 @@
+"""Offline stand-ins for the upstream providers.
+
+``fake_upstream()`` swaps ``yf.Ticker``/``yf.download`` and the ccxt
+``binance.exchange`` for fakes that answer from recorded responses (see
+``record``) or, for anything not recorded, from a deterministic synthetic
+random walk. Every fake call sleeps for the injected latency first, on the
+provider's pool thread like a real request would.
+
+Quotes tick on every call; the time each price was handed out is kept in
+``Upstream.sent`` so the WebSocket benchmarks can measure end-to-end
+delivery latency.
+"""
+
+import contextlib
+import json
+import random
+import threading
+import time
+import zlib
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from services import binance, providers, yahoo_finance
+from services.governor import Governor
+from services.resample import interval_seconds
+
+# Synthetic series length when a fake is asked for a full window
+DEFAULT_BARS = 1000
+
+# yfinance interval labels that differ from ours, for the bar spacing
+_YF_INTERVALS = {"1wk": "1w", "1mo": "1M"}
+
+
+def synthetic_bars(symbol: str, interval: str, count: int = DEFAULT_BARS,
+                   end: int | None = None) -> dict[str, np.ndarray]:
+    """A reproducible random walk per symbol: ``count`` bars ending at ``end``."""
+    step = interval_seconds(_YF_INTERVALS.get(interval, interval))
+    end = (int(time.time()) if end is None else end) // step * step
+    rng = np.random.default_rng(zlib.crc32(f"{symbol}|{interval}".encode()))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.005, count)) * close
+    return {
+        "time": np.arange(end - step * (count - 1), end + 1, step, dtype=np.int64),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(1_000, 1_000_000, count).astype(np.float64),
+    }
+
+
+class Upstream:
+    """Shared settings and bookkeeping of the fake providers."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 bars: int = DEFAULT_BARS, recordings: str | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bars = bars
+        self.recorded: dict = {"ohlcv": {}, "quotes": {}}
+        if recordings:
+            with open(recordings, encoding="utf-8") as f:
+                self.recorded = json.load(f)
+        self.calls = 0
+        self.sent: dict[tuple[str, float], float] = {}  # (symbol, price) -> perf_counter
+        self._ticks: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Stand in for the network round trip."""
+        with self._lock:
+            self.calls += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def columns(self, symbol: str, interval: str, since: int | None = None) -> dict:
+        recorded = self.recorded["ohlcv"].get(f"{symbol}|{interval}")
+        if recorded is not None:
+            cols = {k: np.asarray(v) for k, v in recorded.items()}
+        else:
+            cols = synthetic_bars(symbol, interval, self.bars)
+        if since is not None:
+            keep = cols["time"] >= since
+            cols = {k: v[keep] for k, v in cols.items()}
+        return cols
+
+    def quote(self, symbol: str) -> tuple[float, float]:
+        """(price, previous close): the recorded or synthetic price, one tick on."""
+        base = self.recorded["quotes"].get(symbol, {})
+        prev = base.get("prev_close") or float(synthetic_bars(symbol, "1d", 2)["close"][0])
+        with self._lock:
+            tick = self._ticks[symbol] = self._ticks.get(symbol, 0) + 1
+            price = round((base.get("price") or prev) + tick * 0.01, 6)
+            self.sent[(symbol, price)] = time.perf_counter()
+        return price, prev
+
+
+class FakeTicker:
+    """The parts of ``yf.Ticker`` the Yahoo provider uses."""
+
+    def __init__(self, upstream: Upstream, symbol: str):
+        self._upstream = upstream
+        self.symbol = symbol
+
+    def history(self, period: str | None = None, interval: str = "1d", start=None, **_) -> pd.DataFrame:
+        self._upstream.wait()
+        since = int(pd.Timestamp(start).timestamp()) if start is not None else None
+        return _frame(self._upstream.columns(self.symbol, interval, since))
+
+    @property
+    def info(self) -> dict:
+        self._upstream.wait()
+        price, prev = self._upstream.quote(self.symbol)
+        return {"currentPrice": price, "previousClose": prev, "shortName": self.symbol,
+                "dayHigh": price * 1.01, "dayLow": price * 0.99, "volume": 1_000_000}
+
+
+def _frame(cols: dict) -> pd.DataFrame:
+    index = pd.to_datetime(cols["time"], unit="s", utc=True)
+    return pd.DataFrame({
+        "Open": cols["open"], "High": cols["high"], "Low": cols["low"],
+        "Close": cols["close"], "Volume": cols["volume"],
+    }, index=index)
+
+
+class FakeExchange:
+    """The parts of ``ccxt.binance`` the Binance provider uses."""
+
+    def __init__(self, upstream: Upstream):
+        self._upstream = upstream
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = "1d", since: int | None = None,
+                    limit: int | None = None) -> list[list]:
+        self._upstream.wait()
+        cols = self._upstream.columns(symbol, timeframe, since // 1000 if since else None)
+        rows = np.column_stack([cols["time"] * 1000] + [cols[k] for k in
+                               ("open", "high", "low", "close", "volume")])
+        return rows[-limit:].tolist() if limit else rows.tolist()
+
+    def fetch_ticker(self, symbol: str) -> dict:
+        self._upstream.wait()
+        return self._ticker(symbol)
+
+    def fetch_tickers(self, symbols: list[str]) -> dict[str, dict]:
+        self._upstream.wait()
+        return {s: self._ticker(s) for s in symbols}
+
+    def load_markets(self) -> dict:
+        self._upstream.wait()
+        return {p["symbol"]: {"symbol": p["symbol"], "base": p["symbol"].split("/")[0],
+                              "active": True, "spot": True} for p in binance.POPULAR_PAIRS}
+
+    def _ticker(self, symbol: str) -> dict:
+        price, prev = self._upstream.quote(symbol)
+        return {"last": price, "previousClose": prev, "high": price * 1.01,
+                "low": price * 0.99, "baseVolume": 1000.0}
+
+
+def fake_download(upstream: Upstream):
+    """``yf.download`` for a multi-symbol daily quote batch."""
+    def download(symbols, period: str = "5d", interval: str = "1d", **_) -> pd.DataFrame:
+        upstream.wait()
+        frames = {}
+        for symbol in symbols:
+            price, prev = upstream.quote(symbol)
+            cols = upstream.columns(symbol, interval)
+            cols = {k: v[-2:].copy() for k, v in cols.items()}
+            cols["close"][:] = [prev, price]
+            frames[symbol] = _frame(cols)
+        return pd.concat(frames, axis=1)
+    return download
+
+
+@contextlib.contextmanager
+def fake_upstream(latency: float = 0.0, jitter: float = 0.0, bars: int = DEFAULT_BARS,
+                  recordings: str | None = None, rate_limits: bool = False) -> Iterator[Upstream]:
+    """Point both providers at the fakes for the duration of the block.
+
+    The governors' rate limits are lifted unless ``rate_limits`` is set, so
+    the benchmarks measure ChartBank rather than the pacing of real APIs.
+    """
+    upstream = Upstream(latency, jitter, bars, recordings)
+    yf = yahoo_finance.yfinance()
+    saved = (yf.Ticker, yf.download, binance.exchange,
+             {name: pool.governor for name, pool in providers.pools.items()})
+    yf.Ticker = lambda symbol, *a, **kw: FakeTicker(upstream, symbol)
+    yf.download = fake_download(upstream)
+    binance.exchange = FakeExchange(upstream)
+    if not rate_limits:
+        for name, pool in providers.pools.items():
+            pool.governor = Governor(name, rate=1e9, burst=1e9)
+    try:
+        yield upstream
+    finally:
+        yf.Ticker, yf.download, binance.exchange, governors = saved
+        for name, pool in providers.pools.items():
+            pool.governor = governors[name]
+
+
+def record(symbols: list[tuple[str, str]], intervals: list[str], path: str) -> None:
+    """Save live provider responses for (market, symbol) pairs to ``path``.
+
+    Hits the real Yahoo Finance and Binance APIs; replay the file with
+    ``fake_upstream(recordings=path)``.
+    """
+    from services import data_service
+
+    out: dict = {"ohlcv": {}, "quotes": {}}
+    for market, symbol in symbols:
+        provider = binance if market == "crypto" else yahoo_finance
+        for interval in intervals:
+            if interval not in provider.INTERVAL_MAP:
+                continue
+            bars = data_service._fetch_chart_data(symbol, market, interval)
+            out["ohlcv"][f"{symbol}|{provider.INTERVAL_MAP[interval]}"] = {
+                k: v.tolist() for k, v in bars.to_columns().items()
+            }
+        quote = data_service.get_quote(symbol, symbol, market)
+        if quote:
+            out["quotes"][symbol] = {"price": quote["price"], "prev_close": quote["prev_close"]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f)
@@ -0,0 +1,111 @@
+"""Timing, memory and baseline comparison for the benchmarks.
+
+Every case produces a ``Result``: per-operation latencies plus the wall
+time of the run, from which throughput and p50/p99 follow, and optionally
+the peak traced memory. Results are saved as JSON keyed by case name;
+``compare`` flags cases that got slower, leaner on throughput or heavier
+on memory than the baseline by more than a tolerance.
+"""
+
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+# Relative change against the baseline that counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Metric -> True when bigger is better
+METRICS = {"ops_per_s": True, "p50_ms": False, "p99_ms": False, "peak_kb": False}
+
+
+@dataclass
+class Result:
+    name: str
+    latencies: list[float] = field(default_factory=list)  # seconds per operation
+    elapsed: float = 0.0                                   # wall time of the run
+    peak_bytes: int | None = None
+
+    def summary(self) -> dict:
+        lat = np.asarray(self.latencies) * 1000
+        out = {
+            "ops": len(lat),
+            "ops_per_s": round(len(lat) / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(float(np.percentile(lat, 50)), 3) if len(lat) else 0.0,
+            "p99_ms": round(float(np.percentile(lat, 99)), 3) if len(lat) else 0.0,
+        }
+        if self.peak_bytes is not None:
+            out["peak_kb"] = round(self.peak_bytes / 1024, 1)
+        return out
+
+
+def measure(name: str, fn: Callable[[], object], repeat: int = 20, warmup: int = 2,
+            memory: bool = True) -> Result:
+    """Time ``fn`` ``repeat`` times, then trace one more call for its peak memory."""
+    for _ in range(warmup):
+        fn()
+    result = Result(name)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        result.latencies.append(time.perf_counter() - t)
+    result.elapsed = time.perf_counter() - start
+    if memory:
+        result.peak_bytes = traced_peak(fn)
+    return result
+
+
+def traced_peak(fn: Callable[[], object]) -> int:
+    """Peak bytes allocated while ``fn`` runs (its result included)."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+def report(results: list[Result]) -> str:
+    lines = [f"{'case':44} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak KB':>10}"]
+    for r in results:
+        s = r.summary()
+        peak = f"{s['peak_kb']:>10.1f}" if "peak_kb" in s else f"{'-':>10}"
+        lines.append(f"{r.name:44} {s['ops_per_s']:>10.1f} {s['p50_ms']:>9.3f} {s['p99_ms']:>9.3f} {peak}")
+    return "\n".join(lines)
+
+
+def save(results: list[Result], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({r.name: r.summary() for r in results}, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict[str, dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results: list[Result], baseline: dict[str, dict],
+            tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """One line per metric that regressed past ``tolerance``; cases or
+    metrics missing from either side are skipped."""
+    regressions = []
+    for r in results:
+        old = baseline.get(r.name)
+        if old is None:
+            continue
+        new = r.summary()
+        for metric, higher_is_better in METRICS.items():
+            if not old.get(metric) or metric not in new:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{r.name}: {metric} {old[metric]} -> {new[metric]} ({change:+.0%})"
+                )
+    return regressions
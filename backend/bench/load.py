@@ -0,0 +1,225 @@
+"""REST load and WebSocket fan-out benchmarks against the real app.
+
+Both run with the providers faked (see ``bench.fixtures``), so what is
+measured is ChartBank's own overhead on top of the injected upstream
+latency. REST requests go through an in-process ASGI transport; the
+WebSocket cases start uvicorn on a loopback port in a thread of its own and
+connect many clients to it from this thread's event loop.
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+import tracemalloc
+
+import httpx
+import orjson
+
+from bench.fixtures import Upstream
+from bench.harness import Result
+from services import data_service
+from services.cache import TTLCache
+from services.candle_store import CandleStore
+from services.market_hours import Session
+
+STOCKS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "JPM", "V", "WMT"]
+
+
+def fresh_caches() -> None:
+    """Start each case cold: empty chart and quote caches and candle store, no disk history."""
+    data_service.chart_cache = TTLCache()
+    data_service.quote_cache = TTLCache()
+    data_service.history_store = None
+    data_service.candle_store = CandleStore(data_service._fetch_chart_data)
+
+
+@contextlib.contextmanager
+def traced(result: Result, memory: bool):
+    if not memory:
+        yield
+        return
+    tracemalloc.start()
+    try:
+        yield
+        result.peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def _hammer(result: Result, request, total: int, concurrency: int) -> None:
+    """Issue ``total`` requests, ``concurrency`` at a time, timing each."""
+    queue = iter(range(total))
+
+    async def worker():
+        for i in queue:
+            t = time.perf_counter()
+            response = await request(i)
+            response.raise_for_status()
+            result.latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+
+
+def rest(requests: int = 1000, concurrency: int = 50, memory: bool = False) -> list[Result]:
+    from main import app
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            def chart(i):
+                return client.get(f"/api/stocks/chart/{STOCKS[i % len(STOCKS)]}",
+                                  params={"interval": "1d", "format": "columnar"})
+
+            def derived(i):
+                return client.get(f"/api/stocks/chart/{STOCKS[i % len(STOCKS)]}",
+                                  params={"interval": "4h", "limit": 500})
+
+            def quotes(i):
+                return client.post("/api/dashboard/quotes", json=[
+                    {"symbol": s, "name": s, "market": "stocks"} for s in STOCKS
+                ])
+
+            results = []
+            fresh_caches()
+            for name, request, total in (
+                ("rest.chart.cold", chart, len(STOCKS)),
+                ("rest.chart.warm", chart, requests),
+                ("rest.chart.derived", derived, requests),
+                ("rest.quotes", quotes, max(1, requests // 10)),
+            ):
+                result = Result(name)
+                with traced(result, memory):
+                    await _hammer(result, request, total, min(concurrency, total))
+                results.append(result)
+            return results
+
+    return asyncio.run(main())
+
+
+class Server:
+    """uvicorn serving the app on a free loopback port, in a background thread."""
+
+    def __init__(self):
+        import uvicorn
+        from main import app
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning",
+                                lifespan="off", ws_max_size=16 * 1024 * 1024)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def _client(url: str, hello: dict, on_message, done: asyncio.Event) -> None:
+    import websockets
+
+    async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+        await ws.send(orjson.dumps(hello).decode())
+        while not done.is_set():
+            try:
+                raw = await asyncio.wait_for(ws.recv(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            msg = orjson.loads(raw)
+            if msg.get("type") == "ping":
+                await ws.send('{"action":"pong"}')
+            else:
+                on_message(msg, time.perf_counter())
+
+
+async def _fan_out(name: str, url: str, clients: int, hello: dict, deliveries, duration: float,
+                   memory: bool) -> Result:
+    """Connect ``clients`` sockets and collect delivery latencies for ``duration``."""
+    result = Result(name)
+    done = asyncio.Event()
+
+    def on_message(msg, now):
+        result.latencies.extend(now - sent for sent in deliveries(msg))
+
+    with traced(result, memory):
+        tasks = [asyncio.create_task(_client(url, hello, on_message, done)) for _ in range(clients)]
+        start = time.perf_counter()
+        await asyncio.sleep(duration)
+        done.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+class TickSource:
+    """Chart source moving the forming bar every ``every`` seconds."""
+
+    def __init__(self, key, upstream: Upstream, every: float):
+        self.key = key
+        self.upstream = upstream
+        self.every = every
+
+    async def stream(self):
+        _, symbol, _ = self.key
+        start = int(time.time()) // 60 * 60
+        while True:
+            price, _ = self.upstream.quote(symbol)
+            yield {"time": start, "open": price, "high": price, "low": price,
+                   "close": price, "volume": 1.0}
+            await asyncio.sleep(self.every)
+
+
+def websocket(upstream: Upstream, clients: int = 200, symbols: int = 10, tick: float = 0.1,
+              duration: float = 5.0, memory: bool = False) -> list[Result]:
+    """Quote and chart fan-out: every client watches the same symbols."""
+    from ws.chart_feed import chart_hub
+    from ws.quote_hub import hub
+
+    watched = STOCKS[:symbols]
+    sent = upstream.sent
+
+    def quote_deliveries(msg):
+        for q in msg.get("quotes", ()):
+            t = sent.get((q["symbol"], q["price"]))
+            if t is not None:
+                yield t
+
+    def bar_deliveries(msg):
+        if msg.get("type") == "bar":
+            t = sent.get((msg["symbol"], msg["bar"]["close"]))
+            if t is not None:
+                yield t
+
+    saved = hub.interval, hub.session, chart_hub.source_factory
+    hub.interval = tick
+    # Measure fan-out, not the trading calendar: every market is open
+    hub.session = lambda symbol, market: Session(True, None)
+    chart_hub.source_factory = lambda key: TickSource(key, upstream, tick)
+    fresh_caches()
+    try:
+        with Server() as base:
+            async def main():
+                quotes = await _fan_out(
+                    "ws.quotes", base + "/ws/quotes", clients,
+                    {"symbols": [{"symbol": s, "name": s, "market": "stocks"} for s in watched]},
+                    quote_deliveries, duration, memory,
+                )
+                chart = await _fan_out(
+                    "ws.chart", base + "/ws/chart", clients,
+                    {"action": "subscribe", "symbol": watched[0], "market": "stocks",
+                     "interval": "1m", "limit": 500},
+                    bar_deliveries, duration, memory,
+                )
+                return [quotes, chart]
+
+            return asyncio.run(main())
+    finally:
+        hub.interval, hub.session, chart_hub.source_factory = saved
@@ -0,0 +1,61 @@
+"""Conversion, serialization and computation micro-benchmarks.
+
+Each case runs on synthetic series of every requested size, so the
+numbers show how the hot paths scale from a typical chart (1k bars) to the
+largest windows the API serves (100k).
+"""
+
+import numpy as np
+
+from bench.fixtures import _frame, synthetic_bars
+from bench.harness import Result, measure
+from models.bars import Bars
+from services.compare import compare_series
+from services.indicators import EMA, MACD, RSI
+from services.resample import resample
+from services.serialization import dump_chart
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+# Series in the comparison case
+COMPARE_SYMBOLS = 20
+
+
+def cases(n: int) -> dict:
+    """name -> zero-argument callable, for a series of ``n`` one-minute bars."""
+    cols = synthetic_bars("BENCH", "1m", n)
+    frame = _frame(cols)
+    candles = np.column_stack([cols["time"] * 1000] + [cols[k] for k in
+                              ("open", "high", "low", "close", "volume")]).tolist()
+    bars = Bars.from_dataframe(frame)
+    raw = bars.to_bytes()
+    ema, rsi, macd = EMA(20), RSI(14), MACD()
+    # Half the series stamped 30s late, so the join has to snap them onto the grid
+    peers = [bars] + [Bars(*(c + 30 * (i % 2) if k == "time" else c for k, c in
+                             synthetic_bars(f"PEER{i}", "1m", n).items()))
+                      for i in range(1, COMPARE_SYMBOLS)]
+    pairs = [("stocks", f"PEER{i}") for i in range(COMPARE_SYMBOLS)]
+    return {
+        "bars.from_dataframe": lambda: Bars.from_dataframe(frame),
+        "bars.from_candles": lambda: Bars.from_candles(candles),
+        "bars.to_rows": bars.to_rows,
+        "bars.to_bytes": bars.to_bytes,
+        "bars.from_bytes": lambda: Bars.from_bytes(raw),
+        "dump_chart.rows": lambda: dump_chart("BENCH", "stocks", "1m", bars, "rows"),
+        "dump_chart.columnar": lambda: dump_chart("BENCH", "stocks", "1m", bars, "columnar"),
+        "resample.1h": lambda: resample(bars, "1h", "epoch", 60),
+        "indicator.ema20": lambda: ema.compute(bars),
+        "indicator.rsi14": lambda: rsi.compute(bars),
+        "indicator.macd": lambda: macd.compute(bars),
+        f"compare.{COMPARE_SYMBOLS}": lambda: compare_series(pairs, peers, "1m"),
+    }
+
+
+def run(sizes=DEFAULT_SIZES, repeat: int = 20) -> list[Result]:
+    results = []
+    for n in sizes:
+        for name, fn in cases(n).items():
+            # Keep the big, slow cases from dominating the run time
+            reps = max(3, repeat * 1_000 // n) if n > 1_000 else repeat
+            results.append(measure(f"micro.{name}[{n}]", fn, repeat=reps))
+    return results
@@ -1,10 +1,50 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+
+from services import startup  # first, so the startup report covers every import below
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from routers import stocks, crypto, forex, futures, commodities, indices, dashboard
+startup.report.mark("import fastapi")
+
+from routers import (
+    stocks, crypto, forex, futures, commodities, indices, dashboard, indicators, metrics, charts,
+    compare, export,
+)
+from services.cache import chart_cache
+from services.compare import InvalidComparison
+from services.http_cache import body_cache
+from services.backend import backend
+from services.data_service import InvalidSymbolList, candle_store
+from services.export import InvalidExport
+from services.indicators import InvalidIndicator, indicator_cache
+from services.metrics import MetricsMiddleware
+from services import binance, prefetch
+from services.governor import UpstreamError
+from services.providers import pools
+from services.resample import InvalidInterval
 from ws.websocket import router as ws_router
 
-app = FastAPI(title="ChartBank API", version="0.1.0")
+startup.report.mark("import app")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the providers in the background: /api/health answers meanwhile
+    warm = asyncio.create_task(startup.start_warm_up(binance.client)) if startup.WARM_UP else None
+    if prefetch.ENABLED:
+        prefetch.prefetcher.start()
+    try:
+        yield
+    finally:
+        await prefetch.prefetcher.stop()
+        if warm is not None:
+            warm.cancel()
+
+
+app = FastAPI(title="ChartBank API", version="0.1.0", lifespan=lifespan)
 
 import os
 
@@ -20,6 +60,44 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Upstream failure reason -> status; anything else is 503
+UPSTREAM_STATUS = {"timeout": 504, "not_found": 404}
+
+
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    return JSONResponse(
+        status_code=UPSTREAM_STATUS.get(exc.reason, 503),
+        content={"detail": str(exc), "reason": exc.reason, "provider": exc.provider},
+    )
+
+
+@app.exception_handler(InvalidInterval)
+async def invalid_interval_handler(request: Request, exc: InvalidInterval):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidIndicator)
+async def invalid_indicator_handler(request: Request, exc: InvalidIndicator):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidComparison)
+async def invalid_comparison_handler(request: Request, exc: InvalidComparison):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidSymbolList)
+async def invalid_symbol_list_handler(request: Request, exc: InvalidSymbolList):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidExport)
+async def invalid_export_handler(request: Request, exc: InvalidExport):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 
 app.include_router(stocks.router, prefix="/api/stocks", tags=["stocks"])
 app.include_router(crypto.router, prefix="/api/crypto", tags=["crypto"])
@@ -28,9 +106,42 @@ app.include_router(futures.router, prefix="/api/futures", tags=["futures"])
 app.include_router(commodities.router, prefix="/api/commodities", tags=["commodities"])
 app.include_router(indices.router, prefix="/api/indices", tags=["indices"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(charts.router, prefix="/api/charts", tags=["charts"])
+app.include_router(compare.router, prefix="/api/compare", tags=["compare"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(indicators.router, prefix="/api/indicators", tags=["indicators"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 app.include_router(ws_router)
 
 
 @app.get("/api/health")
 async def health():
+    """Liveness: the server is up, whether or not the providers have loaded."""
     return {"status": "ok", "service": "ChartBank"}
+
+
+@app.get("/api/health/ready")
+async def ready():
+    """Readiness: 503 until the lifespan warm-up has loaded the providers, plus the
+    startup report (seconds per import and initialization step)."""
+    state = startup.report.stats()
+    return JSONResponse(
+        status_code=200 if state["ready"] else 503,
+        content={"status": "ready" if state["ready"] else "starting", "startup": state},
+    )
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss/coalesce counters for the shared chart cache, candle store, indicators and
+    encoded response bodies, cache warming progress, plus each upstream provider's rate
+    limit and breaker state."""
+    return {
+        **chart_cache.stats(),
+        "store": candle_store.stats(),
+        "indicators": indicator_cache.stats(),
+        "backend": backend.stats(),
+        "http": body_cache.stats(),
+        "prefetch": prefetch.prefetcher.stats(),
+        "upstream": {name: pool.governor.stats() for name, pool in pools.items()},
+    }
@@ -0,0 +1,128 @@
+"""Columnar OHLCV series backed by NumPy arrays.
+
+Providers convert upstream data straight into parallel arrays with
+vectorized rounding, so a multi-year series never materializes one Python
+object per bar until (and unless) a client asks for row-shaped JSON.
+"""
+
+import numpy as np
+
+FIELDS = ("time", "open", "high", "low", "close", "volume")
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+
+class Bars:
+    """Time-ordered OHLCV columns; ``time`` is Unix seconds (int64)."""
+
+    __slots__ = FIELDS
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = np.asarray(time, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    @classmethod
+    def empty(cls) -> "Bars":
+        return cls(*([] for _ in FIELDS))
+
+    @classmethod
+    def from_candles(cls, rows: list) -> "Bars":
+        """Build from ccxt-style rows ``[ms, open, high, low, close, volume]``."""
+        if not rows:
+            return cls.empty()
+        arr = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        return cls._rounded(
+            (arr[:, 0] // 1000).astype(np.int64),  # ms -> seconds
+            arr[:, 1], arr[:, 2], arr[:, 3], arr[:, 4], arr[:, 5],
+        )
+
+    @classmethod
+    def from_dataframe(cls, df) -> "Bars":
+        """Build from a yfinance history DataFrame (DatetimeIndex, OHLCV columns)."""
+        df = df.dropna(subset=["Close"])
+        if df.empty:
+            return cls.empty()
+        index = df.index
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        times = index.to_numpy().astype("datetime64[s]").astype(np.int64)
+        return cls._rounded(
+            times,
+            df["Open"].to_numpy(dtype=np.float64),
+            df["High"].to_numpy(dtype=np.float64),
+            df["Low"].to_numpy(dtype=np.float64),
+            df["Close"].to_numpy(dtype=np.float64),
+            np.nan_to_num(df["Volume"].to_numpy(dtype=np.float64)),
+        )
+
+    @classmethod
+    def _rounded(cls, time, open, high, low, close, volume) -> "Bars":
+        return cls(
+            time,
+            np.round(open, 6), np.round(high, 6), np.round(low, 6), np.round(close, 6),
+            np.round(volume, 2),
+        )
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __bool__(self) -> bool:
+        return len(self.time) > 0
+
+    def __getitem__(self, index: slice) -> "Bars":
+        return Bars(*(getattr(self, f)[index] for f in FIELDS))
+
+    @property
+    def last_time(self) -> int | None:
+        return int(self.time[-1]) if len(self.time) else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, f).nbytes for f in FIELDS)
+
+    def bounds(self, start: int | None = None, end: int | None = None,
+               limit: int | None = None) -> tuple[int, int]:
+        """Index range of bars with ``start <= time <= end``, newest ``limit`` kept."""
+        lo = 0 if start is None else int(np.searchsorted(self.time, start, side="left"))
+        hi = len(self.time) if end is None else int(np.searchsorted(self.time, end, side="right"))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return lo, max(lo, hi)
+
+    def concat(self, other: "Bars") -> "Bars":
+        return Bars(*(np.concatenate((getattr(self, f), getattr(other, f))) for f in FIELDS))
+
+    def merge(self, new: "Bars") -> "Bars":
+        """Append newer bars, replacing any overlap from the first new bar on."""
+        if not new:
+            return self
+        cut = int(np.searchsorted(self.time, new.time[0], side="left"))
+        return self[:cut].concat(new)
+
+    def bar(self, i: int) -> dict:
+        """One bar as a plain dict."""
+        return {f: getattr(self, f)[i].item() for f in FIELDS}
+
+    def to_rows(self) -> list[dict]:
+        """Row-shaped bars, matching the ``OHLCV`` model."""
+        cols = [getattr(self, f).tolist() for f in FIELDS]
+        return [dict(zip(FIELDS, row)) for row in zip(*cols)]
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form: the bar count, then each column's raw values."""
+        n = np.array([len(self)], dtype=np.int64).tobytes()
+        return n + b"".join(np.ascontiguousarray(getattr(self, f)).tobytes() for f in FIELDS)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Bars":
+        n = int(np.frombuffer(data, dtype=np.int64, count=1)[0])
+        time = np.frombuffer(data, dtype=np.int64, count=n, offset=8)
+        rest = np.frombuffer(data, dtype=np.float64, count=5 * n, offset=8 + 8 * n).reshape(5, n)
+        return cls(time.copy(), *rest.copy())
+
+    def to_columns(self) -> dict[str, np.ndarray]:
+        """Parallel contiguous arrays keyed by field name."""
+        return {f: np.ascontiguousarray(getattr(self, f)) for f in FIELDS}
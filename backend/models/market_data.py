@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional
 
 
 class OHLCV(BaseModel):
@@ -17,6 +17,31 @@ class ChartResponse(BaseModel):
     market: str
     interval: str
     data: List[OHLCV]
+    next_cursor: Optional[int] = None  # pass back as ?cursor= to page older bars
+    stale: Optional[bool] = None  # set when the upstream failed and older bars are served
+    reason: Optional[str] = None  # why: throttled, unavailable, timeout, circuit_open, ...
+
+
+class ChartColumns(BaseModel):
+    """Parallel bar arrays, one entry per bar."""
+    time: List[int]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: List[float]
+
+
+class ColumnarChartResponse(BaseModel):
+    """Chart payload for ``?format=columnar``."""
+    symbol: str
+    market: str
+    interval: str
+    format: Literal["columnar"]
+    columns: ChartColumns
+    next_cursor: Optional[int] = None
+    stale: Optional[bool] = None
+    reason: Optional[str] = None
 
 
 class SymbolInfo(BaseModel):
@@ -42,7 +67,46 @@ class QuoteData(BaseModel):
     low: float
     volume: float
     prev_close: float
+    # On WebSocket quotes: whether the market trades now, and when it reopens
+    market_state: Optional[Literal["open", "closed"]] = None
+    next_open: Optional[float] = None  # Unix s
+
+
+class MissingQuote(BaseModel):
+    """A requested symbol that got no quote."""
+    symbol: str
+    market: str
+    reason: str  # no_data, or the upstream failure: throttled, unavailable, ...
 
 
 class QuotesResponse(BaseModel):
     quotes: List[QuoteData]
+    missing: List[MissingQuote] = []
+
+
+MarketName = Literal["stocks", "crypto", "forex", "futures", "commodities", "indices"]
+
+
+class ChartSpec(BaseModel):
+    """One panel of a batch chart request; the same query as a chart route."""
+    model_config = ConfigDict(frozen=True, populate_by_name=True)
+
+    market: MarketName
+    symbol: str
+    interval: str = "1d"
+    from_: Optional[int] = Field(None, alias="from")  # oldest bar time (Unix s)
+    to: Optional[int] = None
+    limit: Optional[int] = Field(None, ge=1, le=50000)
+    cursor: Optional[int] = None
+    format: Literal["rows", "columnar"] = "rows"
+
+    @property
+    def end(self) -> Optional[int]:
+        """Newest bar time to serve: ``to``, and only bars before ``cursor``."""
+        if self.cursor is None:
+            return self.to
+        return self.cursor - 1 if self.to is None else min(self.to, self.cursor - 1)
+
+
+class ChartBatchRequest(BaseModel):
+    charts: List[ChartSpec] = Field(..., min_length=1, max_length=16)
@@ -0,0 +1,74 @@
+"""Query parameters and response building shared by the market chart routers."""
+
+from dataclasses import dataclass
+from typing import Union
+
+from fastapi import Query, Request, Response
+
+from models.market_data import ChartResponse, ColumnarChartResponse, SearchResult
+from services import http_cache
+from services.data_service import chart_status, get_chart_window
+from services.prefetch import prefetcher
+from services.serialization import dump_chart
+
+
+# Chart routes return pre-encoded bytes; document both wire shapes instead
+CHART_RESPONSES = {
+    200: {
+        "model": Union[ChartResponse, ColumnarChartResponse],
+        "description": "Row-shaped bars, or parallel arrays with ?format=columnar",
+    },
+}
+
+
+@dataclass
+class ChartRange:
+    """Requested slice of a chart series."""
+    start: int | None = None   # Unix seconds, inclusive
+    end: int | None = None     # Unix seconds, inclusive
+    limit: int | None = None   # keep only the newest N bars of the range
+
+
+def chart_range(
+    from_: int | None = Query(None, alias="from", description="Oldest bar time (Unix s)"),
+    to: int | None = Query(None, description="Newest bar time (Unix s)"),
+    limit: int | None = Query(None, ge=1, le=50000, description="Max bars, newest first"),
+    cursor: int | None = Query(None, description="next_cursor of a previous page: only older bars"),
+) -> ChartRange:
+    end = to
+    if cursor is not None:
+        end = cursor - 1 if end is None else min(end, cursor - 1)
+    return ChartRange(start=from_, end=end, limit=limit)
+
+
+async def chart_response(request: Request, symbol: str, market: str, interval: str,
+                         fmt: str, rng: ChartRange) -> Response:
+    """The chart as JSON, revalidated by ETag and cached per the market's session.
+
+    The ETag comes from the window itself, so a client whose copy is
+    current gets a 304 before anything is encoded.
+    """
+    bars, next_cursor = await get_chart_window(
+        symbol, market, interval, rng.start, rng.end, rng.limit
+    )
+    prefetcher.record_chart(symbol, market, interval)
+    status = chart_status(symbol, market, interval)
+    key = http_cache.chart_key(
+        bars, symbol, market, interval, fmt, rng.start, rng.end, rng.limit, next_cursor,
+        status.get("stale"),
+    )
+    return http_cache.cached_response(
+        request, key,
+        lambda: dump_chart(symbol, market, interval, bars, fmt, next_cursor=next_cursor, **status),
+        http_cache.chart_cache_control(symbol, market, interval, stale=bool(status.get("stale"))),
+        last_modified=None if status.get("stale") else http_cache.closed_since(symbol, market, bars),
+    )
+
+
+def symbols_response(request: Request, result: SearchResult, default: bool) -> Response:
+    """A /symbols listing with an ETag; the default lists are fixed, so cached longer."""
+    body = result.model_dump_json().encode()
+    age = http_cache.DEFAULT_SYMBOLS_AGE if default else http_cache.SEARCH_AGE
+    return http_cache.cached_response(
+        request, http_cache.body_key(body), lambda: body, f"public, max-age={age}",
+    )
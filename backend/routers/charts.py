@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from models.market_data import ChartBatchRequest
+from services.chart_batch import chart_batch
+
+router = APIRouter()
+
+
+@router.post("/batch", response_class=StreamingResponse, responses={
+    200: {
+        "content": {"application/x-ndjson": {}},
+        "description": "One JSON line per distinct chart, in completion order",
+    },
+})
+async def get_chart_batch(req: ChartBatchRequest):
+    """Load several charts concurrently and stream each as soon as it is ready.
+
+    Every line is a chart payload (as from the market chart routes, with
+    ``"type": "chart"``) or ``"type": "error"`` with ``detail``/``reason``.
+    Like those routes, a spec's ``format`` defaults to ``"rows"``.
+    Its ``panels`` lists the positions in ``charts`` it answers; identical
+    specs are loaded once and answered together.
+    """
+    async def lines():
+        async for body in chart_batch(req.charts):
+            yield body + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
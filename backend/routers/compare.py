@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query, Response
+from routers.chart_common import ChartRange, chart_range
+from services.compare import DEFAULT_WINDOW, compare, parse_symbols
+
+router = APIRouter()
+
+
+@router.get("", response_class=Response)
+async def get_comparison(
+    symbols: str = Query(..., description="market:symbol list, benchmark first, "
+                                          "e.g. crypto:BTC/USDT,indices:^GSPC,commodities:GC=F"),
+    interval: str = Query("1d"),
+    join: str = Query("outer", pattern="^(outer|inner)$",
+                      description="outer: every time any series has, forward-filled; "
+                                  "inner: only times all series share"),
+    window: int = Query(DEFAULT_WINDOW, ge=3, le=1000, description="Correlation window (bars)"),
+    rng: ChartRange = Depends(chart_range),
+):
+    """Several series aligned on one time grid, with comparison measures.
+
+    Returns ``time`` and, per symbol (in request order), ``close``,
+    ``percent`` (change since the window's first close) and
+    ``relative_strength`` (vs the first symbol, rebased to 100), plus the
+    ``correlation`` matrix of returns over the last ``window`` bars and each
+    symbol's ``rolling_correlation`` with the first. Missing values are null.
+    """
+    body = await compare(
+        parse_symbols(symbols), interval, join=join, start=rng.start, end=rng.end,
+        limit=rng.limit, window=window,
+    )
+    return Response(body, media_type="application/json")
@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Query
-from models.market_data import ChartResponse, SearchResult, SymbolInfo
-from services.data_service import get_chart_data, search, DEFAULT_SYMBOLS
+from fastapi import APIRouter, Depends, Query, Request, Response
+from models.market_data import SearchResult, SymbolInfo
+from routers.chart_common import (
+    CHART_RESPONSES, ChartRange, chart_range, chart_response, symbols_response,
+)
+from services.data_service import search_async, DEFAULT_SYMBOLS
 
 router = APIRouter()
 
 
-@router.get("/chart/{symbol:path}", response_model=ChartResponse)
-async def get_crypto_chart(symbol: str, interval: str = Query("1d")):
-    data = get_chart_data(symbol, "crypto", interval)
-    return ChartResponse(symbol=symbol, market="crypto", interval=interval, data=data)
+@router.get("/chart/{symbol:path}", response_class=Response, responses=CHART_RESPONSES)
+async def get_crypto_chart(
+    request: Request,
+    symbol: str,
+    interval: str = Query("1d"),
+    fmt: str = Query("rows", alias="format", pattern="^(rows|columnar)$"),
+    rng: ChartRange = Depends(chart_range),
+):
+    return await chart_response(request, symbol, "crypto", interval, fmt, rng)
 
 
 @router.get("/symbols", response_model=SearchResult)
-async def get_crypto_symbols(q: str = Query("")):
+async def get_crypto_symbols(request: Request, q: str = Query("")):
     if not q:
-        return SearchResult(results=[SymbolInfo(**s) for s in DEFAULT_SYMBOLS["crypto"]])
-    return SearchResult(results=search(q, "crypto"))
+        result = SearchResult(results=[SymbolInfo(**s) for s in DEFAULT_SYMBOLS["crypto"]])
+        return symbols_response(request, result, default=True)
+    result = SearchResult(results=await search_async(q, "crypto"))
+    return symbols_response(request, result, default=False)
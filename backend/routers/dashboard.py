@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Body
-from models.market_data import QuotesResponse, QuoteData
-from services.data_service import get_quotes, DEFAULT_SYMBOLS
+from services import metrics
+from models.market_data import MissingQuote, QuotesResponse, QuoteData
+from services.data_service import get_quotes_report, DEFAULT_SYMBOLS
+from services.prefetch import prefetcher
 
 router = APIRouter()
 
@@ -15,8 +17,8 @@ async def get_default_quotes(market: str = ""):
         for syms in DEFAULT_SYMBOLS.values():
             items.extend(syms[:3])  # top 3 per market
 
-    quotes = get_quotes(items)
-    return QuotesResponse(quotes=[QuoteData(**q) for q in quotes])
+    quotes, missing = await get_quotes_report(items)
+    return _quotes_response(quotes, missing)
 
 
 @router.post("/quotes", response_model=QuotesResponse)
@@ -24,5 +26,13 @@ async def get_custom_quotes(
     symbols: list[dict] = Body(..., example=[{"symbol": "AAPL", "name": "Apple", "market": "stocks"}])
 ):
     """Get quotes for a custom list of symbols."""
-    quotes = get_quotes(symbols)
-    return QuotesResponse(quotes=[QuoteData(**q) for q in quotes])
+    prefetcher.record_quotes(symbols)
+    quotes, missing = await get_quotes_report(symbols)
+    return _quotes_response(quotes, missing)
+
+
+def _quotes_response(quotes: list[dict], missing: list[dict]) -> QuotesResponse:
+    with metrics.VALIDATE_SECONDS.time(model="QuotesResponse"):
+        return QuotesResponse(
+            quotes=[QuoteData(**q) for q in quotes], missing=[MissingQuote(**m) for m in missing]
+        )
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from services.data_service import parse_symbol_list
+from services.export import FORMATS, MAX_SYMBOLS, check_format, export
+from services.resample import parse_interval
+
+router = APIRouter()
+
+
+@router.get("", response_class=StreamingResponse)
+async def get_export(
+    symbols: str = Query(..., description="market:symbol list, e.g. stocks:AAPL,crypto:BTC/USDT"),
+    interval: str = Query("1d"),
+    from_: int | None = Query(None, alias="from", description="Oldest bar time (Unix s)"),
+    to: int | None = Query(None, description="Newest bar time (Unix s)"),
+    format: str = Query("csv", description="csv, ndjson or arrow (Arrow IPC stream)"),
+):
+    """Every bar of the symbols in the range, streamed as a download.
+
+    Rows are ``market, symbol, time, open, high, low, close, volume``, one
+    symbol after another, oldest bar first. The history is read in chunks
+    from disk and cache, so exports of any size start at once and never sit
+    whole in memory.
+    """
+    pairs = parse_symbol_list(symbols, maximum=MAX_SYMBOLS)
+    parse_interval(interval)
+    check_format(format)
+    media_type, extension = FORMATS[format]
+    return StreamingResponse(
+        export(pairs, interval, format, from_, to),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="chartbank_{interval}.{extension}"'},
+    )
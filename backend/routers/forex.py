@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Query
-from models.market_data import ChartResponse, SearchResult, SymbolInfo
-from services.data_service import get_chart_data, search, DEFAULT_SYMBOLS
+from fastapi import APIRouter, Depends, Query, Request, Response
+from models.market_data import SearchResult, SymbolInfo
+from routers.chart_common import (
+    CHART_RESPONSES, ChartRange, chart_range, chart_response, symbols_response,
+)
+from services.data_service import search_async, DEFAULT_SYMBOLS
 
 router = APIRouter()
 
 
-@router.get("/chart/{symbol}", response_model=ChartResponse)
-async def get_forex_chart(symbol: str, interval: str = Query("1d")):
-    data = get_chart_data(symbol, "forex", interval)
-    return ChartResponse(symbol=symbol, market="forex", interval=interval, data=data)
+@router.get("/chart/{symbol}", response_class=Response, responses=CHART_RESPONSES)
+async def get_forex_chart(
+    request: Request,
+    symbol: str,
+    interval: str = Query("1d"),
+    fmt: str = Query("rows", alias="format", pattern="^(rows|columnar)$"),
+    rng: ChartRange = Depends(chart_range),
+):
+    return await chart_response(request, symbol, "forex", interval, fmt, rng)
 
 
 @router.get("/symbols", response_model=SearchResult)
-async def get_forex_symbols(q: str = Query("")):
+async def get_forex_symbols(request: Request, q: str = Query("")):
     if not q:
-        return SearchResult(results=[SymbolInfo(**s) for s in DEFAULT_SYMBOLS["forex"]])
-    return SearchResult(results=search(q, "forex"))
+        result = SearchResult(results=[SymbolInfo(**s) for s in DEFAULT_SYMBOLS["forex"]])
+        return symbols_response(request, result, default=True)
+    result = SearchResult(results=await search_async(q, "forex"))
+    return symbols_response(request, result, default=False)
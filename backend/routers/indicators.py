@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Path, Query, Response
+from routers.chart_common import ChartRange, chart_range
+from services.data_service import get_chart_data_async
+from services.indicators import dump_indicator, indicator_cache, parse_spec
+
+router = APIRouter()
+
+MARKETS = "^(stocks|crypto|forex|futures|commodities|indices)$"
+
+
+@router.get("/{market}/{symbol:path}", response_class=Response)
+async def get_indicator(
+    symbol: str,
+    market: str = Path(..., pattern=MARKETS),
+    interval: str = Query("1d"),
+    name: str = Query(..., description="sma, ema, rsi, macd, bbands or vwap"),
+    period: int | None = Query(None),
+    fast: int | None = Query(None),
+    slow: int | None = Query(None),
+    signal: int | None = Query(None),
+    k: float | None = Query(None),
+    rng: ChartRange = Depends(chart_range),
+):
+    """Indicator values over a chart series, computed once and shared by every viewer.
+
+    Returns ``time`` plus one array per output (``value``; MACD: ``macd``,
+    ``signal``, ``hist``; Bollinger: ``middle``, ``upper``, ``lower``),
+    with null where the indicator is still warming up.
+    """
+    params = {"period": period, "fast": fast, "slow": slow, "signal": signal, "k": k}
+    spec = parse_spec(name, {p: v for p, v in params.items() if v is not None})
+    bars = await get_chart_data_async(symbol, market, interval)
+    series = indicator_cache.synced((market, symbol, interval), spec, bars)
+    time, values = series.window(rng.start, rng.end, rng.limit)
+    return Response(dump_indicator((market, symbol, interval), series, time, values),
+                    media_type="application/json")
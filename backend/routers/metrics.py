@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Query, Response
+from services import metrics, profiler
+
+router = APIRouter()
+
+
+@router.get("", response_class=Response)
+async def get_metrics():
+    """Every metric in the Prometheus text exposition format."""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/profile", response_class=Response)
+async def get_profile(
+    seconds: float = Query(10.0, gt=0, le=profiler.MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """Sample every thread's stack for ``seconds`` and return collapsed stacks
+    (flamegraph.pl / speedscope input). Needs ``CHARTBANK_PROFILING=1``."""
+    if not profiler.ENABLED:
+        raise HTTPException(403, "profiling is disabled; set CHARTBANK_PROFILING=1")
+    try:
+        result = await profiler.profile(seconds, interval_ms / 1000)
+    except profiler.ProfilerBusy as exc:
+        raise HTTPException(409, str(exc))
+    return Response(
+        result.collapsed(), media_type="text/plain",
+        headers={"X-Profile-Samples": str(result.samples)},
+    )
@@ -0,0 +1,405 @@
+"""Cache and fan-out shared across API worker processes.
+
+With one worker everything lives in process (``InProcessBackend``). With
+``uvicorn --workers N``, point ``CHARTBANK_BACKEND`` at a broker
+(``tcp://host:port`` or ``unix:///path``, see ``services.broker``). Then:
+
+- chart series loaded by one worker are stored in the broker, and
+  concurrent misses across workers are single-flighted with a lease, so
+  each series is fetched upstream once rather than once per worker;
+- each live quote or candle stream is produced by whichever worker holds
+  its lease and published on a channel that every worker's subscribers
+  read, so pollers and exchange sockets don't multiply with workers.
+
+If the broker goes away, workers keep serving on their own (every lease is
+granted locally) and rejoin when it comes back.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from services.broker import read_frame, write_frame
+
+T = TypeVar("T")
+
+# Lease on a live stream: renewed every third of this while producing
+STREAM_LEASE_SECONDS = 15.0
+
+# How long a worker waits for another worker's in-flight load before loading itself
+LOAD_WAIT_SECONDS = 10.0
+LOAD_POLL_SECONDS = 0.05
+
+REQUEST_TIMEOUT = 2.0
+RECONNECT_SECONDS = 5.0
+
+
+class Subscription:
+    """Local queue of one channel's messages."""
+
+    def __init__(self, backend: "Backend", channel: str):
+        self.backend = backend
+        self.channel = channel
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue()
+
+    async def get(self) -> bytes:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.backend._unsubscribe(self)
+
+
+class Backend(ABC):
+    """Key/value store with TTLs, named leases and pub/sub channels."""
+
+    shared = False
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._subscriptions: dict[str, set[Subscription]] = {}
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def lease(self, name: str, ttl: float) -> bool:
+        """Take or renew the named lease; False while someone else holds it."""
+        ...
+
+    @abstractmethod
+    async def release(self, name: str) -> None:
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, data: bytes) -> None:
+        ...
+
+    def subscribe(self, channel: str) -> Subscription:
+        sub = Subscription(self, channel)
+        self._subscriptions.setdefault(channel, set()).add(sub)
+        return sub
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"kind": type(self).__name__, "channels": len(self._subscriptions)}
+
+    def _deliver(self, channel: str, data: bytes) -> None:
+        for sub in self._subscriptions.get(channel, ()):
+            sub.queue.put_nowait(data)
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subscriptions.get(sub.channel)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscriptions[sub.channel]
+
+
+class InProcessBackend(Backend):
+    """Single-process backend: plain dicts and local queues."""
+
+    def __init__(self):
+        super().__init__()
+        self._values: dict[str, tuple[float, bytes]] = {}
+        self._leases: dict[str, tuple[str, float]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._values.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._values.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values[key] = (time.monotonic() + ttl, value)
+
+    async def lease(self, name: str, ttl: float) -> bool:
+        now = time.monotonic()
+        holder = self._leases.get(name)
+        if holder is None or holder[1] <= now or holder[0] == self.owner:
+            self._leases[name] = (self.owner, now + ttl)
+            return True
+        return False
+
+    async def release(self, name: str) -> None:
+        holder = self._leases.get(name)
+        if holder is not None and holder[0] == self.owner:
+            del self._leases[name]
+
+    async def publish(self, channel: str, data: bytes) -> None:
+        self._deliver(channel, data)
+
+
+class BrokerBackend(Backend):
+    """Client of a ``services.broker`` process, shared by every worker."""
+
+    shared = True
+
+    def __init__(self, address: str):
+        super().__init__()
+        self.address = address
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._connect_lock: asyncio.Lock | None = None
+        self._retry_at = 0.0
+        self._tasks: set[asyncio.Task] = set()
+        self.disconnects = 0
+
+    async def get(self, key: str) -> bytes | None:
+        try:
+            header, body = await self._request({"op": "get", "key": key})
+        except ConnectionError:
+            return None
+        return body if header.get("found") else None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self._request({"op": "set", "key": key, "ttl": ttl}, value)
+        except ConnectionError:
+            pass
+
+    async def lease(self, name: str, ttl: float) -> bool:
+        try:
+            header, _ = await self._request(
+                {"op": "lease", "name": name, "owner": self.owner, "ttl": ttl}
+            )
+        except ConnectionError:
+            return True  # no broker: act alone
+        return bool(header.get("granted"))
+
+    async def release(self, name: str) -> None:
+        try:
+            await self._request({"op": "release", "name": name, "owner": self.owner})
+        except ConnectionError:
+            pass
+
+    async def publish(self, channel: str, data: bytes) -> None:
+        try:
+            # The broker echoes it back to our own subscription too
+            await self._request({"op": "publish", "channel": channel}, data)
+        except ConnectionError:
+            self._deliver(channel, data)
+
+    def subscribe(self, channel: str) -> Subscription:
+        first = channel not in self._subscriptions
+        sub = super().subscribe(channel)
+        if first:
+            self._background({"op": "subscribe", "channel": channel})
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        super()._unsubscribe(sub)
+        if sub.channel not in self._subscriptions:
+            self._background({"op": "unsubscribe", "channel": sub.channel})
+
+    async def close(self) -> None:
+        if self._read_task is not None:
+            self._read_task.cancel()
+        self._drop_connection()
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "address": self.address,
+            "connected": self._writer is not None,
+            "disconnects": self.disconnects,
+        }
+
+    def _background(self, header: dict) -> None:
+        async def send():
+            try:
+                await self._request(header)
+            except ConnectionError:
+                pass  # re-sent on reconnect
+        task = asyncio.ensure_future(send())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _request(self, header: dict, body: bytes = b"") -> tuple[dict, bytes]:
+        await self._connect()
+        self._next_id += 1
+        req_id = self._next_id
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        try:
+            if self._writer is None:
+                raise OSError("not connected")
+            write_frame(self._writer, {**header, "id": req_id}, body)
+            return await asyncio.wait_for(fut, REQUEST_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as exc:
+            self._drop_connection()
+            raise ConnectionError(f"broker {self.address}: {exc!r}") from None
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def _connect(self) -> None:
+        if self._writer is not None:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            if time.monotonic() < self._retry_at:
+                raise ConnectionError(f"broker {self.address} unavailable")
+            try:
+                if self.address.startswith("unix://"):
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_unix_connection(self.address[len("unix://"):]),
+                        REQUEST_TIMEOUT,
+                    )
+                else:
+                    host, _, port = self.address.removeprefix("tcp://").rpartition(":")
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, int(port)), REQUEST_TIMEOUT
+                    )
+            except (OSError, asyncio.TimeoutError) as exc:
+                self._retry_at = time.monotonic() + RECONNECT_SECONDS
+                raise ConnectionError(f"broker {self.address}: {exc!r}") from None
+            self._reader, self._writer = reader, writer
+            self._read_task = asyncio.create_task(self._read_loop(reader))
+            for channel in self._subscriptions:
+                write_frame(writer, {"op": "subscribe", "channel": channel, "id": 0})
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                header, body = await read_frame(reader)
+                if "channel" in header:
+                    self._deliver(header["channel"], body)
+                    continue
+                fut = self._pending.get(header.get("id"))
+                if fut is not None and not fut.done():
+                    fut.set_result((header, body))
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        if self._reader is reader:
+            self._drop_connection()
+
+    def _drop_connection(self) -> None:
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is None:
+            return
+        self.disconnects += 1
+        self._retry_at = time.monotonic() + RECONNECT_SECONDS
+        writer.close()
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"broker {self.address} disconnected"))
+
+
+def open_backend() -> Backend:
+    """Backend named by ``CHARTBANK_BACKEND`` (unset or ``memory``: in process)."""
+    address = os.getenv("CHARTBANK_BACKEND", "").strip()
+    if not address or address == "memory":
+        return InProcessBackend()
+    return BrokerBackend(address)
+
+
+async def load_shared(backend: Backend, key: str, ttl: float,
+                      loader: Callable[[], Awaitable[T]],
+                      encode: Callable[[T], bytes], decode: Callable[[bytes], T]) -> T:
+    """Value for ``key`` from the shared store, loaded by one worker on a miss.
+
+    A worker that finds another worker's load in flight waits for its
+    result (up to ``LOAD_WAIT_SECONDS``) instead of loading it again.
+    """
+    if not backend.shared:
+        return await loader()
+    data = await backend.get(key)
+    if data is not None:
+        return decode(data)
+    deadline = time.monotonic() + LOAD_WAIT_SECONDS
+    while True:
+        if await backend.lease("load:" + key, LOAD_WAIT_SECONDS):
+            try:
+                value = await loader()
+                if value:
+                    await backend.set(key, encode(value), ttl)
+                return value
+            finally:
+                await backend.release("load:" + key)
+        await asyncio.sleep(LOAD_POLL_SECONDS)
+        data = await backend.get(key)
+        if data is not None:
+            return decode(data)
+        if time.monotonic() > deadline:
+            return await loader()
+
+
+async def shared_stream(backend: Backend, channel: str,
+                        produce: Callable[[], AsyncIterator[T]],
+                        encode: Callable[[T], bytes],
+                        decode: Callable[[bytes], T]) -> AsyncIterator[T]:
+    """Items of a live stream that only one worker at a time produces.
+
+    Each worker subscribes to ``channel``; the worker holding the
+    channel's lease runs ``produce()`` and publishes its items. If that
+    worker stops, another takes the lease over. Errors from our own
+    producer are raised to the consumer, as from ``produce()`` directly.
+    """
+    if not backend.shared:
+        async for item in produce():
+            yield item
+        return
+
+    sub = backend.subscribe(channel)
+    producer = asyncio.create_task(_lead(backend, channel, produce, encode))
+    try:
+        while True:
+            get = asyncio.ensure_future(sub.get())
+            done, _ = await asyncio.wait({get, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if get in done:
+                yield decode(get.result())
+                continue
+            get.cancel()
+            producer.result()  # raises the producer's error
+            producer = asyncio.create_task(_lead(backend, channel, produce, encode))
+    finally:
+        producer.cancel()
+        sub.close()
+
+
+async def _lead(backend: Backend, channel: str, produce: Callable[[], AsyncIterator[T]],
+                encode: Callable[[T], bytes]) -> None:
+    """Wait for the channel's lease, then produce into it until the lease is lost."""
+    name = "stream:" + channel
+    while not await backend.lease(name, STREAM_LEASE_SECONDS):
+        await asyncio.sleep(STREAM_LEASE_SECONDS / 2)
+
+    async def publish_all():
+        async for item in produce():
+            await backend.publish(channel, encode(item))
+
+    async def keep_lease():
+        while True:
+            await asyncio.sleep(STREAM_LEASE_SECONDS / 3)
+            if not await backend.lease(name, STREAM_LEASE_SECONDS):
+                return
+
+    tasks = [asyncio.create_task(publish_all()), asyncio.create_task(keep_lease())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await backend.release(name)
+
+
+backend = open_backend()
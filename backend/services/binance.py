@@ -1,20 +1,37 @@
-"""Binance data service for crypto markets via ccxt."""
+"""Binance data service for crypto markets via ccxt.
 
-import ccxt
-from typing import List
-from models.market_data import OHLCV
+ccxt is imported, and the exchange client built, on the first call
+(``client()``), not when this module is imported.
+"""
 
-exchange = ccxt.binance({"enableRateLimit": True})
+import threading
+
+from models.bars import Bars
+from services import metrics, startup
+from services.governor import (
+    UpstreamError, UpstreamNotFound, UpstreamThrottled, UpstreamUnavailable,
+)
+from services.providers import governed
+
+# The ccxt.binance client; None until client() builds it
+exchange = None
+_client_lock = threading.Lock()
 
 # Interval mapping
 INTERVAL_MAP = {
     "1m": "1m",
+    "3m": "3m",
     "5m": "5m",
     "15m": "15m",
     "30m": "30m",
     "1h": "1h",
+    "2h": "2h",
     "4h": "4h",
+    "6h": "6h",
+    "8h": "8h",
+    "12h": "12h",
     "1d": "1d",
+    "3d": "3d",
     "1w": "1w",
     "1M": "1M",
 }
@@ -34,62 +51,128 @@ POPULAR_PAIRS = [
 ]
 
 
-def fetch_ohlcv(symbol: str, interval: str = "1d", limit: int = 500) -> List[OHLCV]:
-    """Fetch OHLCV data from Binance via ccxt."""
+def client():
+    """The exchange client, built on first use (the provider pool's threads share it)."""
+    global exchange
+    if exchange is None:
+        with _client_lock:
+            if exchange is None:
+                ccxt = startup.load("ccxt")
+                with startup.timed("init binance"):
+                    exchange = ccxt.binance({"enableRateLimit": True})
+    return exchange
+
+
+def upstream_error(exc: Exception) -> UpstreamError:
+    """Classify a ccxt exception (order matters: the throttling errors are NetworkErrors)."""
+    ccxt = startup.load("ccxt")
+    if isinstance(exc, (ccxt.RateLimitExceeded, ccxt.DDoSProtection)):
+        return UpstreamThrottled("binance", str(exc)[:200])
+    if isinstance(exc, ccxt.BadSymbol):
+        return UpstreamNotFound("binance", str(exc)[:200])
+    if isinstance(exc, (ccxt.NetworkError, ccxt.ExchangeNotAvailable)):
+        return UpstreamUnavailable("binance", str(exc)[:200])
+    return UpstreamError("binance", str(exc)[:200])
+
+
+@governed("binance")
+def fetch_ohlcv(
+    symbol: str, interval: str = "1d", limit: int = 500, since: int | None = None
+) -> Bars:
+    """Fetch OHLCV data from Binance via ccxt.
+
+    With ``since`` (Unix seconds) only bars opening at or after it are returned.
+    """
     timeframe = INTERVAL_MAP.get(interval, "1d")
 
     try:
-        raw = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-    except Exception:
-        return []
-
-    bars: List[OHLCV] = []
-    for candle in raw:
-        bars.append(OHLCV(
-            time=int(candle[0] / 1000),  # ms -> seconds
-            open=candle[1],
-            high=candle[2],
-            low=candle[3],
-            close=candle[4],
-            volume=candle[5],
-        ))
+        raw = client().fetch_ohlcv(
+            symbol,
+            timeframe=timeframe,
+            since=since * 1000 if since is not None else None,
+            limit=limit,
+        )
+    except Exception as exc:
+        raise upstream_error(exc) from exc
+
+    with metrics.CONVERT_SECONDS.time(provider="binance"):
+        bars = Bars.from_candles(raw)
+    metrics.BARS_CONVERTED.inc(len(bars), provider="binance")
     return bars
 
 
+def _ticker_to_quote(ticker: dict, symbol: str, name: str = "") -> dict:
+    """Convert a ccxt ticker into our quote dict."""
+    price = ticker.get("last", 0)
+    prev = ticker.get("previousClose") or (price - (ticker.get("change") or 0))
+    change = ticker.get("change") or round(price - prev, 6)
+    pct = ticker.get("percentage") or (round((change / prev) * 100, 2) if prev else 0)
+    return {
+        "symbol": symbol,
+        "name": name or symbol,
+        "market": "crypto",
+        "price": round(price, 6),
+        "change": round(change, 6),
+        "change_percent": round(pct, 2),
+        "high": round(ticker.get("high", 0), 6),
+        "low": round(ticker.get("low", 0), 6),
+        "volume": round(ticker.get("baseVolume", 0), 2),
+        "prev_close": round(prev, 6),
+    }
+
+
+@governed("binance")
 def fetch_quote(symbol: str, name: str = "") -> dict | None:
     """Fetch current quote for a Binance crypto pair."""
     try:
-        ticker = exchange.fetch_ticker(symbol)
-        price = ticker.get("last", 0)
-        prev = ticker.get("previousClose") or (price - (ticker.get("change") or 0))
-        change = ticker.get("change") or round(price - prev, 6)
-        pct = ticker.get("percentage") or (round((change / prev) * 100, 2) if prev else 0)
-        return {
-            "symbol": symbol,
-            "name": name or symbol,
+        ticker = client().fetch_ticker(symbol)
+    except Exception as exc:
+        raise upstream_error(exc) from exc
+    try:
+        return _ticker_to_quote(ticker, symbol, name)
+    except Exception:
+        return None  # incomplete ticker
+
+
+@governed("binance")
+def fetch_quotes(items: list[dict]) -> dict[str, dict]:
+    """Fetch quotes for many pairs with a single fetch_tickers call.
+
+    Returns {symbol: quote}; pairs missing from the response are left out.
+    """
+    symbols = [item["symbol"] for item in items]
+    try:
+        tickers = client().fetch_tickers(symbols)
+    except Exception as exc:
+        raise upstream_error(exc) from exc
+
+    quotes: dict[str, dict] = {}
+    for item in items:
+        ticker = tickers.get(item["symbol"])
+        if not ticker:
+            continue
+        try:
+            quotes[item["symbol"]] = _ticker_to_quote(ticker, item["symbol"], item.get("name", ""))
+        except Exception:
+            continue
+    return quotes
+
+
+@governed("binance")
+def list_markets() -> list[dict]:
+    """All active Binance spot pairs; pairs without a known name use the base asset."""
+    names = {p["symbol"]: p["name"] for p in POPULAR_PAIRS}
+    try:
+        markets = client().load_markets()
+    except Exception as exc:
+        raise upstream_error(exc) from exc
+    return [
+        {
+            "symbol": m["symbol"],
+            "name": names.get(m["symbol"], m["base"]),
             "market": "crypto",
-            "price": round(price, 6),
-            "change": round(change, 6),
-            "change_percent": round(pct, 2),
-            "high": round(ticker.get("high", 0), 6),
-            "low": round(ticker.get("low", 0), 6),
-            "volume": round(ticker.get("baseVolume", 0), 2),
-            "prev_close": round(prev, 6),
+            "exchange": "Binance",
         }
-    except Exception:
-        return None
-
-
-def search_symbols(query: str) -> list:
-    """Search crypto trading pairs on Binance."""
-    query_upper = query.upper()
-    results = []
-    for pair in POPULAR_PAIRS:
-        if query_upper in pair["symbol"] or query_upper in pair["name"].upper():
-            results.append({
-                "symbol": pair["symbol"],
-                "name": pair["name"],
-                "market": "crypto",
-                "exchange": "Binance",
-            })
-    return results
+        for m in markets.values()
+        if m.get("spot") and m.get("active") is not False
+    ]
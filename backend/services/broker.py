@@ -0,0 +1,177 @@
+"""Small shared-state broker so several API workers act as one.
+
+One broker process serves every worker over TCP (or a Unix socket). It keeps
+a key/value store with TTLs, named leases (one holder at a time, expiring
+unless renewed) and pub/sub channels. Workers use it through
+``services.backend.BrokerBackend``; see that module for what is shared.
+
+Run it next to the workers:
+
+    python -m services.broker --port 7390
+    CHARTBANK_BACKEND=tcp://127.0.0.1:7390 uvicorn main:app --workers 4
+
+Wire format: every frame is ``!II`` (header length, body length), an orjson
+header and an opaque body. Requests carry an ``id`` that the reply echoes;
+channel messages carry ``channel`` instead.
+"""
+
+import argparse
+import asyncio
+import struct
+import time
+
+import orjson
+
+_HEAD = struct.Struct("!II")
+
+DEFAULT_PORT = 7390
+
+# How often expired values are swept out
+SWEEP_SECONDS = 60.0
+
+# A subscriber with this much unsent channel data is disconnected
+MAX_SUBSCRIBER_BUFFER = 16 * 1024 * 1024
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[dict, bytes]:
+    head_len, body_len = _HEAD.unpack(await reader.readexactly(_HEAD.size))
+    header = orjson.loads(await reader.readexactly(head_len))
+    body = await reader.readexactly(body_len) if body_len else b""
+    return header, body
+
+
+def write_frame(writer: asyncio.StreamWriter, header: dict, body: bytes = b"") -> None:
+    head = orjson.dumps(header)
+    writer.write(_HEAD.pack(len(head), len(body)) + head + body)
+
+
+class Broker:
+    """The broker's state and request handling, one coroutine per client."""
+
+    def __init__(self):
+        self._values: dict[str, tuple[float, bytes]] = {}   # key -> (expires_at, value)
+        self._leases: dict[str, tuple[str, float]] = {}     # name -> (owner, expires_at)
+        self._channels: dict[str, set[asyncio.StreamWriter]] = {}
+        self._next_sweep = 0.0
+        self.clients = 0
+        self.published = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.clients += 1
+        channels: set[str] = set()
+        try:
+            while True:
+                header, body = await read_frame(reader)
+                reply, out = self.dispatch(header, body, writer, channels)
+                write_frame(writer, {"id": header.get("id"), **reply}, out)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients -= 1
+            for channel in channels:
+                self._unsubscribe(channel, writer)
+            writer.close()
+
+    def dispatch(self, header: dict, body: bytes, writer: asyncio.StreamWriter,
+                 channels: set[str]) -> tuple[dict, bytes]:
+        op = header.get("op")
+        now = time.monotonic()
+        if op == "get":
+            entry = self._values.get(header["key"])
+            if entry is None or entry[0] <= now:
+                self._values.pop(header["key"], None)
+                return {"found": False}, b""
+            return {"found": True}, entry[1]
+        if op == "set":
+            self._values[header["key"]] = (now + header["ttl"], body)
+            self._expire(now)
+            return {}, b""
+        if op == "lease":
+            holder = self._leases.get(header["name"])
+            if holder is None or holder[1] <= now or holder[0] == header["owner"]:
+                self._leases[header["name"]] = (header["owner"], now + header["ttl"])
+                return {"granted": True}, b""
+            return {"granted": False}, b""
+        if op == "release":
+            holder = self._leases.get(header["name"])
+            if holder is not None and holder[0] == header["owner"]:
+                del self._leases[header["name"]]
+            return {}, b""
+        if op == "publish":
+            subscribers = self._channels.get(header["channel"], ())
+            for sub in list(subscribers):
+                if sub.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                    sub.close()  # it reconnects and resubscribes
+                    continue
+                write_frame(sub, {"channel": header["channel"]}, body)
+            self.published += 1
+            return {"receivers": len(subscribers)}, b""
+        if op == "subscribe":
+            self._channels.setdefault(header["channel"], set()).add(writer)
+            channels.add(header["channel"])
+            return {}, b""
+        if op == "unsubscribe":
+            self._unsubscribe(header["channel"], writer)
+            channels.discard(header["channel"])
+            return {}, b""
+        if op == "stats":
+            return {"stats": self.stats()}, b""
+        return {"error": f"unknown op {op!r}"}, b""
+
+    def stats(self) -> dict:
+        return {
+            "clients": self.clients,
+            "keys": len(self._values),
+            "leases": len(self._leases),
+            "channels": len(self._channels),
+            "published": self.published,
+        }
+
+    def _unsubscribe(self, channel: str, writer: asyncio.StreamWriter) -> None:
+        subs = self._channels.get(channel)
+        if subs is not None:
+            subs.discard(writer)
+            if not subs:
+                del self._channels[channel]
+
+    def _expire(self, now: float) -> None:
+        """Drop expired values and leases that were never read again."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + SWEEP_SECONDS
+        for key in [k for k, (exp, _) in self._values.items() if exp <= now]:
+            del self._values[key]
+        for name in [n for n, (_, exp) in self._leases.items() if exp <= now]:
+            del self._leases[name]
+
+
+async def start(host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                path: str | None = None) -> asyncio.AbstractServer:
+    """Start a broker on a TCP port, or on a Unix socket when ``path`` is given."""
+    broker = Broker()
+    if path:
+        server = await asyncio.start_unix_server(broker.handle, path)
+    else:
+        server = await asyncio.start_server(broker.handle, host, port)
+    server.broker = broker
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ChartBank shared cache/pub-sub broker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    args = parser.parse_args()
+
+    async def run():
+        server = await start(args.host, args.port, args.unix)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
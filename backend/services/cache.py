@@ -0,0 +1,199 @@
+"""Process-wide OHLCV cache with per-interval TTL, LRU eviction and single-flight loading."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Hashable
+
+# Seconds a cached series stays fresh, by chart interval
+TTL_MAP = {
+    "1m": 15,
+    "5m": 30,
+    "15m": 60,
+    "30m": 120,
+    "1h": 300,
+    "4h": 600,
+    "1d": 900,
+    "1w": 3600,
+    "1M": 3600,
+}
+
+DEFAULT_TTL = 60
+
+# Seconds a dashboard quote stays fresh while its market trades
+QUOTE_TTL = 10
+
+# Fallback size for values that don't report their own nbytes
+DEFAULT_ENTRY_BYTES = 1024
+
+
+def _size_of(value) -> int:
+    """Approximate memory footprint of a cached value in bytes."""
+    return getattr(value, "nbytes", DEFAULT_ENTRY_BYTES)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire according to their interval.
+
+    Concurrent misses for the same key share one in-flight load: the first
+    caller runs the loader, the others wait for its result.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, size, value)
+        self._inflight: dict[Hashable, Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """Return a fresh cached value, or None."""
+        with self._lock:
+            return self._lookup(key)
+
+    def get_or_load(self, key: Hashable, interval: str, loader: Callable):
+        """Return the cached value for key, loading it once on a miss."""
+        value, fut, owner = self._claim(key)
+        if value is not None:
+            return value
+        if not owner:
+            return fut.result()
+
+        try:
+            value = loader()
+        except BaseException as exc:
+            self._fail(key, fut, exc)
+            raise
+        self._finish(key, interval, fut, value)
+        return value
+
+    async def aget_or_load(self, key: Hashable, interval: str, loader: Callable[[], Awaitable]):
+        """Async variant of get_or_load; waiters don't occupy a thread.
+
+        The load runs in its own task, so cancelling the request that started
+        it doesn't fail the other requests waiting on the same key.
+        """
+        value, fut, owner = self._claim(key)
+        if value is not None:
+            return value
+        if owner:
+            task = asyncio.ensure_future(self._aload(key, interval, fut, loader))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await asyncio.wrap_future(fut)
+
+    def set(self, key: Hashable, interval: str, value, ttl: float | None = None) -> None:
+        """Store a value; ``ttl`` overrides the interval's lifetime."""
+        with self._lock:
+            self._store(key, interval, value, ttl)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _claim(self, key: Hashable):
+        """Return (value, future, owner): a hit, an in-flight load to wait on,
+        or a fresh future the caller must complete."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value, None, False
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return None, fut, False
+            self.misses += 1
+            fut = self._inflight[key] = Future()
+            # A running future can't be cancelled by one waiter going away
+            fut.set_running_or_notify_cancel()
+            return None, fut, True
+
+    async def _aload(self, key: Hashable, interval: str, fut: Future,
+                     loader: Callable[[], Awaitable]) -> None:
+        try:
+            value = await loader()
+        except BaseException as exc:
+            self._fail(key, fut, exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        self._finish(key, interval, fut, value)
+
+    def _finish(self, key: Hashable, interval: str, fut: Future, value) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            # Empty results usually mean an upstream hiccup; don't pin them
+            if value:
+                self._store(key, interval, value)
+        fut.set_result(value)
+
+    def _fail(self, key: Hashable, fut: Future, exc: BaseException) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        fut.set_exception(exc)
+
+    # -- internals (caller holds the lock) --
+
+    def _lookup(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _store(self, key: Hashable, interval: str, value, ttl: float | None = None) -> None:
+        self._discard(key)
+        size = _size_of(value)
+        if ttl is None:
+            ttl = TTL_MAP.get(interval, DEFAULT_TTL)
+        expires_at = time.monotonic() + ttl
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, old_size, _) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+            self.evictions += 1
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+chart_cache = TTLCache()
@@ -0,0 +1,175 @@
+"""Per-(market, symbol, interval) candle store that refreshes incrementally.
+
+A series is seeded once with the provider's full window; later refreshes only
+ask the upstream for bars from the last closed bar onward and merge them in,
+replacing the still-forming last bar. If that closed bar comes back changed
+(the provider re-adjusted its history), the series is re-seeded instead.
+Timeframes the provider doesn't serve are derived from a stored base series
+instead of fetched. With a history store attached, closed bars are persisted
+and a cold process starts from disk, fetching only the gap since the last
+stored bar.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+import numpy as np
+
+from models.bars import Bars
+from services.history_store import HistoryStore
+from services.resample import interval_seconds, update
+
+# Re-seed instead of advancing when the gap exceeds this many bars
+MAX_GAP_BARS = 500
+
+# Most bars loaded from the on-disk history when a series starts warm
+MAX_WARM_BARS = 5000
+
+SeriesKey = Tuple[str, str, str]
+
+# fetch(symbol, market, interval, since) -> bars; since=None means full window
+Fetcher = Callable[[str, str, str, int | None], Bars]
+
+
+class CandleStore:
+    """Keeps recent OHLCV series in memory and advances them with small fetches."""
+
+    def __init__(self, fetch: Fetcher, history: HistoryStore | None = None,
+                 max_series: int = 512):
+        self._fetch = fetch
+        self._history = history
+        self.max_series = max_series
+        self._series: OrderedDict[SeriesKey, Bars] = OrderedDict()
+        self._limits: dict[SeriesKey, int] = {}
+        self._locks: dict[SeriesKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.seeds = 0
+        self.warm_starts = 0
+        self.increments = 0
+        self.derivations = 0
+        self.readjustments = 0
+        self._rewrites: set[SeriesKey] = set()  # history files still to rewrite
+
+    def get(self, symbol: str, market: str, interval: str) -> Bars:
+        """Return the series for the key, refreshed up to the latest bar."""
+        key = (market, symbol, interval)
+        with self._key_lock(key):
+            bars = self._series.get(key)
+            if not bars:
+                bars = self._warm_start(key)
+            if bars and self._too_stale(bars, interval):
+                bars = Bars.empty()
+            rewrite = key in self._rewrites
+            if bars:
+                # Re-fetch the last closed bar too, to notice re-adjusted history
+                since = int(bars.time[-2]) if len(bars) > 1 else bars.last_time
+                fresh = self._fetch(symbol, market, interval, since)
+                if self._readjusted(bars, fresh, since):
+                    bars, rewrite = Bars.empty(), True
+                    self.readjustments += 1
+                    self._forget_derived(market, symbol)
+                else:
+                    bars = bars.merge(fresh)[-self._limits[key]:]
+                    self.increments += 1
+            if not bars:
+                bars = self._fetch(symbol, market, interval, None)
+                if not bars:
+                    return bars
+                self._limits[key] = len(bars)
+                self.seeds += 1
+            self._save(key, bars)
+            if self._history is not None:
+                if not rewrite:
+                    self._history.append(market, symbol, interval, bars)
+                elif self._history.replace(market, symbol, interval, bars):
+                    self._rewrites.discard(key)
+                else:
+                    self._rewrites.add(key)
+            return bars
+
+    def derive(self, symbol: str, market: str, interval: str, base: Bars,
+               base_interval: str, align: str) -> Bars:
+        """Return a timeframe built from ``base``, updating only its tail."""
+        key = (market, symbol, interval)
+        with self._key_lock(key):
+            bars = update(
+                self._series.get(key), base, interval, align, interval_seconds(base_interval)
+            )
+            self.derivations += 1
+            self._save(key, bars)
+            return bars
+
+    def peek(self, symbol: str, market: str, interval: str) -> Bars:
+        """Return the stored series without touching the upstream."""
+        with self._lock:
+            return self._series.get((market, symbol, interval)) or Bars.empty()
+
+    def last_known(self, symbol: str, market: str, interval: str) -> Bars:
+        """The newest bars we hold without the upstream: memory, else disk."""
+        bars = self.peek(symbol, market, interval)
+        if not bars and self._history is not None:
+            bars = self._history.read(market, symbol, interval, limit=MAX_WARM_BARS)
+        return bars
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "bars": sum(len(b) for b in self._series.values()),
+                "seeds": self.seeds,
+                "warm_starts": self.warm_starts,
+                "increments": self.increments,
+                "derivations": self.derivations,
+                "readjustments": self.readjustments,
+            }
+
+    def _warm_start(self, key: SeriesKey) -> Bars:
+        """Load the newest stored closed bars so only the gap is fetched."""
+        if self._history is None:
+            return Bars.empty()
+        market, symbol, interval = key
+        bars = self._history.read(market, symbol, interval, limit=MAX_WARM_BARS)
+        if bars:
+            self._limits[key] = max(len(bars), MAX_GAP_BARS)
+            self.warm_starts += 1
+        return bars
+
+    @staticmethod
+    def _readjusted(bars: Bars, fresh: Bars, since: int) -> bool:
+        """True if a closed bar came back with a different close.
+
+        Yahoo rescales the whole history after a split or dividend, so the
+        stored bars no longer join the fresh ones.
+        """
+        i = int(np.searchsorted(bars.time, since))
+        j = int(np.searchsorted(fresh.time, since))
+        if i >= len(bars) - 1 or j >= len(fresh) or fresh.time[j] != since:
+            return False
+        return not np.isclose(fresh.close[j], bars.close[i], rtol=1e-6, atol=0)
+
+    def _forget_derived(self, market: str, symbol: str) -> None:
+        """Drop the symbol's other series so derived ones are rebuilt in full."""
+        with self._lock:
+            for key in [k for k in self._series if k[:2] == (market, symbol)]:
+                del self._series[key]
+
+    def _too_stale(self, bars: Bars, interval: str) -> bool:
+        return time.time() - bars.last_time > interval_seconds(interval) * MAX_GAP_BARS
+
+    def _key_lock(self, key: SeriesKey) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _save(self, key: SeriesKey, bars: Bars) -> None:
+        with self._lock:
+            self._series[key] = bars
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                old_key, _ = self._series.popitem(last=False)
+                self._limits.pop(old_key, None)
+                self._locks.pop(old_key, None)
@@ -0,0 +1,65 @@
+"""Several chart windows in one request, each sent as soon as it is ready.
+
+A PanelGrid layout shows up to six charts at once. Batched, they cost one
+round-trip: the specs load concurrently (identical specs once, overlapping
+ones through the chart cache's single-flight loads), and each result is
+yielded the moment its load finishes, so one slow upstream doesn't hold
+back the other panels. Used by ``POST /api/charts/batch`` (NDJSON) and the
+``batch`` action of ``/ws/chart``.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+import orjson
+
+from models.market_data import ChartSpec
+from services.data_service import chart_status, get_chart_window
+from services.governor import UpstreamError
+from services.prefetch import prefetcher
+from services.resample import InvalidInterval
+from services.serialization import dump_chart
+
+
+async def chart_batch(specs: list[ChartSpec], **extra) -> AsyncIterator[bytes]:
+    """Encoded results in completion order, one per distinct spec.
+
+    Each payload is a ``chart`` (the chart route's body) or an ``error``,
+    with ``panels`` listing the positions in ``specs`` it answers. Extra
+    keyword arguments lead every payload.
+    """
+    panels: dict[ChartSpec, list[int]] = {}
+    for i, spec in enumerate(specs):
+        panels.setdefault(spec, []).append(i)
+    tasks = [asyncio.ensure_future(_load(spec, idx, extra)) for spec, idx in panels.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away mid-batch: stop waiting on the rest
+        for task in tasks:
+            task.cancel()
+
+
+async def _load(spec: ChartSpec, panels: list[int], extra: dict) -> bytes:
+    try:
+        bars, next_cursor = await get_chart_window(
+            spec.symbol, spec.market, spec.interval, spec.from_, spec.end, spec.limit
+        )
+    except (UpstreamError, InvalidInterval) as exc:
+        return orjson.dumps({
+            **extra,
+            "type": "error",
+            "panels": panels,
+            "symbol": spec.symbol,
+            "market": spec.market,
+            "interval": spec.interval,
+            "detail": str(exc),
+            "reason": getattr(exc, "reason", "invalid"),
+        })
+    prefetcher.record_chart(spec.symbol, spec.market, spec.interval)
+    return dump_chart(
+        spec.symbol, spec.market, spec.interval, bars, spec.format,
+        **extra, type="chart", panels=panels, next_cursor=next_cursor,
+        **chart_status(spec.symbol, spec.market, spec.interval),
+    )
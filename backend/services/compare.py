@@ -0,0 +1,216 @@
+"""Aligned comparison of several instruments across markets.
+
+Series from different providers don't share timestamps. Binance stamps
+daily bars at UTC midnight, Yahoo at the exchange's local midnight, and
+intraday stock bars start at the session open. Each series' times are
+first snapped to a common grid: daily and longer bars go to their trade
+date, the same half-day shift resampling uses; intraday bars are floored
+to the interval. The series are then joined on the union of their grid
+points (``outer``, forward-filling each close) or on the points they all
+share (``inner``). Every step is a NumPy array operation over all series
+at once, with no per-bar Python loop.
+
+From the aligned closes come:
+
+- ``percent``: change since the window's first close, per series
+- ``relative_strength``: each series divided by the benchmark (the first
+  symbol), rebased to 100
+- ``correlation``: the pairwise correlation matrix of returns over the last
+  ``window`` grid points, and ``rolling_correlation`` of each series with
+  the benchmark
+
+Returns are only counted where a series has a bar of its own, so a stock's
+flat, forward-filled weekend doesn't read as zero returns against crypto.
+"""
+
+import asyncio
+
+import numpy as np
+import orjson
+
+from services import metrics
+from services.data_service import get_chart_data_async, parse_symbol_list
+from services.resample import DAY_SHIFT, interval_seconds
+
+DAY = 86400
+
+MAX_SYMBOLS = 50
+DEFAULT_WINDOW = 20
+JOINS = ("outer", "inner")
+
+
+class InvalidComparison(ValueError):
+    """Bad join or window."""
+
+
+def parse_symbols(text: str) -> list[tuple[str, str]]:
+    """The benchmark and the symbols compared with it, from ``market:symbol,...``."""
+    return parse_symbol_list(text, minimum=2, maximum=MAX_SYMBOLS)
+
+
+def snap(times: np.ndarray, interval: str) -> np.ndarray:
+    """Grid point of each bar time: trade date for daily+ bars, else floored to the interval."""
+    step = interval_seconds(interval)
+    if step >= DAY:
+        return (times + DAY_SHIFT) // DAY * DAY
+    return times // step * step
+
+
+def align(series: list[tuple[np.ndarray, np.ndarray]], join: str = "outer",
+          start: int | None = None, end: int | None = None,
+          limit: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Join ``(grid_times, values)`` series onto one time grid.
+
+    Returns ``(grid, values, own)``: ``values[t, i]`` is series i's last value
+    at or before ``grid[t]`` (NaN before it starts) and ``own[t, i]`` says
+    whether series i has a bar of its own at ``grid[t]``. Within a series the
+    last bar snapped to a grid point wins.
+    """
+    if join not in JOINS:
+        raise InvalidComparison(f"join must be one of {JOINS}")
+    if not series:
+        return np.empty(0, np.int64), np.empty((0, 0)), np.empty((0, 0), bool)
+    # Each series is sorted already: a stable (radix) sort of the lot, then dedupe
+    grid = np.sort(np.concatenate([t for t, _ in series]), kind="stable")
+    grid = grid[np.concatenate(([True], grid[1:] != grid[:-1]))] if len(grid) else grid
+    if join == "inner":
+        for t, _ in series:
+            grid = grid[np.isin(grid, t, assume_unique=False)]
+    lo = 0 if start is None else np.searchsorted(grid, start, "left")
+    hi = len(grid) if end is None else np.searchsorted(grid, end, "right")
+    if limit is not None:
+        lo = max(lo, hi - limit)
+    grid = grid[lo:hi]
+
+    values = np.full((len(grid), len(series)), np.nan)
+    own = np.zeros((len(grid), len(series)), bool)
+    for i, (t, v) in enumerate(series):
+        if not len(t):
+            continue
+        idx = np.searchsorted(t, grid, "right") - 1
+        found = idx >= 0
+        values[found, i] = v[idx[found]]
+        own[found, i] = t[idx[found]] == grid[found]
+    return grid, values, own
+
+
+def percent_change(values: np.ndarray) -> np.ndarray:
+    """Percent change of each column since its first value in the window."""
+    first = _first_valid(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (values / first - 1.0) * 100.0
+
+
+def relative_strength(values: np.ndarray, benchmark: int = 0) -> np.ndarray:
+    """Each column over the benchmark column, rebased to 100 at its first value."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = values / values[:, [benchmark]]
+        return ratio / _first_valid(ratio) * 100.0
+
+
+def returns(values: np.ndarray, own: np.ndarray) -> np.ndarray:
+    """Log return since the previous own bar, at each own bar; NaN elsewhere."""
+    out = np.full(values.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = np.log(values[1:] / values[:-1])
+    out[~own] = np.nan
+    out[~np.isfinite(out)] = np.nan  # no previous close, or a zero price
+    return out
+
+
+def correlation_matrix(r: np.ndarray) -> np.ndarray:
+    """Pairwise-complete Pearson correlation of the columns of ``r`` (NaN = missing)."""
+    valid = ~np.isnan(r)
+    m = valid.astype(np.float64)
+    x = np.where(valid, r, 0.0)
+    n = m.T @ m
+    sx = x.T @ m            # sx[i, j]: sum of x_i where both i and j have data
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n * sxy - sx * sx.T
+        var = (n * sxx - sx * sx) * (n * sxx.T - sx.T * sx.T)
+        corr = cov / np.sqrt(var)
+    corr[n < 3] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def rolling_correlation(r: np.ndarray, window: int, benchmark: int = 0) -> np.ndarray:
+    """Correlation of every column with the benchmark over a trailing ``window``."""
+    b = r[:, [benchmark]]
+    valid = ~np.isnan(r) & ~np.isnan(b)
+    x = np.where(valid, b, 0.0)
+    y = np.where(valid, r, 0.0)
+
+    def rolling(a):
+        c = np.cumsum(a, axis=0)
+        sums = c[window - 1:].copy()
+        sums[1:] -= c[:-window]
+        return sums
+
+    out = np.full(r.shape, np.nan)
+    n = rolling(valid.astype(np.float64))
+    sx, sy = rolling(x), rolling(y)
+    sxx, syy, sxy = rolling(x * x), rolling(y * y), rolling(x * y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+    corr[n < 3] = np.nan
+    out[window - 1:] = np.clip(corr, -1.0, 1.0)
+    return out
+
+
+def _per_symbol(values: np.ndarray) -> np.ndarray:
+    """(time, symbol) columns as contiguous per-symbol rows, rounded for the wire."""
+    return np.ascontiguousarray(np.round(values, 4).T)
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    """Row vector of each column's first non-NaN value (NaN if none)."""
+    valid = ~np.isnan(values)
+    first = np.argmax(valid, axis=0)
+    out = values[first, np.arange(values.shape[1])]
+    out[~valid.any(axis=0)] = np.nan
+    return out
+
+
+def compare_series(pairs: list[tuple[str, str]], loaded: list, interval: str,
+                   join: str = "outer", start: int | None = None, end: int | None = None,
+                   limit: int | None = None, window: int = DEFAULT_WINDOW) -> bytes:
+    """Encode the comparison of already loaded Bars (first pair is the benchmark).
+
+    A window with no grid points (an inner join with a symbol that has no
+    bars, or a range before every series) gets empty arrays per symbol.
+    """
+    if window < 3:
+        raise InvalidComparison("window must be at least 3")
+    grid, closes, own = align(
+        [(snap(bars.time, interval), bars.close) for bars in loaded], join, start, end, limit,
+    )
+    r = returns(closes, own)
+    if len(grid):
+        percent, strength = percent_change(closes), relative_strength(closes)
+    else:  # nothing to rebase on
+        percent, strength = closes, closes
+    payload = {
+        "interval": interval,
+        "join": join,
+        "window": window,
+        "symbols": [{"market": m, "symbol": s} for m, s in pairs],
+        "time": grid,
+        # One array per symbol, in ``symbols`` order
+        "close": _per_symbol(closes),
+        "percent": _per_symbol(percent),
+        "relative_strength": _per_symbol(strength),
+        "correlation": np.round(correlation_matrix(r[-window:]), 4),
+        "rolling_correlation": _per_symbol(rolling_correlation(r, window)),
+    }
+    with metrics.SERIALIZE_SECONDS.time(kind="compare"):
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+async def compare(pairs: list[tuple[str, str]], interval: str = "1d", **options) -> bytes:
+    """Load every series through the chart cache (concurrently) and compare them."""
+    loaded = await asyncio.gather(
+        *(get_chart_data_async(symbol, market, interval) for market, symbol in pairs)
+    )
+    return compare_series(pairs, loaded, interval, **options)
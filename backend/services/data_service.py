@@ -1,29 +1,223 @@
 """Unified data service that routes to the correct market provider."""
 
+import asyncio
 from typing import List
-from models.market_data import OHLCV, SymbolInfo
-from services import yahoo_finance, binance
+from models.bars import Bars
+from models.market_data import SymbolInfo
+from services import market_hours, metrics, yahoo_finance, binance, providers
+from services.backend import backend, load_shared
+from services.cache import DEFAULT_TTL, QUOTE_TTL, TTL_MAP, TTLCache, chart_cache
+from services.candle_store import CandleStore
+from services.governor import UpstreamError, background
+from services.history_store import open_history_store
+from services.resample import base_interval, parse_interval
+from services.symbol_index import SymbolIndex
 
 
-def get_chart_data(symbol: str, market: str, interval: str = "1d") -> List[OHLCV]:
-    """Fetch chart data based on market type."""
+class InvalidSymbolList(ValueError):
+    """A market:symbol list that doesn't parse, or has too few or too many entries."""
+
+
+def parse_symbol_list(text: str, minimum: int = 1, maximum: int = 50) -> list[tuple[str, str]]:
+    """``"crypto:BTC/USDT,indices:^GSPC"`` -> ``[("crypto", "BTC/USDT"), ("indices", "^GSPC")]``,
+    duplicates dropped."""
+    pairs = []
+    for part in text.split(","):
+        market, sep, symbol = part.strip().partition(":")
+        if not sep or not symbol or market not in DEFAULT_SYMBOLS:
+            raise InvalidSymbolList(f"Expected market:symbol, got {part.strip()!r}")
+        if (market, symbol) not in pairs:
+            pairs.append((market, symbol))
+    if len(pairs) < minimum:
+        raise InvalidSymbolList(f"Give at least {minimum} symbols")
+    if len(pairs) > maximum:
+        raise InvalidSymbolList(f"At most {maximum} symbols")
+    return pairs
+
+
+def get_chart_data(symbol: str, market: str, interval: str = "1d") -> Bars:
+    """Fetch chart data based on market type, served from the shared cache."""
+    parse_interval(interval)
+    return chart_cache.get_or_load(
+        (market, symbol, interval),
+        interval,
+        lambda: _load_chart_data(symbol, market, interval),
+    )
+
+
+async def get_chart_data_async(symbol: str, market: str, interval: str = "1d") -> Bars:
+    """Async get_chart_data: the upstream work runs on the provider's pool."""
+    parse_interval(interval)
+    return await chart_cache.aget_or_load(
+        (market, symbol, interval),
+        interval,
+        lambda: _aload_chart_data(symbol, market, interval),
+    )
+
+
+async def refresh_chart_data(symbol: str, market: str, interval: str = "1d",
+                             ttl: float | None = None) -> Bars:
+    """Pull the latest bars upstream regardless of TTL and re-seed the cache
+    (for ``ttl`` seconds if given, else the interval's TTL)."""
+    parse_interval(interval)
+    bars = await _aload_chart_data(symbol, market, interval, refresh=True)
+    if bars:
+        chart_cache.set((market, symbol, interval), interval, bars, ttl)
+    return bars
+
+
+async def get_chart_window(
+    symbol: str,
+    market: str,
+    interval: str = "1d",
+    start: int | None = None,
+    end: int | None = None,
+    limit: int | None = None,
+) -> tuple[Bars, int | None]:
+    """Bars with ``start <= time <= end`` (newest ``limit`` kept) plus a paging cursor.
+
+    Windows reaching past the in-memory series are completed from the on-disk
+    history. The cursor is the time of the oldest returned bar when older
+    bars exist (pass it back as ``end=cursor - 1``), otherwise None.
+    """
+    with metrics.CHART_LOAD_SECONDS.time(market=market):
+        bars = await get_chart_data_async(symbol, market, interval)
+    lo, hi = bars.bounds(start, end, limit)
+    if lo == 0 and history_store is not None:
+        need = None if limit is None else limit - (hi - lo)
+        first = int(bars.time[0]) if bars else None
+        if need is None or need > 0:
+            older_end = first - 1 if first is not None else end
+            if end is not None and older_end is not None:
+                older_end = min(older_end, end)
+            older = history_store.read(market, symbol, interval, start, older_end, need)
+            if older:
+                bars = older.concat(bars[lo:hi])
+                lo, hi = 0, len(bars)
+
+    window = bars[lo:hi]
+    has_more = lo > 0
+    if not has_more and window and history_store is not None:
+        stored = history_store.records(market, symbol, interval)["time"]
+        has_more = len(stored) > 0 and stored[0] < window.time[0]
+    return window, int(window.time[0]) if has_more else None
+
+
+def _load_chart_data(symbol: str, market: str, interval: str) -> Bars:
+    """Refresh a native series, or derive a timeframe from its cached base series."""
+    base = _base_interval(market, interval)
+    if base is None:
+        return candle_store.get(symbol, market, interval)
+    return candle_store.derive(
+        symbol, market, interval, get_chart_data(symbol, market, base), base, _align(market)
+    )
+
+
+async def _aload_chart_data(symbol: str, market: str, interval: str,
+                            refresh: bool = False) -> Bars:
+    """Async _load_chart_data.
+
+    The base series is resolved here rather than inside a pool thread, so a
+    derived load never blocks a provider worker waiting on another load.
+    """
+    base = _base_interval(market, interval)
+    if base is None:
+        return await _aload_native(symbol, market, interval, refresh)
+    if refresh:
+        base_bars = await refresh_chart_data(symbol, market, base)
+    else:
+        base_bars = await get_chart_data_async(symbol, market, base)
+    return await providers.run(
+        market, candle_store.derive, symbol, market, interval, base_bars, base, _align(market)
+    )
+
+
+async def _aload_native(symbol: str, market: str, interval: str, refresh: bool) -> Bars:
+    """A provider-native series, fetched by one worker and shared with the rest.
+
+    Only native series go through the shared backend; derived timeframes
+    are cheap to rebuild locally from their shared base. When the upstream
+    fails, the last bars we hold are served instead and the series is
+    marked stale (see ``chart_status``).
+    """
+    key = f"chart:{market}:{symbol}:{interval}"
+    ttl = TTL_MAP.get(interval, DEFAULT_TTL)
+
+    def load():
+        return providers.run(market, candle_store.get, symbol, market, interval)
+
+    try:
+        if refresh:
+            bars = await load()
+            if bars and backend.shared:
+                await backend.set(key, bars.to_bytes(), ttl)
+        else:
+            bars = await load_shared(backend, key, ttl, load, Bars.to_bytes, Bars.from_bytes)
+    except UpstreamError as exc:
+        bars = candle_store.last_known(symbol, market, interval)
+        if not bars:
+            raise
+        _status[(market, symbol, interval)] = {"stale": True, "reason": exc.reason}
+        metrics.STALE_SERVED.inc(market=market, reason=exc.reason)
+        return bars
+    _status.pop((market, symbol, interval), None)
+    return bars
+
+
+def chart_status(symbol: str, market: str, interval: str) -> dict:
+    """``{"stale": True, "reason": ...}`` while a series (or its base) is served
+    from old bars because the upstream failed; otherwise empty."""
+    status = _status.get((market, symbol, interval))
+    if status is None:
+        base = _base_interval(market, interval)
+        if base is not None:
+            status = _status.get((market, symbol, base))
+    return dict(status or {})
+
+
+def _base_interval(market: str, interval: str) -> str | None:
+    provider = binance if market == "crypto" else yahoo_finance
+    return base_interval(interval, list(provider.INTERVAL_MAP))
+
+
+def _align(market: str) -> str:
+    return "epoch" if market == "crypto" else "session"
+
+
+def _fetch_chart_data(
+    symbol: str, market: str, interval: str, since: int | None = None
+) -> Bars:
+    """Fetch chart data straight from the upstream provider."""
     if market == "crypto":
-        return binance.fetch_ohlcv(symbol, interval)
+        return binance.fetch_ohlcv(symbol, interval, since=since)
     else:
-        return yahoo_finance.fetch_ohlcv(symbol, interval)
+        return yahoo_finance.fetch_ohlcv(symbol, interval, start=since)
+
+
+history_store = open_history_store()
+candle_store = CandleStore(_fetch_chart_data, history_store)
 
 
 def search(query: str, market: str = "") -> List[SymbolInfo]:
-    """Search symbols across markets."""
-    results: list = []
+    """Search symbols across markets in the local symbol index."""
+    return [SymbolInfo(**r) for r in symbol_index.search(query, market)]
+
 
-    if market in ("", "crypto"):
-        results.extend(binance.search_symbols(query))
+async def search_async(query: str, market: str = "") -> List[SymbolInfo]:
+    """search(), first scheduling a refresh of the Binance market list when due."""
+    if market in ("", "crypto") and symbol_index.crypto_stale():
+        task = asyncio.create_task(_refresh_crypto_symbols())
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+    return search(query, market)
 
-    if market in ("", "stocks", "forex", "futures", "commodities", "indices"):
-        results.extend(yahoo_finance.search_symbols(query, market))
 
-    return [SymbolInfo(**r) for r in results]
+async def _refresh_crypto_symbols() -> None:
+    try:
+        with background():
+            await providers.run("crypto", symbol_index.refresh_crypto, binance.list_markets)
+    except UpstreamError:
+        pass  # the popular pairs keep answering; retried when next due
 
 
 def get_quote(symbol: str, name: str, market: str) -> dict | None:
@@ -34,16 +228,105 @@ def get_quote(symbol: str, name: str, market: str) -> dict | None:
         return yahoo_finance.fetch_quote(symbol, name, market)
 
 
-def get_quotes(items: list[dict]) -> list[dict]:
+async def get_quotes_async(items: list[dict]) -> list[dict]:
     """Fetch quotes for multiple symbols.
     Each item: {symbol, name, market}
+
+    Yahoo symbols go through one multi-symbol download and Binance pairs
+    through one fetch_tickers call; anything those miss is fetched one by one.
+    Every call runs on its provider's pool, so the batches and the
+    stragglers all proceed concurrently. Results keep the input order.
+    """
+    quotes, _ = await get_quotes_report(items)
+    return quotes
+
+
+async def get_quotes_report(items: list[dict]) -> tuple[list[dict], list[dict]]:
+    """get_quotes_async plus the items that got no quote and why:
+    ``[{symbol, market, reason}]``, reason ``no_data`` when the provider
+    answered without one, else the upstream failure's reason.
+
+    Quotes fetched in the last ``QUOTE_TTL`` seconds (or since the market
+    closed) are served from ``quote_cache``; only the rest go upstream.
     """
+    cached = {}
+    for item in items:
+        q = quote_cache.get((item["market"], item["symbol"]))
+        if q is not None:
+            cached[(item["market"], item["symbol"])] = q
+    fetched, unanswered = await refresh_quotes(
+        [item for item in items if (item["market"], item["symbol"]) not in cached]
+    )
+    found = {**cached, **{(q["market"], q["symbol"]): q for q in fetched}}
+    results = [found[key] for key in ((i["market"], i["symbol"]) for i in items) if key in found]
+    return results, unanswered
+
+
+async def refresh_quotes(items: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Fetch quotes upstream and re-seed ``quote_cache``; same result shape as
+    get_quotes_report."""
+    results, unanswered = await _fetch_quotes(items)
+    for q in results:
+        quote_cache.set((q["market"], q["symbol"]), "", q, quote_ttl(q["symbol"], q["market"]))
+    return results, unanswered
+
+
+def quote_ttl(symbol: str, market: str, now: float | None = None) -> float:
+    """QUOTE_TTL while the market trades; until it reopens (at most an hour) when closed."""
+    state = market_hours.session(symbol, market, now)
+    if state.is_open:
+        return QUOTE_TTL
+    until_open = state.seconds_to_change(now)
+    return CLOSED_QUOTE_TTL if until_open is None else max(QUOTE_TTL, min(until_open, CLOSED_QUOTE_TTL))
+
+
+async def _fetch_quotes(items: list[dict]) -> tuple[list[dict], list[dict]]:
+    if not items:
+        return [], []
+
+    crypto = [item for item in items if item["market"] == "crypto"]
+    yahoo = [item for item in items if item["market"] != "crypto"]
+    batches = []
+    if crypto:
+        batches.append(providers.run("crypto", binance.fetch_quotes, crypto))
+    if yahoo:
+        batches.append(providers.run("stocks", yahoo_finance.fetch_quotes, yahoo))
+
+    found: dict[tuple[str, str], dict] = {}
+    reasons: dict[tuple[str, str], str] = {}
+    for batch in await asyncio.gather(*batches, return_exceptions=True):
+        if isinstance(batch, BaseException):
+            continue
+        for q in batch.values():
+            found[(q["market"], q["symbol"])] = q
+
+    missing = [item for item in items if (item["market"], item["symbol"]) not in found]
+    singles = await asyncio.gather(
+        *(
+            providers.run(item["market"], get_quote, item["symbol"], item.get("name", ""), item["market"])
+            for item in missing
+        ),
+        return_exceptions=True,
+    )
+    for item, q in zip(missing, singles):
+        if isinstance(q, UpstreamError):
+            reasons[(item["market"], item["symbol"])] = q.reason
+        elif q and not isinstance(q, BaseException):
+            found[(item["market"], item["symbol"])] = q
+
     results: list[dict] = []
+    unanswered: list[dict] = []
     for item in items:
-        q = get_quote(item["symbol"], item.get("name", ""), item["market"])
+        q = found.get((item["market"], item["symbol"]))
         if q:
             results.append(q)
-    return results
+        else:
+            unanswered.append({
+                "symbol": item["symbol"],
+                "market": item["market"],
+                "reason": reasons.get((item["market"], item["symbol"]), "no_data"),
+            })
+    return results, unanswered
 
 
 # Default/popular symbols per market
@@ -92,3 +375,18 @@ DEFAULT_SYMBOLS = {
         {"symbol": "^FTSE", "name": "FTSE 100", "market": "indices"},
     ],
 }
+
+# (market, symbol) -> latest dashboard quote
+quote_cache = TTLCache()
+CLOSED_QUOTE_TTL = 3600
+
+# Searched locally; crypto starts with the popular pairs until Binance's
+# full market list has been loaded
+symbol_index = SymbolIndex()
+symbol_index.load_file()
+symbol_index.replace_market("crypto", DEFAULT_SYMBOLS["crypto"] + binance.POPULAR_PAIRS)
+symbol_index.set_popular(DEFAULT_SYMBOLS)
+_background: set[asyncio.Task] = set()
+
+# (market, symbol, interval) -> status of series served stale
+_status: dict[tuple[str, str, str], dict] = {}
@@ -0,0 +1,196 @@
+"""Bulk history export: many symbols over a time range, streamed.
+
+Each symbol's bars come from the on-disk history (``services.history_store``)
+for the years it holds and from the chart cache for the newest ones, the
+same split ``get_chart_window`` makes; an upstream call only happens when
+the cache is cold. Bars are encoded ``CHUNK_BARS`` at a time and each chunk
+is yielded as soon as it is encoded, one symbol after another. Stored bars
+are sliced straight out of the memory-mapped file, so the memory an export
+holds is one chunk plus the cached series being read, however many years
+and symbols it spans. The format's header goes out before any series loads.
+
+Formats:
+
+- ``csv``: one header row, then ``market,symbol,time,open,high,low,close,volume``
+- ``ndjson``: one JSON object per bar, with the same keys
+- ``arrow``: an Arrow IPC stream (``pyarrow.ipc.open_stream``), one record
+  batch per chunk, ``time`` as a UTC timestamp; needs the optional
+  ``pyarrow`` package
+
+A symbol whose upstream fails is exported from stored history alone, or
+skipped if there is none, rather than cutting the stream short.
+"""
+
+import csv
+import io
+from typing import AsyncIterator
+
+import numpy as np
+import orjson
+
+from models.bars import FIELDS, Bars
+from services import data_service, metrics
+from services.governor import UpstreamError
+from services.resample import InvalidInterval
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: csv and ndjson only
+    pa = None
+
+CHUNK_BARS = 5000
+MAX_SYMBOLS = 200
+
+COLUMNS = ("market", "symbol") + FIELDS
+
+# format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+class InvalidExport(ValueError):
+    """Unknown or unavailable export format."""
+
+
+def check_format(fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise InvalidExport(f"format must be one of {tuple(FORMATS)}")
+    if fmt == "arrow" and pa is None:
+        raise InvalidExport("Arrow export needs the pyarrow package (pip install pyarrow)")
+
+
+async def series_chunks(market: str, symbol: str, interval: str, start: int | None = None,
+                        end: int | None = None) -> AsyncIterator[Bars]:
+    """A symbol's bars in ``[start, end]``, oldest first, at most ``CHUNK_BARS`` per chunk."""
+    try:
+        cached = await data_service.get_chart_data_async(symbol, market, interval)
+    except (UpstreamError, InvalidInterval):
+        cached = Bars.empty()
+    store = data_service.history_store
+    if store is not None:
+        records = store.records(market, symbol, interval)
+        stored = Bars(*(records[f] for f in FIELDS))  # views into the mapped file
+        stored_end = end
+        if cached:
+            newest = int(cached.time[0]) - 1
+            stored_end = newest if end is None else min(end, newest)
+        lo, hi = stored.bounds(start, stored_end)
+        for i in range(lo, hi, CHUNK_BARS):
+            yield stored[i:min(i + CHUNK_BARS, hi)]
+    lo, hi = cached.bounds(start, end)
+    for i in range(lo, hi, CHUNK_BARS):
+        yield cached[i:min(i + CHUNK_BARS, hi)]
+
+
+async def export(pairs: list[tuple[str, str]], interval: str, fmt: str,
+                 start: int | None = None, end: int | None = None) -> AsyncIterator[bytes]:
+    """The encoded export, chunk by chunk (check the format first with ``check_format``)."""
+    encoder = _ENCODERS[fmt]()
+    head = encoder.header()
+    if head:
+        yield head
+    for market, symbol in pairs:
+        async for bars in series_chunks(market, symbol, interval, start, end):
+            yield encoder.chunk(market, symbol, bars)
+            metrics.EXPORT_BARS.inc(len(bars), format=fmt)
+    tail = encoder.footer()
+    if tail:
+        yield tail
+
+
+def _rows(bars: Bars) -> bytes:
+    """``[[time, open, ...], ...]`` for the chunk, encoded in one orjson call."""
+    return orjson.dumps(list(zip(*(getattr(bars, f).tolist() for f in FIELDS))))
+
+
+class CsvEncoder:
+    """Rows are orjson-encoded arrays with the brackets swapped for line breaks, which
+    is an order of magnitude faster than ``csv.writer``'s float formatting."""
+
+    def header(self) -> bytes:
+        return (",".join(COLUMNS) + "\n").encode()
+
+    def chunk(self, market: str, symbol: str, bars: Bars) -> bytes:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="").writerow((market, symbol, ""))  # quoted if needed
+        prefix = buf.getvalue().encode()
+        body = _rows(bars)[2:-2].replace(b"],[", b"\n" + prefix).replace(b"null", b"")
+        return prefix + body + b"\n"
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def chunk(self, market: str, symbol: str, bars: Bars) -> bytes:
+        columns = [getattr(bars, f).tolist() for f in FIELDS]
+        rows = [{"market": market, "symbol": symbol, **dict(zip(FIELDS, values))}
+                for values in zip(*columns)]
+        if "}" in symbol:
+            return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+        # One encode for the chunk: with no brace in the values, "},{" only separates rows
+        return orjson.dumps(rows)[1:-1].replace(b"},{", b"}\n{") + b"\n"
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class _Sink:
+    """File-like target for the IPC writer; each write is collected until taken."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+class ArrowEncoder:
+    def __init__(self):
+        self.schema = pa.schema(
+            [("market", pa.string()), ("symbol", pa.string()), ("time", pa.timestamp("s", tz="UTC"))]
+            + [(f, pa.float64()) for f in FIELDS[1:]]
+        )
+        self._sink = _Sink()
+        self._writer = pa.ipc.new_stream(pa.PythonFile(self._sink, mode="w"), self.schema)
+
+    def header(self) -> bytes:
+        return self._sink.take()  # the schema message
+
+    def chunk(self, market: str, symbol: str, bars: Bars) -> bytes:
+        n = len(bars)
+        batch = pa.record_batch(
+            [pa.array([market] * n, pa.string()), pa.array([symbol] * n, pa.string()),
+             pa.array(np.ascontiguousarray(bars.time), pa.timestamp("s", tz="UTC"))]
+            + [pa.array(np.ascontiguousarray(getattr(bars, f))) for f in FIELDS[1:]],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch)
+        return self._sink.take()
+
+    def footer(self) -> bytes:
+        self._writer.close()  # end-of-stream marker
+        return self._sink.take()
+
+
+_ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "arrow": ArrowEncoder}
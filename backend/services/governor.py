@@ -0,0 +1,272 @@
+"""Per-provider rate limiting, retries and circuit breaking for upstream calls.
+
+Every upstream call goes through its provider's ``Governor``:
+
+1. the circuit breaker fails it fast while the provider is unhealthy;
+2. a token bucket paces calls to the provider's sustainable rate, serving
+   waiting interactive calls (chart loads) before background ones (quote
+   polling, feed refreshes);
+3. the call runs; failures are classified (throttled, unavailable, not
+   found, ...) and transient ones are retried with jittered exponential
+   backoff, interactive calls only (a background poll simply comes again).
+
+Throttling trips the breaker at once, since hammering a provider that
+has asked us to slow down is how a throttle becomes a ban. Other transient
+failures trip it after ``FAILURE_THRESHOLD`` in a row. After a cooldown a
+single probe call is let through; its success closes the breaker.
+
+Governors run in the provider's pool threads, so they are thread-safe and
+block rather than await. The priority is taken from the ``priority``
+context variable, which the provider pools carry into their threads.
+"""
+
+import contextlib
+import contextvars
+import random
+import threading
+import time
+from typing import Callable, Iterator, TypeVar
+
+from services import metrics
+
+T = TypeVar("T")
+
+INTERACTIVE, BACKGROUND = 0, 1
+
+priority: contextvars.ContextVar[int] = contextvars.ContextVar("priority", default=INTERACTIVE)
+
+# Consecutive transient failures that open the breaker
+FAILURE_THRESHOLD = 5
+# First open period; doubles on every re-trip up to MAX_COOLDOWN
+COOLDOWN_SECONDS = 15.0
+MAX_COOLDOWN_SECONDS = 300.0
+
+# Retries for interactive calls, and the backoff's base and cap
+MAX_RETRIES = 2
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 4.0
+
+# Longest a call waits for a rate-limit token
+TOKEN_WAIT_SECONDS = 10.0
+
+
+class UpstreamError(Exception):
+    """An upstream call failed; ``reason`` says why in one word."""
+
+    reason = "error"
+    retryable = False
+
+    def __init__(self, provider: str, detail: str = ""):
+        super().__init__(f"{provider}: {self.reason}" + (f" ({detail})" if detail else ""))
+        self.provider = provider
+        self.detail = detail
+
+
+class UpstreamThrottled(UpstreamError):
+    """The provider rate-limited us (HTTP 429, ban warnings)."""
+    reason = "throttled"
+    retryable = True
+
+
+class UpstreamUnavailable(UpstreamError):
+    """Network failure or the provider is down."""
+    reason = "unavailable"
+    retryable = True
+
+
+class UpstreamNotFound(UpstreamError):
+    """The provider doesn't know the symbol."""
+    reason = "not_found"
+
+
+class CircuitOpen(UpstreamError):
+    """Not called: the provider's breaker is open after repeated failures."""
+    reason = "circuit_open"
+
+
+class RateLimited(UpstreamError):
+    """Not called: no rate-limit token came free in time."""
+    reason = "rate_limited"
+
+
+class UpstreamTimeout(UpstreamError):
+    """An upstream provider call did not finish within its time budget."""
+
+    reason = "timeout"
+    retryable = True
+
+    def __init__(self, provider: str, timeout: float):
+        super().__init__(provider, f"no response within {timeout:g}s")
+        self.timeout = timeout
+
+
+@contextlib.contextmanager
+def background() -> Iterator[None]:
+    """Run the enclosed upstream calls at background priority."""
+    token = priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        priority.reset(token)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands tokens to higher priorities first."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self._waiting = [0, 0]  # waiting calls per priority
+        self._cond = threading.Condition()
+
+    def acquire(self, prio: int = INTERACTIVE, timeout: float = TOKEN_WAIT_SECONDS) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiting[prio] += 1
+            try:
+                while True:
+                    self._refill()
+                    ahead = any(self._waiting[p] for p in range(prio))
+                    if self.tokens >= 1 and not ahead:
+                        self.tokens -= 1
+                        self._cond.notify_all()
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = (1 - self.tokens) / self.rate if self.tokens < 1 else remaining
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._waiting[prio] -= 1
+                self._cond.notify_all()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class CircuitBreaker:
+    """Closed -> open after failures -> half-open probe -> closed again."""
+
+    def __init__(self):
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.last_reason: str | None = None
+        self._cooldown = COOLDOWN_SECONDS
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may go out now (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() >= self._open_until:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+            self._cooldown = COOLDOWN_SECONDS
+
+    def failure(self, reason: str) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_reason = reason
+            if self.state == "half_open":
+                self._cooldown = min(self._cooldown * 2, MAX_COOLDOWN_SECONDS)
+                self._trip()
+            elif self.state == "closed" and (
+                reason == UpstreamThrottled.reason or self.failures >= FAILURE_THRESHOLD
+            ):
+                self._trip()
+
+    def release_probe(self) -> None:
+        """The probe ended without telling us anything about health."""
+        with self._lock:
+            self._probing = False
+
+    @property
+    def retry_in(self) -> float:
+        return max(0.0, self._open_until - time.monotonic()) if self.state == "open" else 0.0
+
+    def _trip(self) -> None:
+        self.state = "open"
+        self.trips += 1
+        self._probing = False
+        self._open_until = time.monotonic() + self._cooldown
+
+
+class Governor:
+    """Rate limit, breaker and retry policy for one provider."""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker()
+        self.calls = 0
+        self.retries = 0
+        self.failures: dict[str, int] = {}
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run ``fn`` under the governor; raises an UpstreamError subclass on failure."""
+        prio = priority.get()
+        call = fn.__name__
+        attempts = 1 + (MAX_RETRIES if prio == INTERACTIVE else 0)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                metrics.UPSTREAM_ERRORS.inc(provider=self.name, call=call, reason=CircuitOpen.reason)
+                raise CircuitOpen(self.name, f"retry in {self.breaker.retry_in:.0f}s")
+            if not self.bucket.acquire(prio):
+                self.breaker.release_probe()
+                metrics.UPSTREAM_ERRORS.inc(provider=self.name, call=call, reason=RateLimited.reason)
+                raise RateLimited(self.name)
+            self.calls += 1
+            try:
+                with metrics.UPSTREAM_SECONDS.time(provider=self.name, call=call):
+                    result = fn(*args, **kwargs)
+            except UpstreamError as exc:
+                self.failures[exc.reason] = self.failures.get(exc.reason, 0) + 1
+                metrics.UPSTREAM_ERRORS.inc(provider=self.name, call=call, reason=exc.reason)
+                if not exc.retryable:
+                    # The provider answered; that says nothing bad about its health
+                    self.breaker.success()
+                    raise
+                self.breaker.failure(exc.reason)
+                if attempt == attempts - 1 or self.breaker.state == "open":
+                    raise
+                self.retries += 1
+                time.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt)))
+                continue
+            self.breaker.success()
+            return result
+        raise AssertionError("unreachable")
+
+    def timed_out(self, call: str = "") -> None:
+        """Count a call the pool gave up waiting for."""
+        self.failures[UpstreamTimeout.reason] = self.failures.get(UpstreamTimeout.reason, 0) + 1
+        metrics.UPSTREAM_ERRORS.inc(provider=self.name, call=call, reason=UpstreamTimeout.reason)
+        self.breaker.failure(UpstreamTimeout.reason)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "retry_in": round(self.breaker.retry_in, 1),
+            "last_failure": self.breaker.last_reason,
+            "trips": self.breaker.trips,
+            "tokens": round(self.bucket.tokens, 2),
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": dict(self.failures),
+        }
@@ -0,0 +1,181 @@
+"""Persistent on-disk history of closed OHLCV bars.
+
+Each (market, symbol, interval) gets one append-only ``.ohlcv`` file of
+fixed-width 48-byte records (int64 time + five float64 fields, little-endian).
+Files are read through mmap and searched by time with a binary search, so
+warm starts and range reads don't copy the data. Appends hold an exclusive
+lock and only ever add whole records after the last stored bar, so several
+uvicorn workers can share one directory; readers simply ignore a partially
+written trailing record.
+
+Yahoo re-adjusts its whole history after a split or dividend. When that
+happens the series is rewritten into a new file that atomically replaces
+the old one, so readers still holding a map of the old file are unaffected.
+"""
+
+import mmap
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+from models.bars import FIELDS, Bars
+from services.resample import interval_seconds
+
+try:
+    import fcntl
+
+    def _lock(f) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(f) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(f) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock(f) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+RECORD = np.dtype([(f, "<i8" if f == "time" else "<f8") for f in FIELDS])
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / "data" / "history"
+
+
+class HistoryStore:
+    """Directory of per-series record files."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._maps: dict[Path, tuple[tuple, np.ndarray]] = {}  # path -> ((inode, count), records)
+        self._lock = threading.Lock()
+
+    def path(self, market: str, symbol: str, interval: str) -> Path:
+        # "1m" and "1M" would collide on case-insensitive filesystems
+        name = interval.replace("M", "mo")
+        return self.root / market / f"{quote(symbol, safe='')}_{name}.ohlcv"
+
+    def records(self, market: str, symbol: str, interval: str) -> np.ndarray:
+        """All stored records as a read-only array over the mmapped file."""
+        path = self.path(market, symbol, interval)
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                count = st.st_size // RECORD.itemsize
+                ident = (st.st_ino, count)
+                with self._lock:
+                    cached = self._maps.get(path)
+                    if cached is not None and cached[0] == ident:
+                        return cached[1]
+                if count == 0:
+                    return np.empty(0, dtype=RECORD)
+                mm = mmap.mmap(f.fileno(), count * RECORD.itemsize, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return np.empty(0, dtype=RECORD)
+        records = np.frombuffer(mm, dtype=RECORD, count=count)
+        with self._lock:
+            self._maps[path] = (ident, records)
+        return records
+
+    def read(self, market: str, symbol: str, interval: str, start: int | None = None,
+             end: int | None = None, limit: int | None = None) -> Bars:
+        """Bars with ``start <= time <= end``, keeping the newest ``limit``."""
+        records = self.records(market, symbol, interval)
+        bars = Bars(*(records[f] for f in FIELDS))
+        lo, hi = bars.bounds(start, end, limit)
+        return bars[lo:hi]
+
+    def last_time(self, market: str, symbol: str, interval: str) -> int | None:
+        times = self.records(market, symbol, interval)["time"]
+        return int(times[-1]) if len(times) else None
+
+    def append(self, market: str, symbol: str, interval: str, bars: Bars,
+               now: float | None = None) -> int:
+        """Persist the closed bars of ``bars`` newer than the stored ones.
+
+        Returns the number of records written.
+        """
+        if not bars:
+            return 0
+        now = time.time() if now is None else now
+        closed = bars.time + interval_seconds(interval) <= now
+        known = self.last_time(market, symbol, interval)
+        if known is not None:
+            closed &= bars.time > known
+        if not closed.any():
+            return 0
+
+        path = self.path(market, symbol, interval)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Lock a sidecar file: Windows byte-range locks would block mmap readers
+        with open(path.with_suffix(".lock"), "a+b") as guard:
+            _lock(guard)
+            try:
+                with open(path, "ab") as f:
+                    # Another worker may have appended since we looked
+                    size = os.fstat(f.fileno()).st_size
+                    whole = size - size % RECORD.itemsize
+                    if whole != size:
+                        f.truncate(whole)
+                    last = self._tail_time(path, whole)
+                    mask = closed if last is None else closed & (bars.time > last)
+                    out = _to_records(bars, mask)
+                    f.write(out.tobytes())
+            finally:
+                _unlock(guard)
+        return len(out)
+
+    def replace(self, market: str, symbol: str, interval: str, bars: Bars,
+                now: float | None = None) -> bool:
+        """Rewrite the series with the closed bars of ``bars``.
+
+        Returns False if the old file couldn't be replaced (on Windows, while
+        a reader still maps it); the caller should try again later.
+        """
+        now = time.time() if now is None else now
+        out = _to_records(bars, bars.time + interval_seconds(interval) <= now)
+        path = self.path(market, symbol, interval)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(path.with_suffix(".lock"), "a+b") as guard:
+            _lock(guard)
+            try:
+                tmp.write_bytes(out.tobytes())
+                try:
+                    os.replace(tmp, path)
+                except PermissionError:
+                    tmp.unlink()
+                    return False
+            finally:
+                _unlock(guard)
+        with self._lock:
+            self._maps.pop(path, None)
+        return True
+
+    @staticmethod
+    def _tail_time(path: Path, size: int) -> int | None:
+        if size < RECORD.itemsize:
+            return None
+        with open(path, "rb") as f:
+            f.seek(size - RECORD.itemsize)
+            return int(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)["time"][0])
+
+
+def _to_records(bars: Bars, mask: np.ndarray) -> np.ndarray:
+    out = np.empty(int(mask.sum()), dtype=RECORD)
+    for field in FIELDS:
+        out[field] = getattr(bars, field)[mask]
+    return out
+
+
+def open_history_store() -> HistoryStore | None:
+    """History store from CHARTBANK_HISTORY_DIR; an empty value disables it."""
+    root = os.getenv("CHARTBANK_HISTORY_DIR", str(DEFAULT_DIR))
+    return HistoryStore(root) if root else None
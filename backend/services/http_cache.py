@@ -0,0 +1,199 @@
+"""HTTP caching for the REST endpoints: validators, lifetimes and compression.
+
+- Validators: a chart's cache key is a BLAKE2b digest of the served
+  window's shape and its newest bar (time and values, since a forming bar
+  changes in place), so it is computed from the bars without serializing
+  anything. The ETag is a CRC-32 of that key; a matching ``If-None-Match``
+  answers 304 with no body. ``Last-Modified``
+  is only sent while the market is closed, when the newest bar is final.
+- Lifetimes: ``Cache-Control`` follows the interval's server-side TTL
+  while the symbol's market is open; once it closes, responses stay fresh
+  until the next session opens (see ``services.market_hours``).
+- Compression: Brotli (when the ``brotli`` package is installed) or gzip,
+  negotiated from ``Accept-Encoding``. Compressed bodies are kept in an
+  LRU keyed by the full digest (not the 32-bit ETag, which two windows
+  can share) and encoding, so a repeat miss for the same data costs
+  a dict lookup rather than encoding plus compression.
+"""
+
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable
+
+from fastapi import Request, Response
+
+from models.bars import Bars
+from services.cache import DEFAULT_TTL, TTL_MAP
+from services.market_hours import session
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Bodies smaller than this go out uncompressed
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Longest a response for a closed market stays fresh; stale fallbacks barely at all
+MAX_CLOSED_AGE = 12 * 3600
+STALE_AGE = 5
+
+# Symbol lists: the defaults never change at runtime, searches rarely
+DEFAULT_SYMBOLS_AGE = 3600
+SEARCH_AGE = 300
+
+MAX_BODY_CACHE_BYTES = 32 * 1024 * 1024
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """The best encoding the client accepts: br, then gzip, else None."""
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class BodyCache:
+    """Byte-bounded LRU of encoded (and compressed) response bodies."""
+
+    def __init__(self, max_bytes: int = MAX_BODY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._bodies: OrderedDict[tuple, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: tuple, build: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+        body = build()
+        with self._lock:
+            old = self._bodies.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._bodies[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and len(self._bodies) > 1:
+                _, evicted = self._bodies.popitem(last=False)
+                self._bytes -= len(evicted)
+        return body
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._bodies), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+body_cache = BodyCache()
+
+
+def chart_key(bars: Bars, *parts) -> bytes:
+    """Cache key for a chart window: a digest of request parts, bar count and the newest bar."""
+    if bars:
+        i = len(bars) - 1
+        shape = (len(bars), int(bars.time[0]), int(bars.time[i]), float(bars.open[i]),
+                 float(bars.high[i]), float(bars.low[i]), float(bars.close[i]),
+                 float(bars.volume[i]))
+    else:
+        shape = (0,)
+    return hashlib.blake2b(repr((parts, shape)).encode(), digest_size=16).digest()
+
+
+def body_key(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+def etag(key: bytes) -> str:
+    """Weak ETag for a cache key."""
+    return 'W/"%08x"' % zlib.crc32(key)
+
+
+def chart_cache_control(symbol: str, market: str, interval: str, stale: bool = False) -> str:
+    """Cache-Control for a chart: the TTL while trading, until the next open when not."""
+    if stale:
+        return f"public, max-age={STALE_AGE}"
+    ttl = TTL_MAP.get(interval, DEFAULT_TTL)
+    state = session(symbol, market)
+    if state.is_open:
+        age = ttl
+    else:
+        until_open = state.seconds_to_change()
+        age = MAX_CLOSED_AGE if until_open is None else min(max(int(until_open), ttl), MAX_CLOSED_AGE)
+    return f"public, max-age={age}, stale-while-revalidate={ttl}"
+
+
+def not_modified(request: Request, tag: str, last_modified: float | None = None) -> bool:
+    """True if the client's cached copy is current (If-None-Match wins over If-Modified-Since)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip() for t in if_none_match.split(",")}
+        # Weak comparison: W/"x" matches "x"
+        return "*" in tags or tag in tags or tag.removeprefix("W/") in {
+            t.removeprefix("W/") for t in tags
+        }
+    since = request.headers.get("if-modified-since")
+    if since is not None and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_response(request: Request, key: bytes, build: Callable[[], bytes],
+                    cache_control: str, media_type: str = "application/json",
+                    last_modified: float | None = None) -> Response:
+    """304 when the client is current; otherwise the (cached) body in the best encoding."""
+    tag = etag(key)
+    headers = {"ETag": tag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if not_modified(request, tag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    body = body_cache.get_or_build((key, None), build)
+    if encoding is not None and len(body) >= MIN_COMPRESS_BYTES:
+        body = body_cache.get_or_build((key, encoding), lambda: compress(body, encoding))
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def closed_since(symbol: str, market: str, bars: Bars) -> float | None:
+    """The newest bar's time while the market is closed (it can't change), else None."""
+    if not bars or session(symbol, market).is_open:
+        return None
+    return float(bars.time[-1])
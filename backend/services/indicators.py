@@ -0,0 +1,542 @@
+"""Technical indicators over cached OHLCV series, updated incrementally.
+
+A series' indicator values are computed once with vectorized NumPy. After
+that each indicator keeps a small running state (window sums, the previous
+EMA, Wilder averages, session VWAP sums) committed through the last closed
+bar, so a moved forming bar or a newly opened bar costs O(1) instead of a
+pass over the window. Results are memoized per (market, symbol, interval,
+indicator, params) and shared by every viewer.
+
+Supported: sma, ema, rsi, macd, bbands (Bollinger) and vwap.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Tuple
+
+import numpy as np
+import orjson
+
+from models.bars import Bars
+from services import metrics
+
+SeriesKey = Tuple[str, str, str]  # (market, symbol, interval)
+
+# Bars per block in the EMA recurrence; keeps w**-k well inside float64
+_EMA_BLOCK = 128
+
+
+class InvalidIndicator(ValueError):
+    """Unknown indicator name or bad parameters."""
+
+
+def _ema(x: np.ndarray, alpha: float, prev: float) -> np.ndarray:
+    """``y[i] = alpha * x[i] + (1 - alpha) * y[i-1]`` with ``y[-1] = prev``, vectorized per block."""
+    w = 1.0 - alpha
+    out = np.empty(len(x))
+    if w == 0.0:
+        out[:] = x
+        return out
+    for start in range(0, len(x), _EMA_BLOCK):
+        seg = x[start:start + _EMA_BLOCK]
+        wk = w ** np.arange(1, len(seg) + 1)
+        out[start:start + len(seg)] = wk * (prev + alpha * np.cumsum(seg / wk))
+        prev = out[start + len(seg) - 1]
+    return out
+
+
+def _seeded_ema(x: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """EMA seeded with the SMA of the first ``period`` values; NaN before that."""
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        seed = x[:period].mean()
+        out[period - 1] = seed
+        out[period:] = _ema(x[period:], alpha, seed)
+    return out
+
+
+def _window_sum(x: np.ndarray, period: int) -> np.ndarray:
+    """Trailing sums of ``period`` values; NaN until the window is full."""
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        c = np.cumsum(np.r_[0.0, x])
+        out[period - 1:] = c[period:] - c[:-period]
+    return out
+
+
+def _value(v) -> float | None:
+    return None if v is None or v != v else float(v)
+
+
+class _EmaState:
+    """Running EMA seeded by an SMA, usable on its own or inside MACD/RSI."""
+
+    def __init__(self, period: int, alpha: float):
+        self.period = period
+        self.alpha = alpha
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value: float | None = None
+
+    def load(self, x: np.ndarray, ema: np.ndarray) -> None:
+        self.count = len(x)
+        if self.count >= self.period:
+            self.value = float(ema[-1])
+        else:
+            self.seed_sum = float(x.sum())
+
+    def peek(self, x: float) -> float | None:
+        if self.value is not None:
+            return self.alpha * x + (1 - self.alpha) * self.value
+        if self.count == self.period - 1:
+            return (self.seed_sum + x) / self.period
+        return None
+
+    def commit(self, x: float) -> None:
+        nxt = self.peek(x)
+        self.count += 1
+        if nxt is not None:
+            self.value = nxt
+        else:
+            self.seed_sum += x
+
+
+class Indicator(ABC):
+    """Base class: ``compute`` fills arrays and loads state, ``peek``/``commit`` step it."""
+
+    outputs: tuple[str, ...] = ("value",)
+
+    @abstractmethod
+    def compute(self, bars: Bars) -> dict[str, np.ndarray]:
+        """Output arrays over ``bars``, leaving the state at the last bar."""
+
+    @abstractmethod
+    def peek(self, bar: dict) -> dict[str, float | None]:
+        """Values if ``bar`` were the next bar, without changing the state."""
+
+    @abstractmethod
+    def commit(self, bar: dict) -> None:
+        """Advance the state past a closed bar."""
+
+
+class SMA(Indicator):
+    def __init__(self, period: int = 20):
+        self.period = period
+        self.window: deque[float] = deque()
+        self.total = 0.0
+
+    def compute(self, bars: Bars) -> dict[str, np.ndarray]:
+        self.window = deque(bars.close[-(self.period - 1):].tolist() if self.period > 1 else [])
+        self.total = sum(self.window)
+        return {"value": _window_sum(bars.close, self.period) / self.period}
+
+    def peek(self, bar: dict) -> dict[str, float | None]:
+        if len(self.window) < self.period - 1:
+            return {"value": None}
+        return {"value": (self.total + bar["close"]) / self.period}
+
+    def commit(self, bar: dict) -> None:
+        if self.period == 1:
+            return
+        self.window.append(bar["close"])
+        self.total += bar["close"]
+        if len(self.window) > self.period - 1:
+            self.total -= self.window.popleft()
+
+
+class EMA(Indicator):
+    def __init__(self, period: int = 20):
+        self.state = _EmaState(period, 2 / (period + 1))
+
+    def compute(self, bars: Bars) -> dict[str, np.ndarray]:
+        ema = _seeded_ema(bars.close, self.state.period, self.state.alpha)
+        self.state.load(bars.close, ema)
+        return {"value": ema}
+
+    def peek(self, bar: dict) -> dict[str, float | None]:
+        return {"value": self.state.peek(bar["close"])}
+
+    def commit(self, bar: dict) -> None:
+        self.state.commit(bar["close"])
+
+
+class RSI(Indicator):
+    """Wilder's RSI."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.gain = _EmaState(period, 1 / period)
+        self.loss = _EmaState(period, 1 / period)
+        self.prev_close: float | None = None
+
+    def compute(self, bars: Bars) -> dict[str, np.ndarray]:
+        out = np.full(len(bars), np.nan)
+        if not bars:
+            return {"value": out}
+        change = np.diff(bars.close)
+        gains, losses = np.maximum(change, 0), np.maximum(-change, 0)
+        avg_gain = _seeded_ema(gains, self.period, 1 / self.period)
+        avg_loss = _seeded_ema(losses, self.period, 1 / self.period)
+        self.gain.load(gains, avg_gain)
+        self.loss.load(losses, avg_loss)
+        self.prev_close = float(bars.close[-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[1:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        out[1:][np.isnan(avg_gain)] = np.nan
+        return {"value": out}
+
+    def peek(self, bar: dict) -> dict[str, float | None]:
+        if self.prev_close is None:
+            return {"value": None}
+        change = bar["close"] - self.prev_close
+        g, l = self.gain.peek(max(change, 0)), self.loss.peek(max(-change, 0))
+        if g is None or l is None:
+            return {"value": None}
+        return {"value": 100.0 if l == 0 else 100 - 100 / (1 + g / l)}
+
+    def commit(self, bar: dict) -> None:
+        if self.prev_close is not None:
+            change = bar["close"] - self.prev_close
+            self.gain.commit(max(change, 0))
+            self.loss.commit(max(-change, 0))
+        self.prev_close = bar["close"]
+
+
+class MACD(Indicator):
+    outputs = ("macd", "signal", "hist")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        if fast >= slow:
+            raise InvalidIndicator("macd needs fast < slow")
+        self.fast = _EmaState(fast, 2 / (fast + 1))
+        self.slow = _EmaState(slow, 2 / (slow + 1))
+        self.signal = _EmaState(signal, 2 / (signal + 1))
+
+    def compute(self, bars: Bars) -> dict[str, np.ndarray]:
+        fast = _seeded_ema(bars.close, self.fast.period, self.fast.alpha)
+        slow = _seeded_ema(bars.close, self.slow.period, self.slow.alpha)
+        self.fast.load(bars.close, fast)
+        self.slow.load(bars.close, slow)
+        macd = fast - slow
+        valid = macd[~np.isnan(macd)]
+        signal = np.full(len(bars), np.nan)
+        signal[len(bars) - len(valid):] = _seeded_ema(valid, self.signal.period, self.signal.alpha)
+        self.signal.load(valid, signal[len(bars) - len(valid):])
+        return {"macd": macd, "signal": signal, "hist": macd - signal}
+
+    def peek(self, bar: dict) -> dict[str, float | None]:
+        f, s = self.fast.peek(bar["close"]), self.slow.peek(bar["close"])
+        if f is None or s is None:
+            return {"macd": None, "signal": None, "hist": None}
+        macd = f - s
+        sig = self.signal.peek(macd)
+        return {"macd": macd, "signal": sig, "hist": None if sig is None else macd - sig}
+
+    def commit(self, bar: dict) -> None:
+        f, s = self.fast.peek(bar["close"]), self.slow.peek(bar["close"])
+        self.fast.commit(bar["close"])
+        self.slow.commit(bar["close"])
+        if f is not None and s is not None:
+            self.signal.commit(f - s)
+
+
+class BBands(Indicator):
+    """Bollinger Bands: SMA middle band +/- ``k`` population standard deviations."""
+
+    outputs = ("middle", "upper", "lower")
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.period = period
+        self.k = k
+        self.window: deque[float] = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def compute(self, bars: Bars) -> dict[str, np.ndarray]:
+        self.window = deque(bars.close[-(self.period - 1):].tolist() if self.period > 1 else [])
+        self.total = sum(self.window)
+        self.total_sq = sum(x * x for x in self.window)
+        mean = _window_sum(bars.close, self.period) / self.period
+        var = _window_sum(bars.close ** 2, self.period) / self.period - mean ** 2
+        std = np.sqrt(np.maximum(var, 0))
+        return {"middle": mean, "upper": mean + self.k * std, "lower": mean - self.k * std}
+
+    def peek(self, bar: dict) -> dict[str, float | None]:
+        if len(self.window) < self.period - 1:
+            return {"middle": None, "upper": None, "lower": None}
+        c = bar["close"]
+        mean = (self.total + c) / self.period
+        std = max((self.total_sq + c * c) / self.period - mean * mean, 0.0) ** 0.5
+        return {"middle": mean, "upper": mean + self.k * std, "lower": mean - self.k * std}
+
+    def commit(self, bar: dict) -> None:
+        if self.period == 1:
+            return
+        c = bar["close"]
+        self.window.append(c)
+        self.total += c
+        self.total_sq += c * c
+        if len(self.window) > self.period - 1:
+            old = self.window.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+
+
+class VWAP(Indicator):
+    """Volume-weighted average of the typical price, reset each UTC day."""
+
+    def __init__(self):
+        self.day: int | None = None
+        self.pv = 0.0
+        self.volume = 0.0
+
+    @staticmethod
+    def _typical(high, low, close):
+        return (high + low + close) / 3
+
+    def compute(self, bars: Bars) -> dict[str, np.ndarray]:
+        if not bars:
+            return {"value": np.empty(0)}
+        days = bars.time // 86400
+        pv = self._typical(bars.high, bars.low, bars.close) * bars.volume
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        # Cumulative sums restarted at each day boundary
+        cum_pv, cum_v = np.cumsum(pv), np.cumsum(bars.volume)
+        offset = np.repeat(np.r_[0, starts[1:]], np.diff(np.r_[starts, len(bars)]))
+        base_pv = np.where(offset > 0, cum_pv[offset - 1], 0.0)
+        base_v = np.where(offset > 0, cum_v[offset - 1], 0.0)
+        day_pv, day_v = cum_pv - base_pv, cum_v - base_v
+        self.day, self.pv, self.volume = int(days[-1]), float(day_pv[-1]), float(day_v[-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {"value": np.where(day_v > 0, day_pv / day_v, np.nan)}
+
+    def peek(self, bar: dict) -> dict[str, float | None]:
+        pv, v = self._sums(bar)
+        return {"value": pv / v if v > 0 else None}
+
+    def commit(self, bar: dict) -> None:
+        self.pv, self.volume = self._sums(bar)
+        self.day = bar["time"] // 86400
+
+    def _sums(self, bar: dict) -> tuple[float, float]:
+        pv = self._typical(bar["high"], bar["low"], bar["close"]) * bar["volume"]
+        if bar["time"] // 86400 != self.day:
+            return pv, bar["volume"]
+        return self.pv + pv, self.volume + bar["volume"]
+
+
+INDICATORS: dict[str, tuple[type[Indicator], dict[str, type]]] = {
+    "sma": (SMA, {"period": int}),
+    "ema": (EMA, {"period": int}),
+    "rsi": (RSI, {"period": int}),
+    "macd": (MACD, {"fast": int, "slow": int, "signal": int}),
+    "bbands": (BBands, {"period": int, "k": float}),
+    "vwap": (VWAP, {}),
+}
+
+MAX_PERIOD = 1000
+
+# Live pushes grow a series in place, doubling its buffers when full. Past
+# MAX_SERIES_BARS the oldest TRIM_BARS are dropped; the next sync against
+# the full cached series then recomputes it.
+MAX_SERIES_BARS = 50_000
+TRIM_BARS = 5_000
+MIN_CAPACITY = 64
+
+
+def parse_spec(name: str, params: dict) -> tuple[str, tuple]:
+    """Validate an indicator request; returns a hashable (name, params) spec."""
+    if name not in INDICATORS:
+        raise InvalidIndicator(f"Unknown indicator: {name!r}")
+    _, schema = INDICATORS[name]
+    clean = {}
+    for key, value in params.items():
+        if key not in schema:
+            raise InvalidIndicator(f"{name} has no parameter {key!r}")
+        try:
+            clean[key] = schema[key](value)
+        except (TypeError, ValueError):
+            raise InvalidIndicator(f"Bad value for {name}.{key}: {value!r}") from None
+        if schema[key] is int and not 1 <= clean[key] <= MAX_PERIOD:
+            raise InvalidIndicator(f"{name}.{key} must be between 1 and {MAX_PERIOD}")
+    INDICATORS[name][0](**clean)  # cross-parameter checks
+    return name, tuple(sorted(clean.items()))
+
+
+class IndicatorSeries:
+    """One indicator's values over one series, kept in step with its bars.
+
+    The indicator state is committed through the second-to-last bar; the
+    last (forming) bar is only peeked at, so it can move freely.
+    """
+
+    def __init__(self, spec: tuple[str, tuple]):
+        name, params = spec
+        self.spec = spec
+        self.indicator = INDICATORS[name][0](**dict(params))
+        self._time = np.empty(0, dtype=np.int64)
+        self._values: dict[str, np.ndarray] = {}
+        self._n = 0
+        self.last: dict | None = None      # the forming bar, not yet committed
+        self.anchor: tuple | None = None   # (time, close) of the newest committed bar
+
+    @property
+    def outputs(self) -> tuple[str, ...]:
+        return self.indicator.outputs
+
+    @property
+    def time(self) -> np.ndarray:
+        return self._time[:self._n]
+
+    @property
+    def values(self) -> dict[str, np.ndarray]:
+        return {key: v[:self._n] for key, v in self._values.items()}
+
+    def sync(self, bars: Bars) -> None:
+        """Catch up with ``bars``: step through new bars, or recompute after a rewrite."""
+        if not bars:
+            return
+        if self.last is not None and bars.time[-1] < self.last["time"]:
+            return  # live pushes are already ahead of this snapshot
+        if self.last is None or not self._continues(bars):
+            self._recompute(bars)
+            return
+        start = int(np.searchsorted(bars.time, self.last["time"]))
+        for i in range(start, len(bars)):
+            self.push(bars.bar(i))
+
+    def push(self, bar: dict) -> dict[str, float | None] | None:
+        """Apply one bar (the forming bar moved, or a new one opened).
+
+        Returns the indicator values at that bar, or None if it can't apply.
+        """
+        if self.last is None or bar["time"] < self.last["time"]:
+            return None
+        if bar["time"] > self.last["time"]:
+            self.indicator.commit(self.last)
+            self.anchor = (self.last["time"], self.last["close"])
+            self._append(bar["time"])
+        self.last = bar
+        values = self.indicator.peek(bar)
+        self._set_last(values)
+        return {key: _value(v) for key, v in values.items()}
+
+    def reset(self) -> None:
+        """Forget the state; the next ``sync`` recomputes from scratch."""
+        self.last = None
+        self.anchor = None
+
+    def window(self, start: int | None = None, end: int | None = None,
+               limit: int | None = None) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """Times and values with ``start <= time <= end``, newest ``limit`` kept."""
+        lo = 0 if start is None else int(np.searchsorted(self.time, start, side="left"))
+        hi = len(self.time) if end is None else int(np.searchsorted(self.time, end, side="right"))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        lo = min(lo, hi)
+        return self.time[lo:hi], {k: v[lo:hi] for k, v in self.values.items()}
+
+    def _continues(self, bars: Bars) -> bool:
+        """True if ``bars`` extends what we hold: same start, same committed bars."""
+        if bars.time[0] != self.time[0]:
+            return False
+        # The forming bar at the same position: live pushes across a gap left bars out
+        j = int(np.searchsorted(bars.time, self.last["time"]))
+        if j != len(self.time) - 1 or j >= len(bars) or bars.time[j] != self.last["time"]:
+            return False
+        if self.anchor is None:
+            return True
+        t, close = self.anchor
+        return bars.time[j - 1] == t and bars.close[j - 1] == close
+
+    def _recompute(self, bars: Bars) -> None:
+        n = len(bars)
+        capacity = max(MIN_CAPACITY, n + n // 4)
+        self._time = np.empty(capacity, dtype=np.int64)
+        self._time[:n] = bars.time
+        self._values = {}
+        for key, v in self.indicator.compute(bars[:-1]).items():
+            self._values[key] = np.full(capacity, np.nan)
+            self._values[key][:n - 1] = v
+        self._n = n
+        self.anchor = (int(bars.time[-2]), float(bars.close[-2])) if n > 1 else None
+        self.last = bars.bar(n - 1)
+        self._set_last(self.indicator.peek(self.last))
+
+    def _append(self, time: int) -> None:
+        """Open a slot for a new bar: amortized O(1), the buffers double when full."""
+        if self._n == len(self._time):
+            if self._n >= MAX_SERIES_BARS:
+                keep = self._n - TRIM_BARS
+                self._time[:keep] = self._time[TRIM_BARS:self._n]
+                for v in self._values.values():
+                    v[:keep] = v[TRIM_BARS:self._n]
+                self._n = keep
+            else:
+                capacity = min(max(MIN_CAPACITY, 2 * self._n), MAX_SERIES_BARS)
+                self._time = np.resize(self._time, capacity)
+                self._values = {key: np.resize(v, capacity) for key, v in self._values.items()}
+        self._time[self._n] = time
+        for v in self._values.values():
+            v[self._n] = np.nan
+        self._n += 1
+
+    def _set_last(self, values: dict[str, float | None]) -> None:
+        for key, value in values.items():
+            self._values[key][self._n - 1] = np.nan if value is None else value
+
+
+class IndicatorCache:
+    """LRU of indicator series keyed by (market, symbol, interval, name, params)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, IndicatorSeries] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: SeriesKey, spec: tuple[str, tuple]) -> IndicatorSeries:
+        entry_key = (*key, *spec)
+        series = self._entries.get(entry_key)
+        if series is None:
+            self.misses += 1
+            series = self._entries[entry_key] = IndicatorSeries(spec)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(entry_key)
+        return series
+
+    def synced(self, key: SeriesKey, spec: tuple[str, tuple], bars: Bars) -> IndicatorSeries:
+        """The memoized series for ``spec``, brought up to date with ``bars``."""
+        series = self.get(key, spec)
+        series.sync(bars)
+        return series
+
+    def stats(self) -> dict:
+        return {"series": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def dump_indicator(key: SeriesKey, series: IndicatorSeries, time, values, **extra) -> bytes:
+    """Encode indicator values: ``time`` plus one array (or value) per output.
+
+    Values that are not defined yet (warm-up) are sent as null.
+    """
+    market, symbol, interval = key
+    name, params = series.spec
+    payload = {
+        **extra,
+        "symbol": symbol,
+        "market": market,
+        "interval": interval,
+        "name": name,
+        "params": dict(params),
+        "time": time,
+        "values": values,
+    }
+    with metrics.SERIALIZE_SECONDS.time(kind="indicator"):
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+indicator_cache = IndicatorCache()
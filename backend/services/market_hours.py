@@ -0,0 +1,209 @@
+"""Trading sessions per exchange, and which exchange a symbol trades on.
+
+Each exchange has a time zone, its regular session per weekday (one or
+more segments, so lunch breaks and overnight sessions fit) and optionally
+a holiday calendar. Sessions are evaluated in the exchange's local time,
+so daylight-saving shifts need no special casing. Only regular hours
+count: pre/post-market prices don't move Yahoo's daily bars.
+
+``session(symbol, market)`` tells whether the symbol's market is open now
+and when that next changes, which is what caching lifetimes and polling
+cadences are derived from.
+"""
+
+import datetime as dt
+import functools
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+# Minutes since local midnight
+Segment = tuple[int, int]
+
+DAY = 24 * 60
+
+# How far ahead to look for the next session change (covers long holidays)
+LOOKAHEAD_DAYS = 10
+
+
+def _hm(hours: int, minutes: int = 0) -> int:
+    return hours * 60 + minutes
+
+
+def _weekdays(*segments: Segment) -> dict[int, tuple[Segment, ...]]:
+    return {day: segments for day in range(5)}
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> dt.date:
+    """The n-th (1-based; -1 = last) given weekday of a month."""
+    if n > 0:
+        first = dt.date(year, month, 1)
+        return first + dt.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = dt.date(year + month // 12, month % 12 + 1, 1) - dt.timedelta(days=1)
+    return last - dt.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> dt.date:
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return dt.date(year, month, day + 1)
+
+
+def _observed(day: dt.date) -> dt.date:
+    """US rule: a Saturday holiday is taken on Friday, a Sunday one on Monday."""
+    if day.weekday() == 5:
+        return day - dt.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + dt.timedelta(days=1)
+    return day
+
+
+@functools.lru_cache(maxsize=32)
+def nyse_holidays(year: int) -> frozenset[dt.date]:
+    days = {
+        _nth_weekday(year, 1, 0, 3),           # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),           # Washington's Birthday
+        _easter(year) - dt.timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),          # Memorial Day
+        _observed(dt.date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),           # Labor Day
+        _nth_weekday(year, 11, 3, 4),          # Thanksgiving
+        _observed(dt.date(year, 12, 25)),
+    }
+    if year >= 2022:
+        days.add(_observed(dt.date(year, 6, 19)))
+    new_year = dt.date(year, 1, 1)
+    if new_year.weekday() != 5:  # a Saturday New Year's Day is not made up
+        days.add(_observed(new_year))
+    return frozenset(days)
+
+
+@functools.lru_cache(maxsize=32)
+def year_end_holidays(year: int) -> frozenset[dt.date]:
+    """Tokyo's exchange closes Dec 31 - Jan 3 (national holidays not modelled)."""
+    return frozenset({dt.date(year, 1, 1), dt.date(year, 1, 2), dt.date(year, 1, 3),
+                      dt.date(year, 12, 31)})
+
+
+@functools.lru_cache(maxsize=32)
+def christmas_holidays(year: int) -> frozenset[dt.date]:
+    return frozenset({dt.date(year, 1, 1), dt.date(year, 12, 25), dt.date(year, 12, 26)})
+
+
+@dataclass(frozen=True)
+class Exchange:
+    name: str
+    tz: str
+    hours: dict[int, tuple[Segment, ...]] = field(hash=False)  # weekday (Mon=0) -> segments
+    holidays: Callable[[int], frozenset[dt.date]] | None = field(default=None, hash=False)
+    always_open: bool = False
+
+    @property
+    def zone(self) -> ZoneInfo:
+        return ZoneInfo(self.tz)
+
+    def open_intervals(self, day: dt.date) -> list[tuple[float, float]]:
+        """The day's sessions as (start, end) Unix times."""
+        if self.holidays is not None and day in self.holidays(day.year):
+            return []
+        midnight = dt.datetime(day.year, day.month, day.day, tzinfo=self.zone)
+        out = []
+        for start, end in self.hours.get(day.weekday(), ()):
+            # Aware datetime arithmetic is wall-clock time, so DST days come out right
+            out.append(((midnight + dt.timedelta(minutes=start)).timestamp(),
+                        (midnight + dt.timedelta(minutes=end)).timestamp()))
+        return out
+
+
+US = Exchange("NYSE", "America/New_York", _weekdays((_hm(9, 30), _hm(16))), nyse_holidays)
+JP = Exchange("TSE", "Asia/Tokyo", _weekdays((_hm(9), _hm(11, 30)), (_hm(12, 30), _hm(15, 30))),
+              year_end_holidays)
+HK = Exchange("HKEX", "Asia/Hong_Kong", _weekdays((_hm(9, 30), _hm(12)), (_hm(13), _hm(16))),
+              christmas_holidays)
+UK = Exchange("LSE", "Europe/London", _weekdays((_hm(8), _hm(16, 30))), christmas_holidays)
+DE = Exchange("XETRA", "Europe/Berlin", _weekdays((_hm(9), _hm(17, 30))), christmas_holidays)
+# CME Globex: Sunday 17:00 to Friday 16:00 Chicago, with a daily hour's break
+CME = Exchange("CME", "America/Chicago", {
+    6: ((_hm(17), DAY),),
+    0: ((0, _hm(16)), (_hm(17), DAY)),
+    1: ((0, _hm(16)), (_hm(17), DAY)),
+    2: ((0, _hm(16)), (_hm(17), DAY)),
+    3: ((0, _hm(16)), (_hm(17), DAY)),
+    4: ((0, _hm(16)),),
+})
+# Spot FX: Sunday 17:00 to Friday 17:00 New York
+FX = Exchange("FX", "America/New_York", {
+    6: ((_hm(17), DAY),),
+    0: ((0, DAY),), 1: ((0, DAY),), 2: ((0, DAY),), 3: ((0, DAY),),
+    4: ((0, _hm(17)),),
+})
+CRYPTO = Exchange("CRYPTO", "UTC", {}, always_open=True)
+
+# Yahoo ticker suffix -> exchange
+SUFFIXES = {".T": JP, ".HK": HK, ".L": UK, ".DE": DE, ".F": DE}
+
+INDEX_EXCHANGES = {"^N225": JP, "^HSI": HK, "^FTSE": UK, "^GDAXI": DE}
+
+
+def exchange_for(symbol: str, market: str) -> Exchange:
+    if market == "crypto":
+        return CRYPTO
+    if market == "forex":
+        return FX
+    if market in ("futures", "commodities"):
+        return CME
+    if market == "indices" and symbol in INDEX_EXCHANGES:
+        return INDEX_EXCHANGES[symbol]
+    for suffix, exchange in SUFFIXES.items():
+        if symbol.endswith(suffix):
+            return exchange
+    return US
+
+
+@dataclass(frozen=True)
+class Session:
+    is_open: bool
+    next_change: float | None  # Unix time the state flips; None for always-open markets
+
+    def seconds_to_change(self, now: float | None = None) -> float | None:
+        if self.next_change is None:
+            return None
+        return max(0.0, self.next_change - (time.time() if now is None else now))
+
+
+def exchange_session(exchange: Exchange, now: float | None = None) -> Session:
+    if exchange.always_open:
+        return Session(True, None)
+    now = time.time() if now is None else now
+    today = dt.datetime.fromtimestamp(now, exchange.zone).date()
+    intervals: list[list[float]] = []
+    for offset in range(-1, LOOKAHEAD_DAYS):
+        for lo, hi in exchange.open_intervals(today + dt.timedelta(days=offset)):
+            if intervals and lo <= intervals[-1][1]:
+                intervals[-1][1] = max(intervals[-1][1], hi)  # runs on past midnight
+            else:
+                intervals.append([lo, hi])
+    for lo, hi in intervals:
+        if lo <= now < hi:
+            return Session(True, hi)
+        if now < lo:
+            return Session(False, lo)
+    return Session(False, None)
+
+
+def session(symbol: str, market: str, now: float | None = None) -> Session:
+    """Whether the symbol's market is open at ``now``, and until when."""
+    return exchange_session(exchange_for(symbol, market), now)
+
+
+def is_open(symbol: str, market: str, now: float | None = None) -> bool:
+    return session(symbol, market, now).is_open
@@ -0,0 +1,243 @@
+"""In-process metrics, exposed in the Prometheus text format at /api/metrics.
+
+Counters, gauges and histograms with labels, kept in plain dicts. Updates
+come from the event loop and the provider pool threads alike, so each
+metric guards its values with a lock; an update is a dict lookup and an
+add. Gauges that describe live state (connections, subscriptions) are
+computed when scraped, from a callback, rather than maintained on every
+change.
+
+The instrumented hot paths:
+
+- upstream calls, per provider and call: latency, failures by reason,
+  empty results (``services.governor``, ``services.providers``)
+- DataFrame/candle to Bars conversion: time and bar count (both providers)
+- chart loads and stale fallbacks (``services.data_service``)
+- JSON encoding and Pydantic validation (``services.serialization``, routers)
+- HTTP request time per route (``MetricsMiddleware``)
+- WebSocket connections, subscriptions per symbol, messages sent and the
+  send-queue depth at each send (``ws``)
+"""
+
+import contextlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator
+
+# Latency buckets in seconds, from a cache hit to a slow upstream
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Message counts, for queue depths
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+Labels = tuple[str, ...]
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> Labels:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _fmt(self, key: Labels, extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """The metric's sample lines in the text format."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._fmt(key)} {_num(value)}"
+
+
+class Gauge(Metric):
+    """A set value, or with ``collect`` a callback yielding ``(labels, value)``
+    pairs at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 collect: Callable[[], Iterable[tuple[dict, float]]] | None = None):
+        super().__init__(name, help, labels)
+        self._values: dict[Labels, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterator[str]:
+        if self.collect is not None:
+            items = [(self._key(labels), value) for labels, value in self.collect()]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._fmt(key)} {_num(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[i] += 1
+            counts[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the seconds spent in the block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        counts = self._values.get(self._key(labels))
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, counts in items:
+            total = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts[:-1]):
+                total += n
+                le = 'le="' + ("+Inf" if bound == float("inf") else _num(bound)) + '"'
+                yield f"{self.name}_bucket{self._fmt(key, le)} {total}"
+            yield f"{self.name}_sum{self._fmt(key)} {_num(counts[-1])}"
+            yield f"{self.name}_count{self._fmt(key)} {total}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+def _num(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+UPSTREAM_SECONDS = Histogram(
+    "chartbank_upstream_seconds", "Upstream call latency per attempt", ["provider", "call"])
+UPSTREAM_ERRORS = Counter(
+    "chartbank_upstream_errors_total", "Failed upstream calls by reason", ["provider", "call", "reason"])
+UPSTREAM_EMPTY = Counter(
+    "chartbank_upstream_empty_total", "Upstream calls that returned no data", ["provider", "call"])
+BARS_CONVERTED = Counter(
+    "chartbank_bars_converted_total", "Bars converted from provider responses", ["provider"])
+CONVERT_SECONDS = Histogram(
+    "chartbank_convert_seconds", "Provider response to Bars conversion time", ["provider"])
+CHART_LOAD_SECONDS = Histogram(
+    "chartbank_chart_load_seconds", "Chart window loads, cache included", ["market"])
+STALE_SERVED = Counter(
+    "chartbank_stale_served_total", "Series served from old bars after an upstream failure",
+    ["market", "reason"])
+SERIALIZE_SECONDS = Histogram(
+    "chartbank_serialize_seconds", "Response JSON encoding time", ["kind"])
+VALIDATE_SECONDS = Histogram(
+    "chartbank_validate_seconds", "Pydantic response model construction time", ["model"])
+EXPORT_BARS = Counter(
+    "chartbank_export_bars_total", "Bars streamed by bulk exports", ["format"])
+HTTP_SECONDS = Histogram(
+    "chartbank_http_request_seconds", "HTTP request time per route", ["method", "route", "status"])
+WS_SENT = Counter(
+    "chartbank_ws_messages_sent_total", "WebSocket messages sent", ["endpoint"])
+WS_QUEUE_DEPTH = Histogram(
+    "chartbank_ws_send_queue_depth", "Messages waiting in a connection's outbox at each send",
+    ["endpoint"], buckets=DEPTH_BUCKETS)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_SECONDS.observe(
+                time.perf_counter() - start, method=scope["method"],
+                route=getattr(route, "path", "unmatched"), status=status,
+            )
@@ -0,0 +1,246 @@
+"""Background cache warming for default and frequently requested symbols.
+
+Runs for the application's lifetime (started from ``main``'s lifespan).
+Its targets are the dashboard's default symbols (the daily chart each
+opens with, and their quotes) plus the most requested charts and quotes
+of the last while, learned from access counts that halve every
+``DECAY_SECONDS``. Each target is refreshed once ``REFRESH_AHEAD`` of its
+cache lifetime has passed, so user requests find it fresh.
+
+Refreshes follow the market's session. While a market trades, targets are
+refreshed every TTL. After it closes, each target is refreshed once more
+to pick up the final bar. It is then kept in cache until the next open
+without going upstream, because closed-market data doesn't change. Crypto
+never closes. Refreshes run at background priority, and with several
+workers a lease per target makes only one worker refresh it.
+
+Set ``CHARTBANK_PREFETCH=0`` to turn warming off (tests do).
+"""
+
+import asyncio
+import os
+import time
+from typing import Iterable
+
+from services import data_service, market_hours
+from services.backend import Backend, backend
+from services.cache import DEFAULT_TTL, TTL_MAP
+from services.governor import background
+
+ENABLED = os.getenv("CHARTBANK_PREFETCH", "1") != "0"
+
+TICK = 5.0
+# Refresh once this fraction of a target's cache lifetime has passed
+REFRESH_AHEAD = 0.8
+CONCURRENCY = 4
+RETRY_DELAY = 60.0
+
+# Chart intervals warmed for default symbols (what the dashboard opens)
+CHART_INTERVALS = ("1d",)
+
+# Hot targets: the top HOT_LIMIT with at least HOT_MIN_HITS recent requests
+HOT_LIMIT = 10
+HOT_MIN_HITS = 3
+DECAY_SECONDS = 600.0
+MAX_TRACKED = 1000
+
+# Longest a closed market's series is kept without going upstream
+MAX_CLOSED_TTL = 12 * 3600
+
+Target = tuple[str, str, str, str]  # (kind "chart"|"quote", market, symbol, interval)
+
+
+class AccessCounts:
+    """Request counts that halve every ``half_life`` seconds."""
+
+    def __init__(self, half_life: float = DECAY_SECONDS):
+        self.half_life = half_life
+        self._counts: dict[Target, float] = {}
+        self._decayed_at = time.monotonic()
+
+    def hit(self, target: Target) -> None:
+        self._decay()
+        self._counts[target] = self._counts.get(target, 0.0) + 1
+        if len(self._counts) > MAX_TRACKED:
+            keep = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)[:MAX_TRACKED // 2]
+            self._counts = dict(keep)
+
+    def top(self, n: int, min_hits: float) -> list[Target]:
+        self._decay()
+        ranked = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)
+        return [target for target, count in ranked[:n] if count >= min_hits]
+
+    def _decay(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._decayed_at
+        if elapsed < self.half_life:
+            return
+        factor = 0.5 ** (elapsed / self.half_life)
+        self._counts = {t: c * factor for t, c in self._counts.items() if c * factor >= 0.5}
+        self._decayed_at = now
+
+
+class Prefetcher:
+    """Keeps default and hot charts/quotes warm ahead of their expiry."""
+
+    def __init__(self, defaults: dict[str, list[dict]] | None = None,
+                 intervals: Iterable[str] = CHART_INTERVALS, shared: Backend = backend):
+        self.defaults = data_service.DEFAULT_SYMBOLS if defaults is None else defaults
+        self.intervals = tuple(intervals)
+        self.counts = AccessCounts()
+        self._backend = shared
+        self._due: dict[Target, float] = {}
+        self._settled: set[Target] = set()  # refreshed since its market closed
+        self._names: dict[tuple[str, str], str] = {}
+        self._task: asyncio.Task | None = None
+        self.refreshed = 0
+        self.extended = 0
+        self.failed = 0
+
+    def record_chart(self, symbol: str, market: str, interval: str) -> None:
+        self.counts.hit(("chart", market, symbol, interval))
+
+    def record_quotes(self, items: list[dict]) -> None:
+        for item in items:
+            self._names.setdefault((item["market"], item["symbol"]), item.get("name", ""))
+            self.counts.hit(("quote", item["market"], item["symbol"], ""))
+
+    def targets(self) -> list[Target]:
+        targets: dict[Target, None] = {}
+        for market, items in self.defaults.items():
+            for item in items:
+                self._names.setdefault((market, item["symbol"]), item.get("name", ""))
+                for interval in self.intervals:
+                    targets[("chart", market, item["symbol"], interval)] = None
+                targets[("quote", market, item["symbol"], "")] = None
+        for target in self.counts.top(HOT_LIMIT, HOT_MIN_HITS):
+            targets[target] = None
+        return list(targets)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.tick()
+            await asyncio.sleep(TICK)
+
+    async def tick(self, now: float | None = None) -> None:
+        """Refresh (or extend) every target that is due."""
+        now = time.time() if now is None else now
+        due = [t for t in self.targets() if self._due.get(t, 0.0) <= now]
+        limit = asyncio.Semaphore(CONCURRENCY)
+
+        async def chart(target: Target) -> None:
+            async with limit:
+                await self._refresh_chart(target, now)
+
+        with background():
+            await asyncio.gather(
+                self._refresh_quotes([t for t in due if t[0] == "quote"], now),
+                *(chart(t) for t in due if t[0] == "chart"),
+            )
+
+    async def _refresh_chart(self, target: Target, now: float) -> None:
+        _, market, symbol, interval = target
+        key = (market, symbol, interval)
+        state = market_hours.session(symbol, market, now)
+        ttl = TTL_MAP.get(interval, DEFAULT_TTL)
+        if not state.is_open:
+            ttl = self._closed_ttl(state, now, ttl)
+        if not await self._claim(target, state, now, ttl):
+            return
+        if not state.is_open and target in self._settled:
+            bars = data_service.chart_cache.get(key)
+            if bars is not None:
+                data_service.chart_cache.set(key, interval, bars, ttl)
+                self.extended += 1
+                return
+        try:
+            await data_service.refresh_chart_data(symbol, market, interval, ttl)
+        except Exception:  # upstream down or symbol gone; try again later
+            self.failed += 1
+            self._due[target] = now + RETRY_DELAY
+            return
+        self.refreshed += 1
+        self._settle(target, state.is_open)
+
+    async def _refresh_quotes(self, targets: list[Target], now: float) -> None:
+        """One batched refresh for every due quote; settled closed ones are just extended."""
+        fetch = []
+        for target in targets:
+            _, market, symbol, _ = target
+            state = market_hours.session(symbol, market, now)
+            ttl = data_service.quote_ttl(symbol, market, now)
+            if not await self._claim(target, state, now, ttl):
+                continue
+            if not state.is_open and target in self._settled:
+                quote = data_service.quote_cache.get((market, symbol))
+                if quote is not None:
+                    data_service.quote_cache.set((market, symbol), "", quote, ttl)
+                    self.extended += 1
+                    continue
+            fetch.append((target, state))
+        if not fetch:
+            return
+        items = [{"symbol": t[2], "market": t[1], "name": self._names.get((t[1], t[2]), "")}
+                 for t, _ in fetch]
+        _, missing = await data_service.refresh_quotes(items)
+        failed = {(m["market"], m["symbol"]) for m in missing}
+        for target, state in fetch:
+            if (target[1], target[2]) in failed:
+                self.failed += 1
+                self._due[target] = now + RETRY_DELAY
+            else:
+                self.refreshed += 1
+                self._settle(target, state.is_open)
+
+    async def _claim(self, target: Target, state: market_hours.Session, now: float,
+                     ttl: float) -> bool:
+        """Schedule the target's next refresh; False if another worker holds it.
+
+        The next refresh is ``REFRESH_AHEAD`` into the lifetime, or at the
+        open when the market is closed. The lease lasts until then, so one
+        worker keeps a target for as long as it keeps refreshing it.
+        """
+        due = now + ttl * REFRESH_AHEAD
+        if not state.is_open and state.next_change is not None:
+            due = min(due, state.next_change)
+        self._due[target] = due
+        return await self._backend.lease("prefetch:" + ":".join(target), max(due - now, TICK) + TICK)
+
+    def _settle(self, target: Target, is_open: bool) -> None:
+        if is_open:
+            self._settled.discard(target)
+        else:
+            self._settled.add(target)
+
+    @staticmethod
+    def _closed_ttl(state: market_hours.Session, now: float, ttl: float) -> float:
+        until_open = state.seconds_to_change(now)
+        if until_open is None:
+            return MAX_CLOSED_TTL
+        return max(ttl, min(until_open, MAX_CLOSED_TTL))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ENABLED,
+            "running": self._task is not None,
+            "targets": len(self.targets()),
+            "refreshed": self.refreshed,
+            "extended": self.extended,
+            "failed": self.failed,
+        }
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,85 @@
+"""Opt-in sampling profiler for live diagnosis.
+
+A background thread snapshots every thread's Python stack at a fixed
+interval (``sys._current_frames``) and counts identical stacks. The result
+is in the collapsed-stack format ("frame;frame;frame count" per line) that
+flamegraph.pl, speedscope and inferno read directly.
+
+The profiler only runs when a profile is requested, and requests are
+refused unless ``CHARTBANK_PROFILING=1``, since a profile exposes code
+paths and costs CPU while sampling.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+
+ENABLED = os.getenv("CHARTBANK_PROFILING", "") == "1"
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL = 0.001
+
+
+class ProfilerBusy(RuntimeError):
+    """A profile is already being taken."""
+
+
+class SamplingProfiler:
+    """Counts sampled stacks of every thread but its own."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = max(interval, MIN_INTERVAL)
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+
+_running: SamplingProfiler | None = None
+
+
+async def profile(seconds: float, interval: float = 0.005) -> SamplingProfiler:
+    """Sample the whole process for ``seconds``; one profile at a time."""
+    global _running
+    if _running is not None:
+        raise ProfilerBusy("a profile is already running")
+    profiler = _running = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(min(seconds, MAX_SECONDS))
+    finally:
+        profiler.stop()
+        _running = None
+    return profiler
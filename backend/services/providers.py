@@ -0,0 +1,88 @@
+"""Async access to the blocking market data providers.
+
+yfinance and the ccxt client we use are synchronous, so every upstream call
+runs on a dedicated, size-limited thread pool per provider with a timeout.
+A slow Yahoo call can then only tie up Yahoo's workers, never the event
+loop or Binance traffic. Each pool also owns the provider's ``Governor``
+(rate limit, retries, circuit breaker); provider functions that reach the
+upstream are wrapped with ``governed``.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from services import metrics
+from services.governor import Governor, UpstreamError, UpstreamTimeout  # noqa: F401
+
+T = TypeVar("T")
+
+# provider -> (max concurrent upstream calls, timeout in seconds)
+PROVIDER_LIMITS = {
+    "yahoo": (int(os.getenv("YAHOO_WORKERS", "8")), float(os.getenv("YAHOO_TIMEOUT", "20"))),
+    "binance": (int(os.getenv("BINANCE_WORKERS", "8")), float(os.getenv("BINANCE_TIMEOUT", "15"))),
+}
+
+# provider -> (sustained upstream calls per second, burst)
+PROVIDER_RATES = {
+    "yahoo": (float(os.getenv("YAHOO_RATE", "2")), float(os.getenv("YAHOO_BURST", "10"))),
+    "binance": (float(os.getenv("BINANCE_RATE", "10")), float(os.getenv("BINANCE_BURST", "20"))),
+}
+
+
+def provider_for(market: str) -> str:
+    """Name of the upstream provider serving a market."""
+    return "binance" if market == "crypto" else "yahoo"
+
+
+class ProviderPool:
+    """Thread pool plus timeout for one provider's blocking calls."""
+
+    def __init__(self, name: str, max_workers: int, timeout: float,
+                 governor: Governor | None = None):
+        self.name = name
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.governor = governor or Governor(name, *PROVIDER_RATES.get(name, (10.0, 20.0)))
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (e.g. its governor priority) into the thread
+        ctx = contextvars.copy_context()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self.executor, ctx.run, fn, *args), self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.governor.timed_out(getattr(fn, "__name__", ""))
+            raise UpstreamTimeout(self.name, self.timeout) from None
+
+
+pools = {name: ProviderPool(name, *limits) for name, limits in PROVIDER_LIMITS.items()}
+
+metrics.Gauge(
+    "chartbank_upstream_circuit_open", "1 while a provider's circuit breaker fails calls fast",
+    ["provider"],
+    collect=lambda: [({"provider": n}, int(p.governor.breaker.state != "closed")) for n, p in pools.items()],
+)
+
+
+def governed(provider: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator routing a blocking upstream call through the provider's governor."""
+    def wrap(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            result = pools[provider].governor.call(fn, *args, **kwargs)
+            if not result:
+                metrics.UPSTREAM_EMPTY.inc(provider=provider, call=fn.__name__)
+            return result
+        return call
+    return wrap
+
+
+async def run(market: str, fn: Callable[..., T], *args) -> T:
+    """Run a blocking provider call for a market on that provider's pool."""
+    return await pools[provider_for(market)].run(fn, *args)
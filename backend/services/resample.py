@@ -0,0 +1,144 @@
+"""Build higher timeframes from a base OHLCV series.
+
+Intervals are written as ``<count><unit>`` with unit m (minute), h (hour),
+d (day), w (week) or M (month), e.g. ``10m``, ``4h``, ``3d``, ``1M``.
+
+Intraday buckets are aligned either to the Unix epoch (24/7 markets) or to
+the start of each trading session, so a 4h stock bar starts at the open
+rather than at a UTC multiple of four hours. Day buckets count calendar days
+from the epoch, weeks start on Monday and months follow the calendar.
+"""
+
+import re
+
+import numpy as np
+
+from models.bars import Bars
+
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800, "M": 2678400}
+
+# A gap longer than this (or one base bar, if longer) starts a new session
+SESSION_GAP = 2 * 3600
+
+DAY_SHIFT = 12 * 3600
+
+_INTERVAL_RE = re.compile(r"^(\d{1,4})([mhdwM])$")
+
+
+class InvalidInterval(ValueError):
+    """The interval string is not ``<count><unit>``."""
+
+
+def parse_interval(interval: str) -> tuple[int, str]:
+    """Split ``"10m"`` into ``(10, "m")``."""
+    match = _INTERVAL_RE.match(interval)
+    if not match or int(match.group(1)) == 0:
+        raise InvalidInterval(f"Unsupported interval: {interval!r}")
+    return int(match.group(1)), match.group(2)
+
+
+def interval_seconds(interval: str) -> int:
+    """Nominal bar length in seconds (months count as 31 days)."""
+    count, unit = parse_interval(interval)
+    return count * UNIT_SECONDS[unit]
+
+
+def base_interval(interval: str, native: list[str]) -> str | None:
+    """Pick the native interval to derive ``interval`` from.
+
+    Returns None when the interval is itself native. Otherwise the coarsest
+    native interval that evenly divides it is used, so as little upstream
+    data as possible has to be aggregated.
+    """
+    if interval in native:
+        return None
+    count, unit = parse_interval(interval)
+    target = interval_seconds(interval)
+    best = None
+    for candidate in native:
+        c_count, c_unit = parse_interval(candidate)
+        if unit == "M":
+            ok = c_unit == "M" and count % c_count == 0 or c_unit == "d" and c_count == 1
+        elif unit == "w":
+            ok = c_unit == "w" and count % c_count == 0 or c_unit == "d" and c_count == 1
+        elif unit == "d":
+            ok = c_unit == "d" and count % c_count == 0
+        else:
+            ok = c_unit in ("m", "h") and target % interval_seconds(candidate) == 0
+        if ok and (best is None or interval_seconds(candidate) > interval_seconds(best)):
+            best = candidate
+    if best is None:
+        raise InvalidInterval(f"Cannot derive {interval!r} from {native}")
+    return best
+
+
+def _bucket_keys(times: np.ndarray, interval: str, align: str, base_step: int,
+                 origin: int | None = None) -> np.ndarray:
+    """One key per bar; consecutive bars with equal keys form a bucket.
+
+    Intraday keys are the bucket's start time in Unix seconds. ``origin``
+    overrides the start of the first session (used when re-aggregating a
+    tail that begins mid-session).
+    """
+    count, unit = parse_interval(interval)
+    if unit in ("M", "w", "d"):
+        # Daily bars are stamped at local midnight, which is the previous UTC
+        # day for Asian exchanges; shifting half a day recovers the trade date
+        days = (times + DAY_SHIFT) // 86400
+        if unit == "M":
+            months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+            return months // count
+        if unit == "w":
+            # Epoch day 0 was a Thursday; shift so weeks start on Monday
+            return (days + 3) // (7 * count)
+        return days // count
+
+    period = interval_seconds(interval)
+    if align == "epoch":
+        return times - times % period
+
+    gap = max(SESSION_GAP, base_step)
+    new_session = np.empty(len(times), dtype=bool)
+    new_session[0] = True
+    new_session[1:] = np.diff(times) > gap
+    opens = times[new_session]
+    if origin is not None:
+        opens[0] = origin
+    session_start = opens[np.cumsum(new_session) - 1]
+    return session_start + (times - session_start) // period * period
+
+
+def resample(bars: Bars, interval: str, align: str = "epoch", base_step: int = 60,
+             origin: int | None = None) -> Bars:
+    """Aggregate ``bars`` into ``interval`` buckets (first/max/min/last/sum)."""
+    if not bars:
+        return Bars.empty()
+    keys = _bucket_keys(bars.time, interval, align, base_step, origin)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    intraday = parse_interval(interval)[1] in ("m", "h")
+    return Bars(
+        keys[starts] if intraday else bars.time[starts],
+        bars.open[starts],
+        np.maximum.reduceat(bars.high, starts),
+        np.minimum.reduceat(bars.low, starts),
+        bars.close[ends],
+        np.round(np.add.reduceat(bars.volume, starts), 2),
+    )
+
+
+def update(derived: Bars | None, base: Bars, interval: str, align: str = "epoch",
+           base_step: int = 60) -> Bars:
+    """Bring a derived series up to date with its base series.
+
+    Only base bars from the start of the last derived bucket onward are
+    re-aggregated, so each refresh costs O(new bars), not O(history).
+    Derived bars that end before the base window are dropped with it.
+    """
+    if not derived or not base or base.time[0] > derived.time[-1]:
+        return resample(base, interval, align, base_step)
+    last = int(derived.time[-1])
+    tail = base[int(np.searchsorted(base.time, last, side="left")):]
+    merged = derived.merge(resample(tail, interval, align, base_step, origin=last))
+    first = int(np.searchsorted(merged.time, base.time[0], side="right")) - 1
+    return merged[max(first, 0):]
@@ -0,0 +1,121 @@
+"""Startup cost accounting and readiness.
+
+yfinance (with pandas) and ccxt take most of a cold start, so the providers
+import them on first use (``load``) rather than at import time, and the
+server answers ``/api/health`` as soon as the app module is loaded. The
+lifespan's warm-up (``warm_up``, on unless ``CHARTBANK_WARMUP=0``) then
+loads them on a worker thread, and ``/api/health/ready`` reports ready once
+it has finished.
+
+Every step is timed into ``report``: the app's own imports (``mark``),
+each lazily imported module, provider initialization and the warm-up.
+"""
+
+import asyncio
+import contextlib
+import importlib
+import os
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Callable, Iterator
+
+WARM_UP = os.getenv("CHARTBANK_WARMUP", "1") != "0"
+
+# Modules the warm-up imports, in order (pandas first, so yfinance's own cost shows)
+WARM_MODULES = ("pandas", "yfinance", "ccxt")
+
+
+class StartupReport:
+    """Seconds spent per startup step, in the order the steps finished."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self.steps: dict[str, float] = {}
+        self.warming = False
+        self.warmed = False
+        self.error: str | None = None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.steps[name] = self.steps.get(name, 0.0) + seconds
+
+    def mark(self, name: str) -> None:
+        """Time since the previous mark (the first: since this module was imported) as ``name``."""
+        now = time.perf_counter()
+        self.add(name, now - self._last_mark)
+        self._last_mark = now
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed or not self.warming
+
+    def stats(self) -> dict:
+        with self._lock:
+            steps = {name: round(seconds, 4) for name, seconds in self.steps.items()}
+        return {
+            "ready": self.ready,
+            "warming": self.warming,
+            "error": self.error,
+            "steps": steps,
+        }
+
+
+report = StartupReport()
+_import_lock = threading.RLock()  # reentrant: a module being loaded may ``load`` another
+# Modules whose import has returned; ``sys.modules`` also holds ones still executing
+_loaded: dict[str, ModuleType] = {}
+
+
+@contextlib.contextmanager
+def timed(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        report.add(name, time.perf_counter() - start)
+
+
+def load(name: str) -> ModuleType:
+    """Import a module on first use, timing the import into the report.
+
+    A module another thread is still importing is waited for, never
+    returned half-initialized.
+    """
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    with _import_lock:  # one thread imports, the others wait for it
+        module = _loaded.get(name)
+        if module is None:
+            if name in sys.modules:  # imported elsewhere, maybe still running
+                module = importlib.import_module(name)
+            else:
+                with timed("import " + name):
+                    module = importlib.import_module(name)
+            _loaded[name] = module
+    return module
+
+
+def warm_up(init: Callable[[], None] | None = None) -> None:
+    """Import the heavy provider modules and run ``init`` (blocking; call off the loop)."""
+    for name in WARM_MODULES:
+        load(name)
+    if init is not None:
+        init()
+
+
+async def start_warm_up(init: Callable[[], None] | None = None) -> None:
+    """Run ``warm_up`` on a thread; readiness follows it, failures included."""
+    report.warming = True
+    try:
+        with timed("warm-up"):
+            await asyncio.to_thread(warm_up, init)
+    except Exception as exc:  # first use retries the import and reports the real error
+        report.error = f"{type(exc).__name__}: {exc}"[:200]
+    finally:
+        report.warming = False
+        report.warmed = True
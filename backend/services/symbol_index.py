@@ -0,0 +1,195 @@
+"""In-memory symbol search with prefix, substring and typo-tolerant matching.
+
+The index holds the bundled equity/FX/futures/commodity/index universe from
+``data/symbols.json`` plus every active Binance spot market, so a query never
+touches an upstream. Each symbol is indexed under a few search terms: the
+ticker with punctuation removed (``BTC/USDT`` -> ``BTCUSDT``, ``^N225`` ->
+``N225``), the ticker's root (``BTC``, ``EURUSD``) and the words of its name.
+
+Matches rank as: exact term, term prefix, substring, then one edit away
+(insert/delete/substitute/transpose). Typos are found through a table of
+single-character deletions of every term, so lookups stay O(query length)
+instead of comparing the query against each symbol.
+"""
+
+import bisect
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+DEFAULT_FILE = Path(__file__).resolve().parent.parent / "data" / "symbols.json"
+
+# Re-load the Binance market list this often
+CRYPTO_REFRESH_SECONDS = 6 * 3600
+
+# Terms shorter than this are only matched exactly or by prefix
+MIN_FUZZY_LEN = 3
+
+EXACT, PREFIX, NAME_EXACT, NAME_PREFIX, SUBSTRING, FUZZY = range(6)
+
+_WORD_RE = re.compile(r"[A-Z0-9]+")
+_SUFFIX_RE = re.compile(r"=[XF]$|\.[A-Z]+$")
+
+
+def _normalize(text: str) -> str:
+    return "".join(_WORD_RE.findall(text.upper()))
+
+
+def _symbol_terms(symbol: str) -> list[str]:
+    """Search terms for a ticker: the bare ticker and its root."""
+    terms = [_normalize(symbol)]
+    root = symbol.split("/")[0] if "/" in symbol else _SUFFIX_RE.sub("", symbol.upper())
+    root = _normalize(root)
+    if root and root != terms[0]:
+        terms.append(root)
+    return terms
+
+
+def _deletes(term: str) -> set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by one insert, delete, substitution or transposition."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (len(diff) == 2 and diff[1] == diff[0] + 1
+                and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class _Snapshot:
+    """Immutable lookup tables over one list of symbols."""
+
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        pairs: list[tuple[str, int, bool]] = []  # (term, entry id, is_symbol_term)
+        for i, entry in enumerate(entries):
+            for term in _symbol_terms(entry["symbol"]):
+                pairs.append((term, i, True))
+            for word in _WORD_RE.findall(entry.get("name", "").upper()):
+                pairs.append((word, i, False))
+        pairs.sort()
+        self.terms = [p[0] for p in pairs]
+        self.postings = [(p[1], p[2]) for p in pairs]
+        self.haystacks = [
+            f"{_normalize(e['symbol'])} {_normalize(e.get('name', ''))}" for e in entries
+        ]
+        self.deletes: dict[str, set[int]] = {}
+        for t, term in enumerate(self.terms):
+            if len(term) >= MIN_FUZZY_LEN:
+                for d in _deletes(term) | {term}:
+                    self.deletes.setdefault(d, set()).add(t)
+
+
+class SymbolIndex:
+    """Searchable symbol universe, replaceable one market at a time.
+
+    Lookups read an immutable snapshot, so a refresh never blocks a search.
+    """
+
+    def __init__(self):
+        self._markets: dict[str, list[dict]] = {}
+        self._rank: dict[tuple[str, str], int] = {}
+        self._snapshot = _Snapshot([])
+        self._lock = threading.Lock()
+        self.crypto_loaded_at = 0.0
+
+    def replace_market(self, market: str, entries: list[dict]) -> None:
+        """Swap in a market's symbol list (first entry wins per symbol)."""
+        unique = {}
+        for e in entries:
+            unique.setdefault(e["symbol"], {**e, "market": market})
+        with self._lock:
+            self._markets[market] = list(unique.values())
+            self._snapshot = _Snapshot([e for lst in self._markets.values() for e in lst])
+
+    def set_popular(self, symbols: dict[str, list[dict]]) -> None:
+        """Rank these symbols (per market, in order) above the rest on ties."""
+        self._rank = {
+            (market, s["symbol"]): i for market, lst in symbols.items() for i, s in enumerate(lst)
+        }
+
+    def search(self, query: str, market: str = "", limit: int = 20) -> list[dict]:
+        q = _normalize(query)
+        if not q:
+            return []
+        snap = self._snapshot
+        best: dict[int, int] = {}
+
+        def hit(i: int, score: int) -> None:
+            entry = snap.entries[i]
+            if market and entry["market"] != market:
+                return
+            if score < best.get(i, FUZZY + 1):
+                best[i] = score
+
+        lo = bisect.bisect_left(snap.terms, q)
+        hi = bisect.bisect_left(snap.terms, q + "\x7f")
+        for t in range(lo, hi):
+            i, is_symbol = snap.postings[t]
+            exact = snap.terms[t] == q
+            if is_symbol:
+                hit(i, EXACT if exact else PREFIX)
+            else:
+                hit(i, NAME_EXACT if exact else NAME_PREFIX)
+
+        if len(best) < limit:
+            for i, hay in enumerate(snap.haystacks):
+                if q in hay:
+                    hit(i, SUBSTRING)
+
+        if len(best) < limit and len(q) >= MIN_FUZZY_LEN:
+            seen: set[int] = set()
+            for d in _deletes(q) | {q}:
+                for t in snap.deletes.get(d, ()):
+                    if t not in seen:
+                        seen.add(t)
+                        if _within_one_edit(q, snap.terms[t]):
+                            hit(snap.postings[t][0], FUZZY)
+
+        rank = self._rank
+        order = sorted(best, key=lambda i: (
+            best[i],
+            rank.get((snap.entries[i]["market"], snap.entries[i]["symbol"]), len(rank)),
+            len(snap.entries[i]["symbol"]),
+            snap.entries[i]["symbol"],
+        ))
+        return [snap.entries[i] for i in order[:limit]]
+
+    def crypto_stale(self) -> bool:
+        return time.time() - self.crypto_loaded_at > CRYPTO_REFRESH_SECONDS
+
+    def load_file(self, path: str | Path = DEFAULT_FILE) -> None:
+        """Load the bundled non-crypto universe."""
+        with open(path, encoding="utf-8") as f:
+            for market, entries in json.load(f).items():
+                self.replace_market(market, entries)
+
+    def refresh_crypto(self, list_markets: Callable[[], list[dict]]) -> None:
+        """Replace the crypto universe with the exchange's current market list."""
+        self.crypto_loaded_at = time.time()
+        try:
+            entries = list_markets()
+        except Exception:
+            entries = []
+        if entries:
+            self.replace_market("crypto", entries)
+        else:
+            # Upstream failed; try again in a minute rather than in hours
+            self.crypto_loaded_at -= CRYPTO_REFRESH_SECONDS - 60
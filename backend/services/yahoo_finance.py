@@ -1,17 +1,21 @@
-"""Yahoo Finance data service for stocks, forex, futures, commodities, indices."""
+"""Yahoo Finance data service for stocks, forex, futures, commodities, indices.
 
-import yfinance as yf
-from typing import List
-from models.market_data import OHLCV
+yfinance (and pandas with it) is imported on the first call, not when this
+module is imported.
+"""
 
-# Interval mapping: frontend label -> yfinance interval
+from datetime import datetime, timezone
+from models.bars import Bars
+from services import metrics, startup
+from services.governor import UpstreamError, UpstreamThrottled, UpstreamUnavailable
+from services.providers import governed
+
+# Interval mapping: frontend label -> yfinance interval.
+# 15m/30m/4h and custom intervals are resampled from 5m/1h (same history depth)
 INTERVAL_MAP = {
     "1m": "1m",
     "5m": "5m",
-    "15m": "15m",
-    "30m": "30m",
     "1h": "1h",
-    "4h": "4h",
     "1d": "1d",
     "1w": "1wk",
     "1M": "1mo",
@@ -21,45 +25,72 @@ INTERVAL_MAP = {
 PERIOD_MAP = {
     "1m": "7d",
     "5m": "60d",
-    "15m": "60d",
-    "30m": "60d",
     "1h": "730d",
-    "4h": "730d",
     "1d": "5y",
     "1w": "10y",
     "1M": "max",
 }
 
 
-def fetch_ohlcv(symbol: str, interval: str = "1d") -> List[OHLCV]:
-    """Fetch OHLCV data from Yahoo Finance."""
+def yfinance():
+    """The yfinance module, imported on first use."""
+    return startup.load("yfinance")
+
+
+def upstream_error(exc: Exception) -> UpstreamError:
+    """Classify a yfinance/HTTP exception.
+
+    yfinance raises YFRateLimitError on HTTP 429 (older versions only put
+    "Too Many Requests" in the message); network errors come from requests
+    or curl_cffi, both OSError-based or named like one.
+    """
+    text = str(exc)[:200]
+    name = type(exc).__name__
+    if name == "YFRateLimitError" or "Too Many Requests" in text or "429" in text:
+        return UpstreamThrottled("yahoo", text)
+    if isinstance(exc, OSError) or name in ("ConnectionError", "Timeout", "RequestsError", "CurlError"):
+        return UpstreamUnavailable("yahoo", text)
+    return UpstreamError("yahoo", text)
+
+
+@governed("yahoo")
+def fetch_ohlcv(symbol: str, interval: str = "1d", start: int | None = None) -> Bars:
+    """Fetch OHLCV data from Yahoo Finance.
+
+    With ``start`` (Unix seconds) only bars from that time onward are fetched
+    instead of the full ``PERIOD_MAP`` window.
+    """
     yf_interval = INTERVAL_MAP.get(interval, "1d")
     period = PERIOD_MAP.get(interval, "5y")
 
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(period=period, interval=yf_interval)
+    ticker = yfinance().Ticker(symbol)
+    try:
+        if start is not None:
+            df = ticker.history(
+                start=datetime.fromtimestamp(start, tz=timezone.utc), interval=yf_interval
+            )
+        else:
+            df = ticker.history(period=period, interval=yf_interval)
+    except Exception as exc:
+        raise upstream_error(exc) from exc
 
     if df.empty:
-        return []
-
-    bars: List[OHLCV] = []
-    for ts, row in df.iterrows():
-        bars.append(OHLCV(
-            time=int(ts.timestamp()),
-            open=round(row["Open"], 6),
-            high=round(row["High"], 6),
-            low=round(row["Low"], 6),
-            close=round(row["Close"], 6),
-            volume=round(row["Volume"], 2),
-        ))
+        return Bars.empty()
+
+    with metrics.CONVERT_SECONDS.time(provider="yahoo"):
+        bars = Bars.from_dataframe(df)
+    metrics.BARS_CONVERTED.inc(len(bars), provider="yahoo")
     return bars
 
 
+@governed("yahoo")
 def fetch_quote(symbol: str, name: str = "", market: str = "") -> dict | None:
     """Fetch current quote for a single Yahoo Finance symbol."""
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = yfinance().Ticker(symbol).info
+    except Exception as exc:
+        raise upstream_error(exc) from exc
+    try:
         price = info.get("currentPrice") or info.get("regularMarketPrice", 0)
         prev = info.get("previousClose") or info.get("regularMarketPreviousClose", 0)
         change = round(price - prev, 6) if price and prev else 0
@@ -77,21 +108,52 @@ def fetch_quote(symbol: str, name: str = "", market: str = "") -> dict | None:
             "prev_close": round(prev, 6),
         }
     except Exception:
-        return None
+        return None  # no price in the info
+
 
+@governed("yahoo")
+def fetch_quotes(items: list[dict]) -> dict[str, dict]:
+    """Fetch quotes for many symbols with one multi-symbol download.
 
-def search_symbols(query: str, market: str = "") -> list:
-    """Basic symbol search using yfinance."""
+    Prices come from the last two daily bars. Returns {symbol: quote};
+    symbols without data are left out for the caller to retry one by one.
+    """
+    symbols = list(dict.fromkeys(item["symbol"] for item in items))
     try:
-        ticker = yf.Ticker(query.upper())
-        info = ticker.info
-        if info and info.get("symbol"):
-            return [{
-                "symbol": info["symbol"],
-                "name": info.get("shortName", info.get("longName", query)),
-                "market": market,
-                "exchange": info.get("exchange", ""),
-            }]
-    except Exception:
-        pass
-    return []
+        df = yfinance().download(
+            symbols, period="5d", interval="1d", group_by="ticker",
+            auto_adjust=False, progress=False, threads=True,
+        )
+    except Exception as exc:
+        raise upstream_error(exc) from exc
+    if df is None or df.empty:
+        return {}
+
+    quotes: dict[str, dict] = {}
+    for item in items:
+        symbol = item["symbol"]
+        try:
+            rows = df[symbol] if df.columns.nlevels > 1 else df
+            rows = rows.dropna(subset=["Close"])
+        except KeyError:
+            continue
+        if rows.empty:
+            continue
+        last = rows.iloc[-1]
+        price = float(last["Close"])
+        prev = float(rows.iloc[-2]["Close"]) if len(rows) > 1 else float(last["Open"])
+        change = round(price - prev, 6) if price and prev else 0
+        pct = round((change / prev) * 100, 2) if prev else 0
+        quotes[symbol] = {
+            "symbol": symbol,
+            "name": item.get("name") or symbol,
+            "market": item.get("market", ""),
+            "price": round(price, 6),
+            "change": change,
+            "change_percent": pct,
+            "high": round(float(last["High"]), 6),
+            "low": round(float(last["Low"]), 6),
+            "volume": float(last["Volume"]) if last["Volume"] == last["Volume"] else 0,
+            "prev_close": round(prev, 6),
+        }
+    return quotes
@@ -0,0 +1,66 @@
+import os
+
+# Keep tests off the on-disk history under backend/data
+os.environ.setdefault("CHARTBANK_HISTORY_DIR", "")
+
+# ...and off the network: no background cache warming or provider warm-up
+os.environ.setdefault("CHARTBANK_PREFETCH", "0")
+os.environ.setdefault("CHARTBANK_WARMUP", "0")
+
+import time  # noqa: E402
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+from models.bars import Bars  # noqa: E402
+from services import data_service  # noqa: E402
+from services.cache import TTLCache  # noqa: E402
+from services.candle_store import CandleStore  # noqa: E402
+from services.governor import UpstreamUnavailable  # noqa: E402
+
+
+def make_bars(times, close=1.0):
+    """Flat bars at ``times``: every price ``close``, volume 1."""
+    n = len(times)
+    return Bars(times, [close] * n, [close] * n, [close] * n, [close] * n, [1.0] * n)
+
+
+def hourly_bars(count: int) -> Bars:
+    """``count`` 1h bars up to the current hour (open 1, high 2, low 0.5, close 1.5)."""
+    end = int(time.time()) // 3600 * 3600
+    times = np.arange(end - 3600 * (count - 1), end + 1, 3600)
+    return Bars(times, times * 0 + 1, times * 0 + 2, times * 0 + 0.5, times * 0 + 1.5, times * 0 + 10)
+
+
+class ChartUpstream:
+    """Chart provider stand-in for the candle store.
+
+    Serves ``bars`` (or whatever ``serve(symbol, market, interval, since)``
+    returns), records every fetch in ``calls`` as ``(symbol, interval, since)``,
+    sleeps ``delays[symbol]`` seconds first and fails while ``down`` is set.
+    """
+
+    def __init__(self, bars: Bars):
+        self.bars = bars
+        self.serve = None
+        self.calls: list[tuple] = []
+        self.delays: dict[str, float] = {}
+        self.down = False
+
+    def __call__(self, symbol, market, interval, since):
+        self.calls.append((symbol, interval, since))
+        time.sleep(self.delays.get(symbol, 0))
+        if self.down:
+            raise UpstreamUnavailable("yahoo", "connection reset")
+        if self.serve is not None:
+            return self.serve(symbol, market, interval, since)
+        return self.bars
+
+
+@pytest.fixture
+def upstream(monkeypatch) -> ChartUpstream:
+    """48 1h bars per symbol from memory, behind a fresh chart cache and candle store."""
+    fake = ChartUpstream(hourly_bars(48))
+    monkeypatch.setattr(data_service, "chart_cache", TTLCache())
+    monkeypatch.setattr(data_service, "candle_store", CandleStore(fake))
+    return fake
@@ -0,0 +1,167 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from models.bars import Bars
+from services import backend as backend_mod, broker
+from services.backend import Backend, BrokerBackend, InProcessBackend, load_shared, shared_stream
+
+
+async def start_broker():
+    server = await broker.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"tcp://127.0.0.1:{port}"
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+@pytest.fixture(autouse=True)
+def fast_leases(monkeypatch):
+    monkeypatch.setattr(backend_mod, "STREAM_LEASE_SECONDS", 0.3)
+    monkeypatch.setattr(backend_mod, "RECONNECT_SECONDS", 0.05)
+
+
+def test_a_backend_must_implement_the_whole_store():
+    class Partial(Backend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_values_leases_and_channels_through_the_broker():
+    async def main():
+        server, address = await start_broker()
+        a, b = BrokerBackend(address), BrokerBackend(address)
+
+        await a.set("k", b"v", ttl=0.2)
+        assert await b.get("k") == b"v"
+        await asyncio.sleep(0.25)
+        assert await b.get("k") is None
+
+        assert await a.lease("job", 0.2)
+        assert await a.lease("job", 0.2)      # renewal
+        assert not await b.lease("job", 0.2)
+        await a.release("job")
+        assert await b.lease("job", 0.2)
+
+        sub_a, sub_b = a.subscribe("ch"), b.subscribe("ch")
+        await asyncio.sleep(0.05)
+        await a.publish("ch", b"hello")
+        assert await sub_a.get() == b"hello" and await sub_b.get() == b"hello"
+        sub_a.close()
+        sub_b.close()
+
+        assert server.broker.stats()["clients"] == 2
+        await a.close()
+        await b.close()
+        server.close()
+
+    run(main())
+
+
+def test_load_shared_fetches_once_across_workers():
+    bars = Bars([1, 2], [1, 1], [2, 2], [0, 0], [1.5, 1.5], [10, 10])
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return bars
+
+    async def main():
+        server, address = await start_broker()
+        workers = [BrokerBackend(address) for _ in range(4)]
+        results = await asyncio.gather(*(
+            load_shared(w, "chart:x", 60, loader, Bars.to_bytes, Bars.from_bytes) for w in workers
+        ))
+        for w in workers:
+            await w.close()
+        server.close()
+        return results
+
+    results = run(main())
+    assert len(calls) == 1
+    for r in results:
+        np.testing.assert_array_equal(r.close, bars.close)
+
+
+def test_shared_stream_has_one_producer_and_fails_over():
+    produced = {"a": 0, "b": 0}
+
+    def producer(name):
+        async def produce():
+            for i in range(1000):
+                produced[name] += 1
+                yield {"n": i}
+                await asyncio.sleep(0.01)
+        return produce
+
+    async def consume(backend, name, out, stop):
+        async def go():
+            async for item in shared_stream(backend, "feed", producer(name),
+                                            lambda x: str(x["n"]).encode(),
+                                            lambda d: {"n": int(d)}):
+                out.append(item["n"])
+        task = asyncio.create_task(go())
+        await stop.wait()
+        task.cancel()
+
+    async def main():
+        server, address = await start_broker()
+        a, b = BrokerBackend(address), BrokerBackend(address)
+        out_a, out_b = [], []
+        stop_a, stop_b = asyncio.Event(), asyncio.Event()
+        ta = asyncio.create_task(consume(a, "a", out_a, stop_a))
+        await asyncio.sleep(0.05)
+        tb = asyncio.create_task(consume(b, "b", out_b, stop_b))
+        await asyncio.sleep(0.3)
+        # Only one worker produced; both saw its items
+        assert produced["b"] == 0 and produced["a"] > 0
+        assert out_b and set(out_b) <= set(out_a)
+
+        # The producing worker leaves; the other takes over once the lease lapses
+        stop_a.set()
+        await ta
+        await asyncio.sleep(1.0)
+        assert produced["b"] > 0
+        stop_b.set()
+        await tb
+        await a.close()
+        await b.close()
+        server.close()
+
+    run(main())
+
+
+def test_broker_outage_falls_back_to_local():
+    async def main():
+        server, address = await start_broker()
+        server.close()
+        await server.wait_closed()
+        w = BrokerBackend(address)
+        assert await w.get("k") is None
+        assert await w.lease("job", 1)
+        sub = w.subscribe("ch")
+        await w.publish("ch", b"x")
+        assert sub.queue.get_nowait() == b"x"
+        assert not w.stats()["connected"]
+
+    run(main())
+
+
+def test_in_process_backend_streams_directly():
+    async def produce():
+        for i in range(3):
+            yield i
+
+    async def main():
+        b = InProcessBackend()
+        assert not b.shared
+        return [x async for x in shared_stream(b, "c", produce, None, None)]
+
+    assert run(main()) == [0, 1, 2]
@@ -0,0 +1,45 @@
+import numpy as np
+
+from bench import harness, load
+from bench.fixtures import fake_upstream
+from services import binance, data_service, yahoo_finance
+
+
+def test_fakes_answer_through_the_real_providers():
+    with fake_upstream(bars=300) as upstream:
+        stocks = yahoo_finance.fetch_ohlcv("AAPL", "1h")
+        crypto = binance.fetch_ohlcv("BTC/USDT", "1h", since=int(stocks.time[-10]))
+        quotes = yahoo_finance.fetch_quotes([{"symbol": "AAPL"}, {"symbol": "MSFT"}])
+        pairs = binance.fetch_quotes([{"symbol": "BTC/USDT"}])
+    assert len(stocks) == 300 and np.all(np.diff(stocks.time) == 3600)
+    assert len(crypto) == 10
+    assert set(quotes) == {"AAPL", "MSFT"} and set(pairs) == {"BTC/USDT"}
+    # Every quote is a new price, stamped for the latency measurements
+    assert (("AAPL", quotes["AAPL"]["price"])) in upstream.sent
+    assert upstream.calls == 4
+
+
+def test_fake_upstream_restores_the_providers():
+    ticker, exchange = yahoo_finance.yfinance().Ticker, binance.exchange
+    with fake_upstream():
+        assert binance.exchange is not exchange
+    assert yahoo_finance.yfinance().Ticker is ticker and binance.exchange is exchange
+
+
+def test_compare_flags_only_regressions_past_the_tolerance():
+    result = harness.Result("case", latencies=[0.002] * 10, elapsed=0.02)
+    baseline = {"case": {"ops_per_s": 500.0, "p50_ms": 1.0, "p99_ms": 1.9}}
+    regressions = harness.compare([result], baseline, tolerance=0.25)
+    assert [r.split(":")[1].split()[0] for r in regressions] == ["p50_ms"]
+    assert harness.compare([result], {"other": baseline["case"]}) == []
+
+
+def test_rest_load_runs_offline(monkeypatch):
+    for name in ("chart_cache", "history_store", "candle_store"):
+        monkeypatch.setattr(data_service, name, getattr(data_service, name))
+    with fake_upstream(bars=200):
+        results = load.rest(requests=20, concurrency=5)
+    assert [r.name for r in results] == [
+        "rest.chart.cold", "rest.chart.warm", "rest.chart.derived", "rest.quotes",
+    ]
+    assert all(r.summary()["ops"] > 0 for r in results)
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services import cache
+from services.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_entries_expire_after_interval_ttl(clock):
+    c = TTLCache()
+    c.set("k", "1m", "v")
+    clock[0] += cache.TTL_MAP["1m"] - 1
+    assert c.get("k") == "v"
+    clock[0] += 1
+    assert c.get("k") is None
+    assert c.stats()["entries"] == 0
+
+
+def test_unknown_interval_uses_default_ttl(clock):
+    c = TTLCache()
+    c.set("k", "7m", "v")
+    clock[0] += cache.DEFAULT_TTL - 1
+    assert c.get("k") == "v"
+    clock[0] += 1
+    assert c.get("k") is None
+
+
+def test_lru_evicts_least_recently_used():
+    c = TTLCache(max_entries=2)
+    c.set("a", "1d", 1)
+    c.set("b", "1d", 2)
+    assert c.get("a") == 1  # "b" is now the oldest
+    c.set("c", "1d", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_by_nbytes():
+    c = TTLCache(max_bytes=2000)
+    c.set("a", "1d", np.zeros(100))  # 800 bytes
+    c.set("b", "1d", np.zeros(100))
+    c.set("c", "1d", np.zeros(100))
+    assert c.get("a") is None
+    assert c.stats()["bytes"] == 1600
+
+
+def test_get_or_load_caches_non_empty_values_only():
+    c = TTLCache()
+    assert c.get_or_load("empty", "1d", lambda: []) == []
+    assert c.get("empty") is None
+    assert c.get_or_load("k", "1d", lambda: [1]) == [1]
+    assert c.get_or_load("k", "1d", lambda: pytest.fail("reloaded")) == [1]
+
+
+def test_concurrent_misses_share_one_load():
+    c = TTLCache()
+    calls = []
+    started = threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return [42]
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(c.get_or_load("k", "1d", loader)))
+    owner.start()
+    started.wait()
+    waiters = [
+        threading.Thread(target=lambda: results.append(c.get_or_load("k", "1d", loader)))
+        for _ in range(4)
+    ]
+    for t in waiters:
+        t.start()
+    for t in [owner, *waiters]:
+        t.join()
+
+    assert calls == [1]
+    assert results == [[42]] * 5
+    assert c.stats()["coalesced"] == 4
+
+
+def test_failed_load_propagates_and_is_not_cached():
+    c = TTLCache()
+
+    def boom():
+        raise RuntimeError("upstream")
+
+    with pytest.raises(RuntimeError):
+        c.get_or_load("k", "1d", boom)
+    assert c.stats()["inflight"] == 0
+    assert c.get_or_load("k", "1d", lambda: [1]) == [1]
+
+
+def test_cancelled_async_owner_does_not_fail_waiters():
+    async def main():
+        c = TTLCache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return [7]
+
+        owner = asyncio.create_task(c.aget_or_load("k", "1d", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(c.aget_or_load("k", "1d", loader))
+        await asyncio.sleep(0)
+        owner.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await waiter == [7]
+        assert owner.cancelled()
+        assert c.get("k") == [7]
+
+    asyncio.run(main())
+
+
+def test_cancelled_async_waiter_leaves_load_running():
+    async def main():
+        c = TTLCache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return [7]
+
+        owner = asyncio.create_task(c.aget_or_load("k", "1d", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(c.aget_or_load("k", "1d", loader))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await owner == [7]
+
+    asyncio.run(main())
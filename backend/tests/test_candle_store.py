@@ -0,0 +1,110 @@
+import time
+
+from conftest import make_bars
+from models.bars import Bars
+from services.candle_store import MAX_GAP_BARS, CandleStore
+from services.history_store import HistoryStore
+
+STEP = 60
+
+
+class FakeUpstream:
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def __call__(self, symbol, market, interval, since):
+        self.calls.append(since)
+        if since is None:
+            return self.bars
+        return self.bars[int((self.bars.time >= since).argmax()):]
+
+
+def recent_times(n):
+    end = int(time.time()) // STEP * STEP
+    return [end - STEP * i for i in reversed(range(n))]
+
+
+def test_first_get_seeds_full_window():
+    upstream = FakeUpstream(make_bars(recent_times(10)))
+    store = CandleStore(upstream)
+    bars = store.get("BTC/USDT", "crypto", "1m")
+    assert len(bars) == 10
+    assert upstream.calls == [None]
+    assert store.stats()["seeds"] == 1
+
+
+def test_refresh_fetches_from_last_closed_bar_and_replaces_forming_bar():
+    times = recent_times(10)
+    upstream = FakeUpstream(make_bars(times, close=1.0))
+    store = CandleStore(upstream)
+    store.get("BTC/USDT", "crypto", "1m")
+
+    # The forming bar moved and a new bar opened
+    new_times = times + [times[-1] + STEP]
+    closes = [1.0] * 9 + [2.0, 3.0]
+    upstream.bars = Bars(new_times, closes, closes, closes, closes, [1.0] * 11)
+    bars = store.get("BTC/USDT", "crypto", "1m")
+
+    assert upstream.calls == [None, times[-2]]
+    assert bars.time.tolist() == new_times[-10:]
+    assert bars.close[-2:].tolist() == [2.0, 3.0]
+    assert store.stats()["increments"] == 1
+
+
+def test_readjusted_history_reseeds_and_rewrites_disk(tmp_path):
+    history = HistoryStore(tmp_path)
+    times = recent_times(10)
+    upstream = FakeUpstream(make_bars(times, close=10.0))
+    store = CandleStore(upstream, history)
+    store.get("AAPL", "stocks", "1m")
+    assert history.read("stocks", "AAPL", "1m").close.tolist() == [10.0] * 9
+
+    # A 2:1 split: every bar, including the closed ones we hold, is halved
+    upstream.bars = make_bars(times, close=5.0)
+    bars = store.get("AAPL", "stocks", "1m")
+
+    assert upstream.calls == [None, times[-2], None]
+    assert bars.close.tolist() == [5.0] * 10
+    assert history.read("stocks", "AAPL", "1m").close.tolist() == [5.0] * 9
+    assert store.stats()["readjustments"] == 1
+
+
+def test_readjustment_drops_derived_series():
+    times = recent_times(10)
+    upstream = FakeUpstream(make_bars(times, close=10.0))
+    store = CandleStore(upstream)
+    base = store.get("AAPL", "stocks", "1m")
+    store.derive("AAPL", "stocks", "5m", base, "1m", "epoch")
+
+    upstream.bars = make_bars(times, close=5.0)
+    base = store.get("AAPL", "stocks", "1m")
+    assert not store.peek("AAPL", "stocks", "5m")
+    derived = store.derive("AAPL", "stocks", "5m", base, "1m", "epoch")
+    assert set(derived.close.tolist()) == {5.0}
+
+
+def test_stale_series_is_reseeded():
+    old = [t - STEP * (MAX_GAP_BARS + 10) for t in recent_times(5)]
+    upstream = FakeUpstream(make_bars(old))
+    store = CandleStore(upstream)
+    store.get("BTC/USDT", "crypto", "1m")
+
+    upstream.bars = make_bars(recent_times(5))
+    store.get("BTC/USDT", "crypto", "1m")
+    assert upstream.calls == [None, None]
+    assert store.stats()["seeds"] == 2
+
+
+def test_empty_seed_is_not_stored():
+    store = CandleStore(FakeUpstream(Bars.empty()))
+    assert not store.get("X", "stocks", "1d")
+    assert store.stats()["series"] == 0
+
+
+def test_least_recent_series_is_dropped():
+    store = CandleStore(FakeUpstream(make_bars(recent_times(3))), max_series=2)
+    for symbol in ("A", "B", "C"):
+        store.get(symbol, "stocks", "1m")
+    assert not store.peek("A", "stocks", "1m")
+    assert store.peek("C", "stocks", "1m")
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import hourly_bars
+from main import app
+
+
+@pytest.fixture
+def client(upstream):
+    """100 1h bars per symbol; SLOW takes a while."""
+    upstream.bars = hourly_bars(100)
+    upstream.delays["SLOW"] = 0.3
+    return TestClient(app)
+
+
+def spec(symbol, **kw):
+    return {"market": "stocks", "symbol": symbol, "interval": "1h", **kw}
+
+
+def test_batch_streams_each_chart_as_it_is_ready(client, upstream):
+    res = client.post("/api/charts/batch", json={"charts": [
+        spec("SLOW"), spec("AAPL", limit=10, format="columnar"), spec("AAPL", limit=10, format="columnar"),
+        spec("MSFT"),
+    ]})
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [line["panels"] for line in lines][-1] == [0]  # the slow one comes last
+    by_symbol = {line["symbol"]: line for line in lines}
+    assert by_symbol["AAPL"]["panels"] == [1, 2]
+    assert len(by_symbol["AAPL"]["columns"]["time"]) == 10
+    assert len(by_symbol["MSFT"]["data"]) == 100
+    assert sorted(call[0] for call in upstream.calls) == ["AAPL", "MSFT", "SLOW"]
+
+
+def test_batch_reports_bad_panels_without_failing_the_rest(client):
+    res = client.post("/api/charts/batch", json={"charts": [spec("AAPL", interval="7x"), spec("MSFT")]})
+    lines = {line["panels"][0]: line for line in map(json.loads, res.text.splitlines())}
+    assert lines[0]["type"] == "error" and lines[0]["reason"] == "invalid"
+    assert lines[1]["type"] == "chart"
+
+    too_many = client.post("/api/charts/batch", json={"charts": [spec("AAPL")] * 17})
+    assert too_many.status_code == 422
+
+
+def test_websocket_batch(client):
+    with client.websocket_connect("/ws/chart") as ws:
+        ws.send_json({"action": "batch", "id": 7, "charts": [spec("AAPL"), spec("MSFT")]})
+        messages = [ws.receive_json() for _ in range(3)]
+    assert {m["symbol"] for m in messages[:2]} == {"AAPL", "MSFT"}
+    assert all(m["type"] == "chart" and m["id"] == 7 for m in messages[:2])
+    assert messages[2] == {"type": "batch_done", "id": 7}
@@ -0,0 +1,196 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.bars import Bars
+from ws import websocket
+from ws.chart_feed import ChartFeed, ChartHub, ChartSubscriber, ReplaySource
+
+KEY = ("crypto", "BTC/USDT", "1m")
+
+
+def bar(t, close, volume=1.0):
+    return {"time": t, "open": 1.0, "high": 9.0, "low": 0.5, "close": close, "volume": volume}
+
+
+def kline(t, close):
+    return {"e": "kline", "k": {"t": t * 1000, "o": "1", "h": "9", "l": "0.5", "c": str(close), "v": "1"}}
+
+
+def drain(sub):
+    out = []
+    while not sub.queue.empty():
+        out.append(json.loads(sub.queue.get_nowait()))
+    return out
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_update_vs_append():
+    messages = [
+        bar(0, 1.0),
+        bar(0, 2.0),     # forming bar moved
+        bar(0, 2.0),     # unchanged: nothing sent
+        kline(60, 3.0),  # new bar opened (Binance kline shape)
+        bar(0, 5.0),     # older than the last bar: ignored
+    ]
+
+    async def main():
+        hub = ChartHub(lambda key: ReplaySource(messages))
+        sub = ChartSubscriber()
+        hub.subscribe(sub, KEY)
+        await settle()
+        hub.remove(sub)
+        return drain(sub)
+
+    out = asyncio.run(main())
+    assert [(m["op"], m["bar"]["time"], m["bar"]["close"]) for m in out] == [
+        ("update", 0, 1.0), ("update", 0, 2.0), ("append", 60, 3.0),
+    ]
+    assert all(m["type"] == "bar" and m["symbol"] == "BTC/USDT" for m in out)
+
+
+def test_feeds_are_shared_and_torn_down_with_the_last_subscriber():
+    async def main():
+        hub = ChartHub(lambda key: ReplaySource([bar(0, 1.0)]))
+        a, b = ChartSubscriber(), ChartSubscriber()
+        hub.subscribe(a, KEY)
+        hub.subscribe(b, KEY)
+        await settle()
+        assert hub.stats() == {"feeds": 1, "subscriptions": 2}
+        task = hub._feeds[KEY].task
+
+        hub.unsubscribe(a, KEY)
+        assert hub.stats() == {"feeds": 1, "subscriptions": 1}
+        assert not a.keys and not task.done()
+
+        hub.remove(b)
+        await settle()
+        assert hub.stats() == {"feeds": 0, "subscriptions": 0}
+        assert task.cancelled()
+        # Both saw the same single delta
+        assert drain(a) == drain(b)
+
+    asyncio.run(main())
+
+
+def test_overflow_sends_resync_instead_of_dropping_deltas():
+    messages = [bar(t * 60, 1.0) for t in range(600)]
+
+    async def main():
+        hub = ChartHub(lambda key: ReplaySource(messages))
+        sub = ChartSubscriber(maxsize=16)
+        hub.subscribe(sub, KEY)
+        await settle()
+        hub.remove(sub)
+        return sub, drain(sub)
+
+    sub, out = asyncio.run(main())
+    assert sub.resyncs > 0
+    resync = max(i for i, m in enumerate(out) if m["type"] == "resync")
+    assert out[resync] == {"type": "resync", "symbol": "BTC/USDT", "market": "crypto", "interval": "1m"}
+    # Everything after the last resync is gap-free
+    times = [m["bar"]["time"] for m in out[resync + 1:]]
+    assert times == list(range(times[0], 600 * 60, 60))
+
+
+def test_restart_with_missing_bars_resyncs():
+    feed = ChartFeed(KEY, source=None)
+    assert feed.apply(bar(0, 1.0)) == "update"
+    feed.restarted = True
+    assert feed.apply(bar(60, 1.0)) == "append"  # nothing missed
+    feed.restarted = True
+    assert feed.apply(bar(600, 1.0)) == "resync"
+    assert feed.apply(bar(660, 1.0)) == "append"
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    from main import app
+
+    snapshot = Bars([0, 60], [1, 1], [2, 2], [0.5, 0.5], [1.5, 1.5], [1, 1])
+
+    async def fake_window(symbol, market, interval, start=None, end=None, limit=None):
+        return snapshot, None
+
+    hub = ChartHub(lambda key: ReplaySource([bar(60, 1.5), bar(60, 1.7), bar(120, 2.0)], delay=0.01))
+    monkeypatch.setattr(websocket, "get_chart_window", fake_window)
+    monkeypatch.setattr(websocket, "chart_hub", hub)
+    with TestClient(app) as client:
+        yield client, hub
+
+
+def test_ws_snapshot_comes_before_deltas(app_client):
+    client, hub = app_client
+    with client.websocket_connect("/ws/chart") as ws:
+        ws.send_json({"action": "subscribe", "symbol": "BTC/USDT", "market": "crypto", "interval": "1m"})
+        first = ws.receive_json()
+        assert first["type"] == "chart" and len(first["data"]) == 2
+        ops = [ws.receive_json() for _ in range(3)]
+        assert [(m["op"], m["bar"]["time"]) for m in ops] == [
+            ("update", 60), ("update", 60), ("append", 120),
+        ]
+        ws.send_json({"action": "unsubscribe", "symbol": "BTC/USDT", "market": "crypto", "interval": "1m"})
+        ws.send_json({"action": "subscribe", "symbol": "ETH/USDT", "market": "crypto",
+                      "interval": "bad"})
+        assert ws.receive_json()["type"] == "error"
+        assert hub.stats()["feeds"] == 0
+
+
+def test_ws_indicators_follow_the_bars(app_client, monkeypatch):
+    from services.indicators import IndicatorCache
+    from ws import chart_feed
+
+    client, hub = app_client
+    snapshot = Bars([0, 60], [1, 1], [2, 2], [0.5, 0.5], [1.0, 1.5], [1, 1])
+
+    async def fake_full(symbol, market, interval):
+        return snapshot
+
+    cache = IndicatorCache()
+    monkeypatch.setattr(websocket, "get_chart_data_async", fake_full)
+    monkeypatch.setattr(websocket, "indicator_cache", cache)
+    monkeypatch.setattr(chart_feed, "indicator_cache", cache)
+    with client.websocket_connect("/ws/chart") as ws:
+        ws.send_json({"action": "subscribe", "symbol": "BTC/USDT", "market": "crypto",
+                      "interval": "1m", "indicators": [{"name": "sma", "period": 2}]})
+        assert ws.receive_json()["type"] == "chart"
+        snap = ws.receive_json()
+        assert (snap["type"], snap["op"], snap["name"], snap["params"]) == (
+            "indicator", "snapshot", "sma", {"period": 2},
+        )
+        assert snap["time"] == [0, 60] and snap["values"]["value"] == [None, 1.25]
+
+        msgs = [ws.receive_json() for _ in range(6)]
+        sma = [(m["op"], m["time"], m["values"]["value"]) for m in msgs if m["type"] == "indicator"]
+        assert sma == [("update", 60, 1.25), ("update", 60, 1.35), ("append", 120, 1.85)]
+
+        ws.send_json({"action": "subscribe", "symbol": "BTC/USDT", "market": "crypto",
+                      "interval": "1m", "indicators": [{"name": "sma", "period": "x"}]})
+        assert ws.receive_json()["type"] == "error"
+
+
+def test_ws_bad_window_fields_get_an_error_and_keep_the_socket(app_client):
+    client, hub = app_client
+    chart = {"symbol": "BTC/USDT", "market": "crypto", "interval": "1m"}
+    with client.websocket_connect("/ws/chart") as ws:
+        ws.send_json({"action": "subscribe", **chart})
+        assert ws.receive_json()["type"] == "chart"
+        for bad in ({"cursor": "abc"}, {"limit": 2.5}, {"from": [1]}, {"market": "bonds"},
+                    {"symbol": ["x"]}, {"indicators": 5}, {"indicators": ["sma"]}):
+            ws.send_json({**chart, "action": "subscribe", **bad})
+            msg = ws.receive_json()
+            while msg["type"] == "bar":  # deltas of the first subscription keep coming
+                msg = ws.receive_json()
+            assert msg["type"] == "error" and msg["reason"] == "invalid"
+        ws.send_json({**chart, "cursor": "61"})  # numeric strings coerce like a query
+        msg = ws.receive_json()
+        while msg["type"] == "bar":
+            msg = ws.receive_json()
+        assert msg["type"] == "chart"
+        assert hub.stats()["feeds"] == 1
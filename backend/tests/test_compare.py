@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from models.bars import Bars
+from services import compare
+
+DAY = 86400
+D0 = 19_000 * DAY  # a UTC midnight
+
+
+def test_daily_stamps_from_different_exchanges_snap_to_the_trade_date():
+    crypto = D0 + np.arange(3) * DAY                   # UTC midnight
+    new_york = D0 + np.arange(3) * DAY + 4 * 3600      # local midnight = 04:00 UTC
+    tokyo = D0 + np.arange(3) * DAY - 9 * 3600         # local midnight = 15:00 UTC the day before
+    for times in (crypto, new_york, tokyo):
+        assert list(compare.snap(times, "1d")) == list(crypto)
+    assert list(compare.snap(np.array([D0 + 9 * 3600 + 1800]), "1h")) == [D0 + 9 * 3600]
+
+
+def test_outer_join_forward_fills_and_inner_join_intersects():
+    a = (D0 + np.array([0, 1, 2, 3, 4]) * DAY, np.array([1.0, 2, 3, 4, 5]))
+    b = (D0 + np.array([1, 4]) * DAY, np.array([10.0, 40]))
+    grid, values, own = compare.align([a, b])
+    assert len(grid) == 5
+    assert np.isnan(values[0, 1])
+    assert list(values[1:, 1]) == [10, 10, 10, 40]
+    assert list(own[:, 1]) == [False, True, False, False, True]
+
+    grid, values, _ = compare.align([a, b], "inner")
+    assert list(grid) == list(D0 + np.array([1, 4]) * DAY)
+    assert list(values[:, 0]) == [2, 5]
+
+    grid, _, _ = compare.align([a, b], limit=2)
+    assert list(grid) == list(D0 + np.array([3, 4]) * DAY)
+
+
+def test_forward_filled_points_are_not_returns():
+    values = np.array([[100.0, 10], [101, 10], [102, 10], [103, 11]])
+    own = np.array([[True, True], [True, False], [True, False], [True, True]])
+    r = compare.returns(values, own)
+    assert np.isnan(r[1:3, 1]).all()
+    assert r[3, 1] == pytest.approx(np.log(1.1))
+
+
+def test_correlations_match_numpy():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(300, 3))
+    x[:, 1] += x[:, 0]
+    assert np.allclose(compare.correlation_matrix(x), np.corrcoef(x.T))
+    rolling = compare.rolling_correlation(x, 40)
+    assert np.isnan(rolling[38]).all()
+    assert rolling[-1, 2] == pytest.approx(np.corrcoef(x[-40:, 0], x[-40:, 2])[0, 1])
+    assert rolling[-1, 0] == pytest.approx(1.0)
+
+
+def test_compare_endpoint(upstream):
+    def fetch(symbol, market, interval, since):
+        times = D0 + np.arange(60) * DAY + (0 if market == "crypto" else 4 * 3600)
+        if market != "crypto":
+            times = times[(times // DAY + 4) % 7 < 5]  # weekdays
+        close = np.linspace(100, 160 if symbol == "BTC/USDT" else 130, len(times))
+        return Bars(times, close, close, close, close, close * 0 + 1)
+
+    upstream.serve = fetch
+    client = TestClient(app)
+
+    res = client.get("/api/compare", params={
+        "symbols": "crypto:BTC/USDT,indices:^GSPC,commodities:GC=F", "window": 10,
+    })
+    assert res.status_code == 200
+    body = res.json()
+    assert [s["symbol"] for s in body["symbols"]] == ["BTC/USDT", "^GSPC", "GC=F"]
+    assert len(body["time"]) == 60
+    assert len(body["close"]) == 3 and len(body["close"][1]) == 60
+    assert body["percent"][0][0] == 0 and body["percent"][0][-1] == pytest.approx(60)
+    assert body["relative_strength"][0][-1] == 100
+    assert len(body["correlation"]) == 3 and body["correlation"][0][0] == 1
+
+    assert client.get("/api/compare", params={"symbols": "AAPL,MSFT"}).status_code == 400
+    assert client.get("/api/compare", params={"symbols": "stocks:AAPL"}).status_code == 400
+
+
+def test_an_empty_window_compares_to_empty_series(upstream):
+    def fetch(symbol, market, interval, since):
+        if symbol == "EMPTY":
+            return Bars.empty()
+        times = D0 + np.arange(30) * DAY
+        return Bars(times, times * 0 + 1.0, times * 0 + 1.0, times * 0 + 1.0, times * 0 + 1.0, times * 0 + 1.0)
+
+    upstream.serve = fetch
+    client = TestClient(app)
+
+    inner = client.get("/api/compare", params={"symbols": "stocks:AAPL,stocks:EMPTY", "join": "inner"})
+    before = client.get("/api/compare", params={"symbols": "stocks:AAPL,stocks:MSFT", "to": 1})
+    for res in (inner, before):
+        assert res.status_code == 200
+        body = res.json()
+        assert body["time"] == []
+        assert body["percent"] == [[], []] and body["relative_strength"] == [[], []]
+        assert body["rolling_correlation"] == [[], []]
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from services.market_hours import Session
+from ws import connections, quote_hub, websocket
+from ws.connections import ConnectionManager
+from ws.quote_hub import QuoteHub, Subscriber
+
+
+class FakeSocket:
+    """Just enough of a WebSocket for ConnectionManager.serve."""
+
+    def __init__(self, stall=False):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent: list[str] = []
+        self.stall = stall
+        self.closed = None
+        self.scope = {"type": "websocket", "path": "/ws/test"}
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        text = await self.incoming.get()
+        if text is None:
+            raise WebSocketDisconnect(1000)
+        return text
+
+    async def send_text(self, text):
+        if self.stall:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+@pytest.fixture
+def fast_timers(monkeypatch):
+    monkeypatch.setattr(connections, "SEND_TIMEOUT", 0.05)
+    monkeypatch.setattr(connections, "HEARTBEAT_INTERVAL", 0.02)
+    monkeypatch.setattr(connections, "IDLE_TIMEOUT", 0.1)
+
+
+def quote(symbol, price):
+    return {"symbol": symbol, "name": "", "market": "stocks", "price": price}
+
+
+def test_subscriber_keeps_only_the_newest_quote_per_symbol():
+    async def main():
+        sub = Subscriber()
+        sub.offer(("stocks", "AAPL"), "a1")
+        sub.offer(("stocks", "MSFT"), "m1")
+        sub.offer(("stocks", "AAPL"), "a2")
+        return sub, await sub.take()
+
+    sub, pending = asyncio.run(main())
+    assert pending == {("stocks", "AAPL"): "a2", ("stocks", "MSFT"): "m1"}
+    assert sub.coalesced == 1 and sub.pending == {}
+
+
+def test_hub_encodes_each_quote_once_for_every_subscriber():
+    async def main():
+        hub = QuoteHub(fetch=lambda symbol, name, market: quote(symbol, 1.0), interval=60)
+        a, b = Subscriber(), Subscriber()
+        hub.update(a, [{"symbol": "AAPL", "market": "stocks"}])
+        hub.update(b, [{"symbol": "AAPL", "market": "stocks"}])
+        ta, tb = await asyncio.wait_for(asyncio.gather(a.take(), b.take()), 5)
+        hub.remove(a)
+        hub.remove(b)
+        return ta, tb
+
+    ta, tb = asyncio.run(main())
+    key = ("stocks", "AAPL")
+    assert ta[key] is tb[key]
+    assert json.loads(ta[key])["price"] == 1.0
+
+
+def test_stalled_client_is_closed_and_its_tasks_cleaned_up(fast_timers):
+    manager = ConnectionManager()
+    ws = FakeSocket(stall=True)
+    started = []
+
+    async def writer(conn):
+        started.append(asyncio.current_task())
+        await conn.send_text("x")
+
+    async def on_message(conn, msg):
+        pass
+
+    asyncio.run(asyncio.wait_for(manager.serve(ws, on_message, writer), 5))
+    assert ws.closed == connections.CLOSE_POLICY
+    assert manager.stats()["slow_consumers"] == 1
+    assert manager.active == {}
+    assert started[0].done()
+
+
+def test_idle_client_gets_pinged_then_dropped(fast_timers):
+    manager = ConnectionManager()
+    ws = FakeSocket()
+
+    async def on_message(conn, msg):
+        pass
+
+    asyncio.run(asyncio.wait_for(manager.serve(ws, on_message), 5))
+    assert connections.PING in ws.sent
+    assert ws.closed == connections.CLOSE_POLICY
+    assert manager.stats()["idle_closed"] == 1
+
+
+def test_pongs_keep_a_connection_alive(fast_timers):
+    manager = ConnectionManager()
+    ws = FakeSocket()
+    seen = []
+
+    async def on_message(conn, msg):
+        seen.append(msg)
+
+    async def client():
+        for _ in range(10):
+            await asyncio.sleep(0.03)
+            ws.incoming.put_nowait('{"action": "pong"}')
+        ws.incoming.put_nowait('{"hello": 1}')
+        ws.incoming.put_nowait(None)
+
+    async def main():
+        await asyncio.gather(manager.serve(ws, on_message), client())
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert seen == [{"hello": 1}]  # pongs are not handed to the endpoint
+    assert ws.closed is None
+    assert manager.stats()["idle_closed"] == 0
+
+
+def test_failing_worker_closes_the_connection():
+    manager = ConnectionManager()
+    ws = FakeSocket()
+
+    async def writer(conn):
+        raise RuntimeError("boom")
+
+    async def on_message(conn, msg):
+        pass
+
+    asyncio.run(asyncio.wait_for(manager.serve(ws, on_message, writer), 5))
+    assert ws.closed == connections.CLOSE_ERROR
+    assert manager.stats()["errors"] == 1
+
+
+def test_quotes_ws_pushes_changed_quotes(monkeypatch):
+    from main import app
+
+    prices = iter(range(100))
+    hub = QuoteHub(fetch=lambda symbol, name, market: quote(symbol, float(next(prices))),
+                   interval=0.01, session=lambda symbol, market: Session(True, None))
+    monkeypatch.setattr(websocket, "hub", hub)
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/quotes") as ws:
+            ws.send_json({"symbols": [{"symbol": "AAPL", "name": "Apple", "market": "stocks"}]})
+            first, second = ws.receive_json(), ws.receive_json()
+            assert first["type"] == "quote_updates"
+            assert [q["symbol"] for q in first["quotes"]] == ["AAPL"]
+            assert second["quotes"][0]["price"] > first["quotes"][0]["price"]
+            assert first["quotes"][0]["market_state"] == "open"
+    assert hub.stats()["symbols"] == 0 and hub.stats()["subscriptions"] == 0
+
+
+def test_quotes_ws_bad_symbol_list_gets_an_error_and_keeps_the_socket(monkeypatch):
+    from main import app
+
+    hub = QuoteHub(fetch=lambda symbol, name, market: quote(symbol, 1.0),
+                   interval=0.01, session=lambda symbol, market: Session(True, None))
+    monkeypatch.setattr(websocket, "hub", hub)
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/quotes") as ws:
+            ws.send_json({"symbols": [{"symbol": "AAPL", "market": "stocks"}]})
+            assert ws.receive_json()["type"] == "quote_updates"
+            for bad in ([{"symbol": "MSFT"}], [{"market": "stocks"}], ["AAPL"], "AAPL",
+                        [{"symbol": "AAPL", "market": "moon"}]):
+                ws.send_json({"symbols": bad})
+                while (msg := ws.receive_json())["type"] != "error":
+                    pass
+                assert msg["reason"] == "invalid"
+            assert hub.subscriptions() == {("stocks", "AAPL"): 1}
+    assert hub.stats()["subscriptions"] == 0
+
+
+def test_closed_symbol_is_polled_once_until_the_open():
+    reopens = time.time() + 3600
+    fetched = []
+
+    def fetch(symbol, name, market):
+        fetched.append(symbol)
+        return quote(symbol, 1.0)
+
+    async def main():
+        hub = QuoteHub(fetch=fetch, interval=0.01,
+                       session=lambda symbol, market: Session(False, reopens))
+        sub = Subscriber()
+        hub.update(sub, [{"symbol": "^N225", "market": "indices"}])
+        pending = await asyncio.wait_for(sub.take(), 5)
+        await asyncio.sleep(0.1)
+        stats = hub.stats()
+        hub.remove(sub)
+        return pending, stats
+
+    pending, stats = asyncio.run(main())
+    sent = json.loads(pending[("indices", "^N225")])
+    assert sent["market_state"] == "closed" and sent["next_open"] == reopens
+    assert fetched == ["^N225"]
+    assert stats["closed"] == 1 and stats["polls"] == 1
+
+
+def test_cadence_speeds_up_on_volatility_and_backs_off_when_flat():
+    cadence = quote_hub.Cadence(4.0)
+    cadence.observe(100.0)
+    assert cadence.observe(101.0) == 2.0
+    assert cadence.observe(102.0) == 1.0
+    assert cadence.observe(102.0) == 1.5
+    for _ in range(20):
+        cadence.observe(102.0)
+    assert cadence.interval == 4.0 * quote_hub.MAX_FACTOR
+    assert cadence.observe(102.00001) < 4.0 * quote_hub.MAX_FACTOR
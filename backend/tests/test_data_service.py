@@ -0,0 +1,86 @@
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from conftest import make_bars
+from main import app
+from services import data_service
+from services.history_store import HistoryStore
+
+
+def test_derived_interval_is_built_from_cached_base(upstream):
+    bars = asyncio.run(data_service.get_chart_data_async("AAPL", "stocks", "4h"))
+    assert len(bars) > 0
+    assert np.all(np.diff(bars.time) >= 4 * 3600)
+    assert upstream.calls == [("AAPL", "1h", None)]
+    assert data_service.chart_cache.get(("stocks", "AAPL", "1h")) is not None
+
+
+def test_derived_load_does_not_block_a_single_worker_pool(upstream, monkeypatch):
+    pool = data_service.providers.ProviderPool("yahoo", 1, 5.0)
+    monkeypatch.setitem(data_service.providers.pools, "yahoo", pool)
+
+    async def main():
+        return await asyncio.gather(
+            data_service.get_chart_data_async("AAPL", "stocks", "4h"),
+            data_service.get_chart_data_async("AAPL", "stocks", "1h"),
+            data_service.get_chart_data_async("AAPL", "stocks", "2h"),
+        )
+
+    four, base, two = asyncio.run(main())
+    assert len(base) == 48 and len(four) and len(two)
+    assert len(upstream.calls) == 1
+
+
+def page_through(load, limit):
+    """Follow next_cursor from the newest page to the oldest: all times oldest first, page count."""
+    pages, end = [], None
+    while True:
+        times, cursor = load(end, limit)
+        pages.append(times)
+        if cursor is None:
+            break
+        end = cursor - 1
+    return [t for page in reversed(pages) for t in page], len(pages)
+
+
+def load_window(end, limit):
+    bars, cursor = asyncio.run(data_service.get_chart_window("AAPL", "stocks", "1h", None, end, limit))
+    return bars.time.tolist(), cursor
+
+
+def test_cursor_paging_covers_the_cached_series_once(upstream):
+    times, pages = page_through(load_window, 10)
+    assert times == upstream.bars.time.tolist()
+    assert pages == 5  # 10+10+10+10+8, the last one without a cursor
+
+
+def test_cursor_paging_continues_into_stored_history(upstream, monkeypatch, tmp_path):
+    store = HistoryStore(tmp_path)
+    first = int(upstream.bars.time[0])
+    older = make_bars(np.arange(first - 3600 * 100, first, 3600))
+    store.append("stocks", "AAPL", "1h", older)
+    monkeypatch.setattr(data_service, "history_store", store)
+
+    # A page straddling the seam is completed from disk
+    bars, cursor = asyncio.run(data_service.get_chart_window("AAPL", "stocks", "1h", limit=60))
+    assert len(bars) == 60 and cursor == int(bars.time[0])
+
+    times, _ = page_through(load_window, 17)
+    assert times == older.time.tolist() + upstream.bars.time.tolist()
+
+
+def test_chart_route_maps_cursor_to_older_pages(upstream):
+    client = TestClient(app)
+
+    def load(end, limit):
+        params = {"interval": "1h", "limit": limit, "format": "columnar"}
+        if end is not None:
+            params["cursor"] = end + 1  # the route serves bars before the cursor
+        body = client.get("/api/stocks/chart/AAPL", params=params).json()
+        return body["columns"]["time"], body["next_cursor"]
+
+    times, pages = page_through(load, 20)
+    assert times == upstream.bars.time.tolist()
+    assert pages == 3
@@ -0,0 +1,80 @@
+import numpy as np
+import orjson
+from fastapi.testclient import TestClient
+
+from main import app
+from models.bars import Bars
+from services import data_service, export
+from services.governor import UpstreamError
+from services.history_store import HistoryStore
+
+NOW = 1_000_000
+
+
+def make_bars(times):
+    close = np.asarray(times, dtype=np.float64) / 60
+    return Bars(times, close, close, close, close, close * 0 + 1)
+
+
+def setup(monkeypatch, tmp_path, upstream, fetch):
+    store = HistoryStore(tmp_path)
+    # Stored 1m history 0..59 min; the live series overlaps it from minute 50
+    store.append("crypto", "BTC/USDT", "1m", make_bars(np.arange(60) * 60), now=NOW)
+    monkeypatch.setattr(data_service, "history_store", store)
+    upstream.serve = fetch
+    monkeypatch.setattr(export, "CHUNK_BARS", 7)
+    return TestClient(app)
+
+
+def live(symbol, market, interval, since):
+    return make_bars(np.arange(50, 80) * 60)
+
+
+def test_csv_joins_stored_history_and_cached_bars(monkeypatch, tmp_path, upstream):
+    client = setup(monkeypatch, tmp_path, upstream, live)
+    res = client.get("/api/export", params={"symbols": "crypto:BTC/USDT,crypto:ETH/USDT",
+                                            "interval": "1m", "from": 600})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert 'filename="chartbank_1m.csv"' in res.headers["content-disposition"]
+    header, *rows = res.text.splitlines()
+    assert header == "market,symbol,time,open,high,low,close,volume"
+    btc = [r.split(",") for r in rows if ",BTC/USDT," in r]
+    times = [int(r[2]) for r in btc]
+    assert times == list(range(600, 80 * 60, 60))  # no gap and no overlap at the seam
+    assert btc[0] == ["crypto", "BTC/USDT", "600", "10.0", "10.0", "10.0", "10.0", "1.0"]
+    assert len(rows) - len(btc) == 30  # ETH: cached bars only
+
+
+def test_ndjson_rows_and_range(monkeypatch, tmp_path, upstream):
+    client = setup(monkeypatch, tmp_path, upstream, live)
+    res = client.get("/api/export", params={"symbols": "crypto:BTC/USDT", "interval": "1m",
+                                            "from": 2700, "to": 3300, "format": "ndjson"})
+    rows = [orjson.loads(line) for line in res.content.splitlines()]
+    assert [r["time"] for r in rows] == list(range(2700, 3360, 60))
+    assert rows[0] == {"market": "crypto", "symbol": "BTC/USDT", "time": 2700, "open": 45.0,
+                       "high": 45.0, "low": 45.0, "close": 45.0, "volume": 1.0}
+
+
+def test_upstream_failure_falls_back_to_stored_history(monkeypatch, tmp_path, upstream):
+    def down(symbol, market, interval, since):
+        raise UpstreamError("binance", "down")
+
+    client = setup(monkeypatch, tmp_path, upstream, down)
+    res = client.get("/api/export", params={"symbols": "crypto:BTC/USDT", "interval": "1m"})
+    assert len(res.text.splitlines()) == 1 + 60
+
+
+def test_bad_requests_are_rejected_before_streaming(monkeypatch, tmp_path, upstream):
+    client = setup(monkeypatch, tmp_path, upstream, live)
+    assert client.get("/api/export", params={"symbols": "BTC/USDT"}).status_code == 400
+    assert client.get("/api/export", params={"symbols": "crypto:BTC/USDT",
+                                             "format": "xlsx"}).status_code == 400
+    res = client.get("/api/export", params={"symbols": "crypto:BTC/USDT", "interval": "1m",
+                                            "format": "arrow"})
+    if export.pa is None:
+        assert res.status_code == 400
+    else:
+        table = export.pa.ipc.open_stream(res.content).read_all()
+        assert table.num_rows == 80
+        assert table.column_names == list(export.COLUMNS)
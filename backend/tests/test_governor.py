@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services import data_service, governor
+from services.cache import TTLCache
+from services.governor import (
+    BACKGROUND, INTERACTIVE, CircuitOpen, Governor, TokenBucket,
+    UpstreamNotFound, UpstreamThrottled, UpstreamUnavailable,
+)
+from services.providers import ProviderPool
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(governor, "BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(governor, "COOLDOWN_SECONDS", 0.05)
+
+
+def failing(exc, times=1_000):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= times:
+            raise exc
+        return "ok"
+    return fn, calls
+
+
+def test_interactive_calls_retry_and_background_calls_do_not():
+    gov = Governor("yahoo", rate=1000, burst=1000)
+    fn, calls = failing(UpstreamUnavailable("yahoo"), times=2)
+    assert gov.call(fn) == "ok"
+    assert len(calls) == 3 and gov.retries == 2
+
+    fn, calls = failing(UpstreamUnavailable("yahoo"), times=1)
+    with governor.background(), pytest.raises(UpstreamUnavailable):
+        gov.call(fn)
+    assert len(calls) == 1
+
+
+def test_non_retryable_errors_are_not_retried_and_keep_the_breaker_closed():
+    gov = Governor("binance", rate=1000, burst=1000)
+    fn, calls = failing(UpstreamNotFound("binance"))
+    for _ in range(governor.FAILURE_THRESHOLD + 1):
+        with pytest.raises(UpstreamNotFound):
+            gov.call(fn)
+    assert len(calls) == governor.FAILURE_THRESHOLD + 1
+    assert gov.breaker.state == "closed"
+
+
+def test_breaker_trips_probes_and_closes():
+    gov = Governor("yahoo", rate=1000, burst=1000)
+    fn, calls = failing(UpstreamUnavailable("yahoo"), times=governor.FAILURE_THRESHOLD)
+    with governor.background():
+        for _ in range(governor.FAILURE_THRESHOLD):
+            with pytest.raises(UpstreamUnavailable):
+                gov.call(fn)
+        assert gov.breaker.state == "open"
+        with pytest.raises(CircuitOpen):
+            gov.call(fn)
+        assert len(calls) == governor.FAILURE_THRESHOLD  # failed fast
+
+        time.sleep(0.06)
+        assert gov.call(fn) == "ok"  # the half-open probe
+    assert gov.breaker.state == "closed"
+    assert gov.stats()["trips"] == 1
+
+
+def test_failed_probe_reopens_with_a_longer_cooldown():
+    gov = Governor("yahoo", rate=1000, burst=1000)
+    fn, _ = failing(UpstreamUnavailable("yahoo"))
+    with governor.background():
+        for _ in range(governor.FAILURE_THRESHOLD):
+            with pytest.raises(UpstreamUnavailable):
+                gov.call(fn)
+        time.sleep(0.06)
+        with pytest.raises(UpstreamUnavailable):
+            gov.call(fn)
+    assert gov.breaker.state == "open"
+    assert gov.breaker.retry_in > 0.06
+
+
+def test_throttling_trips_the_breaker_at_once():
+    gov = Governor("binance", rate=1000, burst=1000)
+    fn, calls = failing(UpstreamThrottled("binance"))
+    with pytest.raises(UpstreamThrottled):
+        gov.call(fn)
+    assert len(calls) == 1  # no retry into a throttle
+    assert gov.breaker.state == "open"
+    assert gov.stats()["last_failure"] == "throttled"
+
+
+def test_token_bucket_serves_interactive_callers_first():
+    bucket = TokenBucket(rate=20, burst=1)
+    assert bucket.acquire()
+    order = []
+
+    def take(prio, label):
+        bucket.acquire(prio, timeout=5)
+        order.append(label)
+
+    threads = [threading.Thread(target=take, args=(BACKGROUND, "bg"))]
+    threads[0].start()
+    time.sleep(0.01)
+    threads.append(threading.Thread(target=take, args=(INTERACTIVE, "ui")))
+    threads[1].start()
+    for t in threads:
+        t.join()
+    assert order == ["ui", "bg"]
+
+
+def test_token_bucket_gives_up_after_its_timeout():
+    bucket = TokenBucket(rate=0.1, burst=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.02)
+
+
+@pytest.fixture
+def flaky_upstream(upstream, monkeypatch):
+    """The in-memory upstream on a pool of its own, with no chart marked stale yet."""
+    monkeypatch.setitem(data_service.providers.pools, "yahoo", ProviderPool("yahoo", 2, 5.0))
+    monkeypatch.setattr(data_service, "_status", {})
+    return upstream
+
+
+def test_failed_refresh_serves_the_last_bars_marked_stale(flaky_upstream):
+    fresh = asyncio.run(data_service.get_chart_data_async("AAPL", "stocks", "1h"))
+    assert data_service.chart_status("AAPL", "stocks", "1h") == {}
+
+    flaky_upstream.down = True
+    stale = asyncio.run(data_service.refresh_chart_data("AAPL", "stocks", "1h"))
+    assert np.array_equal(stale.time, fresh.time)
+    status = {"stale": True, "reason": "unavailable"}
+    assert data_service.chart_status("AAPL", "stocks", "1h") == status
+    assert data_service.chart_status("AAPL", "stocks", "4h") == status  # derived from it
+
+    flaky_upstream.down = False
+    asyncio.run(data_service.refresh_chart_data("AAPL", "stocks", "1h"))
+    assert data_service.chart_status("AAPL", "stocks", "1h") == {}
+
+
+def test_failure_without_any_bars_propagates(flaky_upstream):
+    flaky_upstream.down = True
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(data_service.get_chart_data_async("MSFT", "stocks", "1h"))
+
+
+def test_quotes_report_says_why_symbols_are_missing(monkeypatch):
+    def fetch_quotes(items):
+        raise UpstreamThrottled("yahoo")
+
+    def get_quote(symbol, name, market):
+        if symbol == "GONE":
+            return None
+        raise UpstreamThrottled("yahoo")
+
+    monkeypatch.setattr(data_service.yahoo_finance, "fetch_quotes", fetch_quotes)
+    monkeypatch.setattr(data_service, "get_quote", get_quote)
+    monkeypatch.setattr(data_service, "quote_cache", TTLCache())
+    monkeypatch.setitem(data_service.providers.pools, "yahoo", ProviderPool("yahoo", 2, 5.0))
+    quotes, missing = asyncio.run(data_service.get_quotes_report([
+        {"symbol": "AAPL", "market": "stocks"}, {"symbol": "GONE", "market": "stocks"},
+    ]))
+    assert quotes == []
+    assert missing == [
+        {"symbol": "AAPL", "market": "stocks", "reason": "throttled"},
+        {"symbol": "GONE", "market": "stocks", "reason": "no_data"},
+    ]
@@ -0,0 +1,59 @@
+import numpy as np
+
+from conftest import make_bars
+from services.history_store import RECORD, HistoryStore
+
+NOW = 10_000
+
+
+def test_append_keeps_only_closed_bars(tmp_path):
+    store = HistoryStore(tmp_path)
+    # 1m bars at 9880, 9940 are closed by NOW; 9960 is still forming
+    written = store.append("crypto", "BTC/USDT", "1m", make_bars([9880, 9940, 9960]), now=NOW)
+    assert written == 2
+    assert store.read("crypto", "BTC/USDT", "1m").time.tolist() == [9880, 9940]
+
+
+def test_append_skips_bars_already_stored(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append("crypto", "X", "1m", make_bars([0, 60, 120]), now=NOW)
+    assert store.append("crypto", "X", "1m", make_bars([60, 120, 180]), now=NOW) == 1
+    assert store.read("crypto", "X", "1m").time.tolist() == [0, 60, 120, 180]
+
+
+def test_partial_trailing_record_is_ignored_then_truncated(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append("stocks", "AAPL", "1m", make_bars([0, 60]), now=NOW)
+    path = store.path("stocks", "AAPL", "1m")
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (RECORD.itemsize // 2))  # a writer died mid-record
+
+    assert store.read("stocks", "AAPL", "1m").time.tolist() == [0, 60]
+    store.append("stocks", "AAPL", "1m", make_bars([120]), now=NOW)
+    assert path.stat().st_size == 3 * RECORD.itemsize
+    assert store.read("stocks", "AAPL", "1m").time.tolist() == [0, 60, 120]
+
+
+def test_range_reads(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append("stocks", "AAPL", "1m", make_bars(np.arange(10) * 60), now=NOW)
+    read = lambda **kw: store.read("stocks", "AAPL", "1m", **kw).time.tolist()
+    assert read(start=120, end=300) == [120, 180, 240, 300]
+    assert read(end=300, limit=2) == [240, 300]
+    assert read(start=1000) == []
+    assert store.last_time("stocks", "AAPL", "1m") == 540
+
+
+def test_replace_rewrites_series(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append("stocks", "AAPL", "1d", make_bars([0, 86400], close=10.0), now=10**6)
+    before = store.read("stocks", "AAPL", "1d")
+    assert store.replace("stocks", "AAPL", "1d", make_bars([0, 86400], close=5.0), now=10**6)
+    assert store.read("stocks", "AAPL", "1d").close.tolist() == [5.0, 5.0]
+    assert before.close.tolist() == [10.0, 10.0]  # old views stay valid
+
+
+def test_month_and_minute_files_do_not_collide(tmp_path):
+    store = HistoryStore(tmp_path)
+    assert store.path("stocks", "AAPL", "1m") != store.path("stocks", "AAPL", "1M")
+    assert store.path("crypto", "BTC/USDT", "1m").parent == tmp_path / "crypto"
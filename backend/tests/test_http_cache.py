@@ -0,0 +1,96 @@
+import gzip
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import hourly_bars
+from main import app
+from services import http_cache
+from services.market_hours import Session
+
+
+@pytest.fixture
+def client(upstream, monkeypatch):
+    """300 1h bars per symbol, with a fresh HTTP body cache."""
+    upstream.bars = hourly_bars(300)
+    monkeypatch.setattr(http_cache, "body_cache", http_cache.BodyCache())
+    return TestClient(app)
+
+
+def market(monkeypatch, is_open: bool, change_in: float | None = 3600):
+    change = None if change_in is None else time.time() + change_in
+    monkeypatch.setattr(http_cache, "session", lambda symbol, market: Session(is_open, change))
+
+
+def test_negotiate_prefers_supported_encodings():
+    assert http_cache.negotiate("gzip, deflate") == "gzip"
+    assert http_cache.negotiate("gzip;q=0, deflate") is None
+    assert http_cache.negotiate("identity") is None
+    assert http_cache.negotiate(None) is None
+    assert http_cache.negotiate("*") in ("br", "gzip")
+
+
+def test_repeat_request_with_etag_is_not_modified(client, monkeypatch):
+    market(monkeypatch, is_open=True)
+    first = client.get("/api/stocks/chart/AAPL?interval=1h")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/api/stocks/chart/AAPL?interval=1h", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+
+    other = client.get("/api/stocks/chart/AAPL?interval=1h&format=columnar",
+                       headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["etag"] != etag
+
+
+def test_chart_is_compressed_when_accepted(client, monkeypatch):
+    market(monkeypatch, is_open=True)
+    plain = client.get("/api/stocks/chart/AAPL?interval=1h", headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/api/stocks/chart/AAPL?interval=1h", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["vary"]
+    # httpx decodes transparently; the wire body is the cached gzip member
+    assert zipped.content == plain.content
+    assert int(zipped.headers["content-length"]) < len(plain.content)
+    assert http_cache.body_cache.hits >= 1
+
+
+def test_bodies_are_cached_by_digest_not_by_etag(client, monkeypatch):
+    market(monkeypatch, is_open=True)
+    monkeypatch.setattr(http_cache, "etag", lambda key: 'W/"00000000"')  # every ETag collides
+    rows = client.get("/api/stocks/chart/AAPL?interval=1h&format=rows")
+    columns = client.get("/api/stocks/chart/AAPL?interval=1h&format=columnar")
+    assert rows.headers["etag"] == columns.headers["etag"]
+    assert "data" in rows.json() and "columns" in columns.json()
+    assert http_cache.body_cache.stats()["entries"] >= 2
+
+
+def test_cache_lifetime_follows_the_session(client, monkeypatch):
+    market(monkeypatch, is_open=True)
+    open_ = client.get("/api/stocks/chart/AAPL?interval=1h")
+    assert open_.headers["cache-control"] == "public, max-age=300, stale-while-revalidate=300"
+    assert "last-modified" not in open_.headers
+
+    market(monkeypatch, is_open=False, change_in=7200)
+    closed = client.get("/api/stocks/chart/AAPL?interval=1h")
+    assert closed.headers["cache-control"].startswith("public, max-age=7")
+    since = closed.headers["last-modified"]
+    again = client.get("/api/stocks/chart/AAPL?interval=1h", headers={"If-Modified-Since": since})
+    assert again.status_code == 304
+
+
+def test_default_symbol_list_has_a_validator(client):
+    first = client.get("/api/stocks/symbols")
+    assert first.status_code == 200 and first.json()["results"]
+    assert first.headers["cache-control"] == f"public, max-age={http_cache.DEFAULT_SYMBOLS_AGE}"
+    again = client.get("/api/stocks/symbols", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_gzip_output_is_deterministic():
+    assert http_cache.compress(b"x" * 2000, "gzip") == http_cache.compress(b"x" * 2000, "gzip")
+    assert gzip.decompress(http_cache.compress(b"abc", "gzip")) == b"abc"
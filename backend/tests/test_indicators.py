@@ -0,0 +1,204 @@
+import numpy as np
+import pytest
+
+from models.bars import Bars
+from services import indicators
+from services.indicators import (
+    IndicatorCache, IndicatorSeries, InvalidIndicator, _ema, parse_spec,
+)
+
+SPECS = [
+    ("sma", {"period": 5}),
+    ("ema", {"period": 10}),
+    ("ema", {"period": 1}),
+    ("rsi", {"period": 14}),
+    ("macd", {}),
+    ("bbands", {"period": 20, "k": 2}),
+    ("vwap", {}),
+]
+
+
+def make_bars(n=400, seed=1, start=0, step=3600):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    times = start + np.arange(n) * step
+    return Bars(times, close - 0.5, close + 1, close - 1, close, rng.uniform(1, 100, n))
+
+
+def ref_ema(x, period, alpha):
+    out = [np.nan] * len(x)
+    if len(x) >= period:
+        out[period - 1] = prev = float(np.mean(x[:period]))
+        for i in range(period, len(x)):
+            prev = alpha * x[i] + (1 - alpha) * prev
+            out[i] = prev
+    return np.array(out)
+
+
+def test_blockwise_ema_matches_recurrence():
+    x = np.random.default_rng(0).normal(100, 5, 1000)
+    prev, expected = 3.0, []
+    for v in x:
+        prev = 0.01 * v + 0.99 * prev
+        expected.append(prev)
+    np.testing.assert_allclose(_ema(x, 0.01, 3.0), expected, rtol=1e-9)
+
+
+def test_values_match_reference_formulas():
+    bars = make_bars()
+    close = bars.close
+
+    sma = IndicatorSeries(parse_spec("sma", {"period": 5}))
+    sma.sync(bars)
+    expected = [np.nan] * 4 + [close[i - 4:i + 1].mean() for i in range(4, len(close))]
+    np.testing.assert_allclose(sma.values["value"], expected)
+
+    ema = IndicatorSeries(parse_spec("ema", {"period": 10}))
+    ema.sync(bars)
+    np.testing.assert_allclose(ema.values["value"], ref_ema(close, 10, 2 / 11))
+
+    rsi = IndicatorSeries(parse_spec("rsi", {"period": 14}))
+    rsi.sync(bars)
+    change = np.diff(close)
+    gain = ref_ema(np.maximum(change, 0), 14, 1 / 14)
+    loss = ref_ema(np.maximum(-change, 0), 14, 1 / 14)
+    np.testing.assert_allclose(rsi.values["value"][1:], 100 - 100 / (1 + gain / loss))
+    assert 0 < np.nanmin(rsi.values["value"]) <= np.nanmax(rsi.values["value"]) < 100
+
+    bb = IndicatorSeries(parse_spec("bbands", {"period": 20, "k": 2}))
+    bb.sync(bars)
+    i = 100
+    window = close[i - 19:i + 1]
+    assert bb.values["upper"][i] == pytest.approx(window.mean() + 2 * window.std())
+    assert bb.values["lower"][i] == pytest.approx(window.mean() - 2 * window.std())
+
+
+def test_vwap_resets_each_day():
+    bars = make_bars(n=60, step=3600)
+    vwap = IndicatorSeries(parse_spec("vwap", {}))
+    vwap.sync(bars)
+    typical = (bars.high + bars.low + bars.close) / 3
+    day2 = slice(24, 48)
+    expected = np.cumsum(typical[day2] * bars.volume[day2]) / np.cumsum(bars.volume[day2])
+    np.testing.assert_allclose(vwap.values["value"][day2], expected)
+
+
+@pytest.mark.parametrize("name,params", SPECS)
+def test_incremental_updates_match_full_recompute(name, params):
+    bars = make_bars()
+    spec = parse_spec(name, params)
+    live = IndicatorSeries(spec)
+    live.sync(bars[:50])
+    for i in range(49, len(bars)):
+        b = bars.bar(i)
+        # The forming bar moves a few times before the next one opens
+        for close in (b["close"] + 3, b["close"] - 2):
+            live.push({**b, "close": close})
+        values = live.push(b)
+    full = IndicatorSeries(spec)
+    full.sync(bars)
+    np.testing.assert_array_equal(live.time, bars.time)
+    for key in full.values:
+        np.testing.assert_allclose(live.values[key], full.values[key], rtol=1e-9, equal_nan=True)
+        last = full.values[key][-1]
+        assert values[key] == (None if np.isnan(last) else pytest.approx(last))
+
+
+def test_sync_steps_forward_and_recomputes_on_rewrite():
+    bars = make_bars()
+    series = IndicatorSeries(parse_spec("ema", {"period": 10}))
+    series.sync(bars[:300])
+    series.sync(bars)
+    assert len(series.time) == len(bars)
+
+    # History re-adjusted (e.g. a split): every close scaled
+    adjusted = Bars(bars.time, bars.open / 2, bars.high / 2, bars.low / 2, bars.close / 2, bars.volume)
+    series.sync(adjusted)
+    np.testing.assert_allclose(series.values["value"], ref_ema(adjusted.close, 10, 2 / 11))
+
+
+def test_sync_repairs_a_gap_left_by_live_pushes():
+    bars = make_bars()
+    series = IndicatorSeries(parse_spec("sma", {"period": 5}))
+    series.sync(bars[:100])
+    series.push(bars.bar(105))  # bars 100-104 never arrived
+    series.sync(bars[:110])
+    fresh = IndicatorSeries(parse_spec("sma", {"period": 5}))
+    fresh.sync(bars[:110])
+    np.testing.assert_allclose(series.values["value"], fresh.values["value"], equal_nan=True)
+
+
+def test_live_pushes_grow_in_place_and_drop_the_oldest_past_the_cap(monkeypatch):
+    monkeypatch.setattr(indicators, "MAX_SERIES_BARS", 300)
+    monkeypatch.setattr(indicators, "TRIM_BARS", 50)
+    bars = make_bars(n=400)
+    series = IndicatorSeries(parse_spec("sma", {"period": 5}))
+    series.sync(bars[:100])
+    buffers = series._time
+    for i in range(100, 120):
+        series.push(bars.bar(i))
+    assert series._time is buffers  # room left from the initial allocation
+    for i in range(120, 400):
+        series.push(bars.bar(i))
+    assert 250 < len(series.time) <= 300
+    assert series.time[-1] == bars.time[-1]
+
+    full = IndicatorSeries(parse_spec("sma", {"period": 5}))
+    full.sync(bars)
+    n = len(series.time)
+    assert np.allclose(series.values["value"], full.values["value"][-n:])
+
+
+def test_short_series_warm_up_as_nan():
+    series = IndicatorSeries(parse_spec("macd", {}))
+    series.sync(make_bars(n=10))
+    assert np.isnan(series.values["macd"]).all()
+    assert series.push(make_bars(n=11).bar(10)) == {"macd": None, "signal": None, "hist": None}
+
+
+def test_cache_shares_series_per_spec():
+    cache = IndicatorCache(max_entries=2)
+    key = ("crypto", "BTC/USDT", "1h")
+    a = cache.get(key, parse_spec("rsi", {"period": 14}))
+    assert cache.get(key, parse_spec("rsi", {"period": "14"})) is a
+    assert cache.get(key, parse_spec("rsi", {"period": 7})) is not a
+    cache.get(key, parse_spec("sma", {}))
+    assert cache.get(key, parse_spec("rsi", {"period": 14})) is not a  # evicted
+    assert cache.stats()["series"] == 2
+
+
+@pytest.mark.parametrize("name,params", [
+    ("nope", {}),
+    ("sma", {"length": 5}),
+    ("sma", {"period": 0}),
+    ("ema", {"period": "x"}),
+    ("macd", {"fast": 26, "slow": 12}),
+])
+def test_invalid_specs(name, params):
+    with pytest.raises(InvalidIndicator):
+        parse_spec(name, params)
+
+
+def test_rest_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from routers import indicators
+
+    bars = make_bars(n=30)
+
+    async def fake_chart(symbol, market, interval):
+        return bars
+
+    monkeypatch.setattr(indicators, "get_chart_data_async", fake_chart)
+    monkeypatch.setattr(indicators, "indicator_cache", IndicatorCache())
+    client = TestClient(app)
+
+    body = client.get("/api/indicators/crypto/BTC/USDT",
+                      params={"interval": "1h", "name": "bbands", "period": 5, "limit": 3}).json()
+    assert body["symbol"] == "BTC/USDT" and body["params"] == {"period": 5}
+    assert body["time"] == bars.time[-3:].tolist()
+    assert set(body["values"]) == {"middle", "upper", "lower"}
+
+    assert client.get("/api/indicators/crypto/BTC/USDT", params={"name": "foo"}).status_code == 400
+    assert client.get("/api/indicators/moon/BTC", params={"name": "sma"}).status_code == 422
@@ -0,0 +1,47 @@
+import datetime as dt
+from zoneinfo import ZoneInfo
+
+from services import market_hours
+from services.market_hours import exchange_for, session
+
+
+def at(tz: str, *args) -> float:
+    return dt.datetime(*args, tzinfo=ZoneInfo(tz)).timestamp()
+
+
+def test_us_regular_session_and_weekend():
+    mid = session("AAPL", "stocks", at("America/New_York", 2024, 3, 15, 12, 0))
+    assert mid.is_open and mid.next_change == at("America/New_York", 2024, 3, 15, 16, 0)
+    weekend = session("AAPL", "stocks", at("America/New_York", 2024, 3, 16, 12, 0))
+    assert not weekend.is_open
+    assert weekend.next_change == at("America/New_York", 2024, 3, 18, 9, 30)
+
+
+def test_nyse_holidays_are_closed():
+    thanksgiving = at("America/New_York", 2024, 11, 28, 12, 0)
+    assert not session("AAPL", "stocks", thanksgiving).is_open
+    good_friday = at("America/New_York", 2024, 3, 29, 12, 0)
+    assert not session("AAPL", "stocks", good_friday).is_open
+    # Saturday July 4th 2026 is observed on Friday the 3rd
+    assert dt.date(2026, 7, 3) in market_hours.nyse_holidays(2026)
+
+
+def test_tokyo_lunch_break():
+    lunch = session("7203.T", "stocks", at("Asia/Tokyo", 2024, 3, 15, 12, 0))
+    assert not lunch.is_open
+    assert lunch.next_change == at("Asia/Tokyo", 2024, 3, 15, 12, 30)
+    assert exchange_for("^N225", "indices") is market_hours.JP
+
+
+def test_futures_trade_overnight_with_a_daily_break():
+    night = session("ES=F", "futures", at("America/Chicago", 2024, 3, 13, 2, 0))
+    assert night.is_open and night.next_change == at("America/Chicago", 2024, 3, 13, 16, 0)
+    assert not session("ES=F", "futures", at("America/Chicago", 2024, 3, 13, 16, 30)).is_open
+    friday = session("ES=F", "futures", at("America/Chicago", 2024, 3, 15, 16, 30))
+    assert not friday.is_open
+    assert friday.next_change == at("America/Chicago", 2024, 3, 17, 17, 0)
+
+
+def test_crypto_never_closes():
+    state = session("BTC/USDT", "crypto", at("UTC", 2024, 12, 25, 0, 0))
+    assert state.is_open and state.next_change is None and state.seconds_to_change() is None
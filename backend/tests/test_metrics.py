@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services import metrics, profiler
+from services.governor import Governor, UpstreamUnavailable, background
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A scratch registry so test metrics don't leak into /api/metrics."""
+    monkeypatch.setattr(metrics, "registry", metrics.Registry())
+    return metrics.registry
+
+
+def test_histogram_renders_cumulative_buckets(registry):
+    h = metrics.Histogram("t_seconds", "test", ["op"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        h.observe(value, op="get")
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP t_seconds test", "# TYPE t_seconds histogram"]
+    assert lines[2:] == [
+        't_seconds_bucket{op="get",le="0.1"} 1',
+        't_seconds_bucket{op="get",le="1"} 3',
+        't_seconds_bucket{op="get",le="+Inf"} 4',
+        't_seconds_sum{op="get"} 4.05',
+        't_seconds_count{op="get"} 4',
+    ]
+
+
+def test_counters_and_collected_gauges(registry):
+    c = metrics.Counter("t_total", "test", ["reason"])
+    c.inc(reason='say "hi"')
+    c.inc(2, reason='say "hi"')
+    metrics.Gauge("t_live", "test", ["k"], collect=lambda: [({"k": "a"}, 3)])
+    text = registry.render()
+    assert 't_total{reason="say \\"hi\\""} 3' in text
+    assert 't_live{k="a"} 3' in text
+
+
+def test_governor_records_latency_and_failures():
+    gov = Governor("bench", rate=1000, burst=1000)
+
+    def fetch_thing():
+        raise UpstreamUnavailable("bench")
+
+    with background(), pytest.raises(UpstreamUnavailable):
+        gov.call(fetch_thing)
+    assert metrics.UPSTREAM_SECONDS.count(provider="bench", call="fetch_thing") == 1
+    assert metrics.UPSTREAM_ERRORS.value(provider="bench", call="fetch_thing", reason="unavailable") == 1
+
+
+def test_metrics_endpoint_times_requests_by_route():
+    from main import app
+
+    with TestClient(app) as client:
+        client.get("/api/health")
+        body = client.get("/api/metrics").text
+    assert 'chartbank_http_request_seconds_count{method="GET",route="/api/health",status="200"}' in body
+    assert "# TYPE chartbank_upstream_seconds histogram" in body
+
+
+def test_profile_requires_opt_in(monkeypatch):
+    from main import app
+
+    client = TestClient(app)
+    monkeypatch.setattr(profiler, "ENABLED", False)
+    assert client.get("/api/metrics/profile?seconds=0.1").status_code == 403
+
+    monkeypatch.setattr(profiler, "ENABLED", True)
+    response = client.get("/api/metrics/profile?seconds=0.2&interval_ms=2")
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    assert response.text.strip().splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+
+def test_sampling_profiler_sees_busy_threads():
+    def busy_loop():
+        end = time.perf_counter() + 0.2
+        while time.perf_counter() < end:
+            pass
+
+    async def main():
+        task = asyncio.get_running_loop().run_in_executor(None, busy_loop)
+        result = await profiler.profile(0.15, 0.002)
+        await task
+        return result
+
+    assert "busy_loop" in asyncio.run(main()).collapsed()
@@ -0,0 +1,100 @@
+import asyncio
+import datetime as dt
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from services import data_service, prefetch
+from services.cache import TTLCache
+from services.governor import UpstreamUnavailable
+
+DEFAULTS = {
+    "stocks": [{"symbol": "AAPL", "name": "Apple", "market": "stocks"}],
+    "crypto": [{"symbol": "BTC/USDT", "name": "Bitcoin", "market": "crypto"}],
+}
+
+# Friday 2024-03-15 12:00 New York (open) and the following Saturday (closed)
+FRIDAY = dt.datetime(2024, 3, 15, 12, tzinfo=ZoneInfo("America/New_York")).timestamp()
+SATURDAY = FRIDAY + 24 * 3600
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Record chart and quote refreshes; they seed fresh caches like the real ones."""
+    calls = []
+    monkeypatch.setattr(data_service, "chart_cache", TTLCache())
+    monkeypatch.setattr(data_service, "quote_cache", TTLCache())
+
+    async def refresh_chart_data(symbol, market, interval, ttl=None):
+        calls.append(("chart", symbol))
+        if symbol == "DOWN":
+            raise UpstreamUnavailable("yahoo")
+        data_service.chart_cache.set((market, symbol, interval), interval, [1], ttl)
+
+    async def refresh_quotes(items):
+        calls.extend(("quote", item["symbol"]) for item in items)
+        quotes = [{"symbol": i["symbol"], "market": i["market"]} for i in items]
+        for q in quotes:
+            data_service.quote_cache.set((q["market"], q["symbol"]), "", q, 60)
+        return quotes, []
+
+    monkeypatch.setattr(data_service, "refresh_chart_data", refresh_chart_data)
+    monkeypatch.setattr(data_service, "refresh_quotes", refresh_quotes)
+    return calls
+
+
+def test_defaults_are_warmed_then_refreshed_ahead_of_expiry(upstream):
+    p = prefetch.Prefetcher(DEFAULTS)
+    asyncio.run(p.tick(FRIDAY))
+    assert sorted(upstream) == [("chart", "AAPL"), ("chart", "BTC/USDT"),
+                                ("quote", "AAPL"), ("quote", "BTC/USDT")]
+
+    upstream.clear()
+    asyncio.run(p.tick(FRIDAY + 5))
+    assert upstream == []
+    # Quotes are due after REFRESH_AHEAD of QUOTE_TTL, daily charts much later
+    asyncio.run(p.tick(FRIDAY + 9))
+    assert sorted(upstream) == [("quote", "AAPL"), ("quote", "BTC/USDT")]
+
+
+def test_closed_market_is_refreshed_once_then_only_extended(upstream):
+    p = prefetch.Prefetcher(DEFAULTS)
+    asyncio.run(p.tick(SATURDAY))
+    assert ("chart", "AAPL") in upstream and ("quote", "AAPL") in upstream
+
+    upstream.clear()
+    for hours in (1, 2, 12, 24):
+        asyncio.run(p.tick(SATURDAY + hours * 3600))
+    # Crypto keeps trading; the closed stock never goes upstream again
+    assert ("chart", "AAPL") not in upstream and ("quote", "AAPL") not in upstream
+    assert ("chart", "BTC/USDT") in upstream
+    assert p.extended > 0
+    assert data_service.chart_cache.get(("stocks", "AAPL", "1d")) is not None
+
+
+def test_hot_symbols_join_the_targets(upstream):
+    p = prefetch.Prefetcher(DEFAULTS)
+    for _ in range(prefetch.HOT_MIN_HITS):
+        p.record_chart("NVDA", "stocks", "1h")
+    p.record_chart("RARE", "stocks", "1h")
+    targets = p.targets()
+    assert ("chart", "stocks", "NVDA", "1h") in targets
+    assert ("chart", "stocks", "RARE", "1h") not in targets
+
+
+def test_failed_refresh_is_retried_later(upstream):
+    p = prefetch.Prefetcher({"stocks": [{"symbol": "DOWN", "market": "stocks"}]})
+    asyncio.run(p.tick(FRIDAY))
+    assert p.failed == 1
+    upstream.clear()
+    asyncio.run(p.tick(FRIDAY + prefetch.RETRY_DELAY / 2))
+    assert ("chart", "DOWN") not in upstream
+    asyncio.run(p.tick(FRIDAY + prefetch.RETRY_DELAY))
+    assert ("chart", "DOWN") in upstream
+
+
+def test_access_counts_decay():
+    counts = prefetch.AccessCounts(half_life=1.0)
+    counts.hit(("chart", "stocks", "AAPL", "1d"))
+    counts._decayed_at -= 10
+    assert counts.top(5, 0.5) == []
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from models.bars import Bars
+from services.resample import (
+    InvalidInterval, base_interval, interval_seconds, parse_interval, resample, update,
+)
+
+
+def minute_bars(times):
+    rng = np.random.default_rng(1)
+    close = 100 + rng.standard_normal(len(times)).cumsum()
+    return Bars(times, close - 0.5, close + 1, close - 1, close, rng.integers(1, 100, len(times)))
+
+
+def sessions(days=3, minutes=390):
+    """Minute bars for a few 6.5h sessions starting at 14:30 UTC."""
+    return np.concatenate([
+        np.arange(minutes) * 60 + d * 86400 + 14 * 3600 + 1800 for d in range(days)
+    ])
+
+
+def assert_same(a: Bars, b: Bars):
+    for f in ("time", "open", "high", "low", "close", "volume"):
+        np.testing.assert_allclose(getattr(a, f), getattr(b, f), err_msg=f)
+
+
+def test_parse_interval():
+    assert parse_interval("10m") == (10, "m")
+    assert interval_seconds("4h") == 14400
+    for bad in ("", "0m", "5x", "m5"):
+        with pytest.raises(InvalidInterval):
+            parse_interval(bad)
+
+
+def test_base_interval_picks_coarsest_divisor():
+    native = ["1m", "5m", "1h", "1d", "1w", "1M"]
+    assert base_interval("1h", native) is None
+    assert base_interval("15m", native) == "5m"
+    assert base_interval("4h", native) == "1h"
+    assert base_interval("3M", native) == "1M"
+    with pytest.raises(InvalidInterval):
+        base_interval("7m", ["5m"])
+
+
+def test_epoch_buckets():
+    bars = minute_bars(np.arange(10) * 60)
+    out = resample(bars, "5m", "epoch")
+    assert out.time.tolist() == [0, 300]
+    assert out.open[0] == bars.open[0]
+    assert out.close[1] == bars.close[-1]
+    assert out.high[0] == bars.high[:5].max()
+    assert out.volume[1] == bars.volume[5:].sum()
+
+
+def test_session_buckets_start_at_the_open():
+    out = resample(minute_bars(sessions(days=1)), "1h", "session")
+    assert out.time[0] == 14 * 3600 + 1800
+    assert np.all(np.diff(out.time) == 3600)
+
+
+@pytest.mark.parametrize("interval,align", [("15m", "epoch"), ("4h", "epoch"), ("1h", "session")])
+def test_incremental_update_matches_full_resample(interval, align):
+    base = minute_bars(sessions())
+    full = resample(base, interval, align)
+    for k in (100, 389, 390, 391, 800, len(base) - 1):
+        derived = resample(base[:k], interval, align)
+        assert_same(update(derived, base, interval, align), full)
+
+
+def test_update_drops_bars_before_the_base_window():
+    base = minute_bars(np.arange(600) * 60)
+    derived = resample(base[:400], "15m")
+    out = update(derived, base[200:], "15m")
+    assert out.time[0] <= base.time[200] < out.time[0] + 900
+    assert_same(out[1:], resample(base[200:], "15m")[1:])
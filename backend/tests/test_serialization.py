@@ -0,0 +1,22 @@
+import orjson
+
+from models.bars import Bars
+from models.market_data import ChartResponse, ColumnarChartResponse
+from services.serialization import dump_chart
+
+BARS = Bars([60, 120], [1.5, 2], [2, 3], [1, 1.5], [2, 2.5], [10, 20])
+
+
+def test_rows_payload_matches_chart_response():
+    body = orjson.loads(dump_chart("AAPL", "stocks", "1m", BARS, next_cursor=None))
+    chart = ChartResponse(**body)
+    assert [b.time for b in chart.data] == [60, 120]
+    assert chart.data[0].open == 1.5
+
+
+def test_columnar_payload_matches_columnar_response():
+    body = orjson.loads(dump_chart("AAPL", "stocks", "1m", BARS, "columnar", next_cursor=60))
+    chart = ColumnarChartResponse(**body)
+    assert chart.columns.time == [60, 120]
+    assert chart.columns.close == [2.0, 2.5]
+    assert chart.next_cursor == 60
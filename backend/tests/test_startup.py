@@ -0,0 +1,88 @@
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services import startup
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_importing_the_app_leaves_the_providers_unloaded():
+    code = ("import sys, main; "
+            "print(sorted(m for m in ('pandas', 'yfinance', 'ccxt') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True,
+                         text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_load_imports_once_and_times_it(monkeypatch):
+    monkeypatch.setattr(startup, "report", startup.StartupReport())
+    monkeypatch.setattr(startup, "_loaded", {})
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    module = startup.load("colorsys")
+    assert startup.load("colorsys") is module
+    assert list(startup.report.steps) == ["import colorsys"]
+
+
+def test_load_waits_for_a_module_another_thread_is_importing(tmp_path, monkeypatch):
+    (tmp_path / "slow_startup_module.py").write_text(
+        "import time\ntime.sleep(0.3)\nready = True\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(startup, "_loaded", {})
+    monkeypatch.delitem(sys.modules, "slow_startup_module", raising=False)
+
+    warming = threading.Thread(target=startup.load, args=("slow_startup_module",))
+    warming.start()
+    while "slow_startup_module" not in sys.modules:  # the warm-up's import has begun
+        time.sleep(0.005)
+    assert startup.load("slow_startup_module").ready
+    warming.join()
+    monkeypatch.delitem(sys.modules, "slow_startup_module")
+
+
+def test_readiness_follows_the_warm_up(monkeypatch):
+    monkeypatch.setattr(startup, "report", startup.StartupReport())
+    monkeypatch.setattr(startup, "WARM_MODULES", ("colorsys",))
+    monkeypatch.setattr(startup, "_loaded", {})
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    client = TestClient(app)
+    assert client.get("/api/health/ready").status_code == 200  # no warm-up: ready at once
+
+    async def main():
+        release = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        task = asyncio.create_task(startup.start_warm_up(
+            lambda: asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+        ))
+        await asyncio.sleep(0.05)
+        starting = startup.report.stats()
+        release.set()
+        await task
+        return starting
+
+    starting = asyncio.run(main())
+    assert starting["ready"] is False
+    res = client.get("/api/health/ready")
+    assert res.status_code == 200
+    assert res.json()["status"] == "ready"
+    assert {"import colorsys", "warm-up"} <= set(res.json()["startup"]["steps"])
+    assert client.get("/api/health").json()["status"] == "ok"
+
+
+def test_failed_warm_up_still_ends_ready(monkeypatch):
+    monkeypatch.setattr(startup, "report", startup.StartupReport())
+    monkeypatch.setattr(startup, "WARM_MODULES", ())
+
+    def broken():
+        raise RuntimeError("no network")
+
+    asyncio.run(startup.start_warm_up(broken))
+    assert startup.report.ready
+    assert startup.report.error == "RuntimeError: no network"
@@ -0,0 +1,72 @@
+import pytest
+
+from services.symbol_index import SymbolIndex, _within_one_edit
+
+
+@pytest.fixture
+def index():
+    idx = SymbolIndex()
+    idx.load_file()
+    idx.replace_market("crypto", [
+        {"symbol": "BTC/USDT", "name": "Bitcoin"},
+        {"symbol": "ETH/USDT", "name": "Ethereum"},
+        {"symbol": "ETH/BTC", "name": "ETH"},
+        {"symbol": "PEPE/USDT", "name": "PEPE"},
+    ])
+    idx.set_popular({"crypto": [{"symbol": "BTC/USDT"}, {"symbol": "ETH/USDT"}]})
+    return idx
+
+
+def symbols(results):
+    return [r["symbol"] for r in results]
+
+
+def test_exact_ticker_ranks_first(index):
+    assert symbols(index.search("aapl"))[0] == "AAPL"
+    assert symbols(index.search("^n225"))[0] == "^N225"
+    assert symbols(index.search("usdjpy"))[0] == "USDJPY=X"
+
+
+def test_prefix_and_name_matches(index):
+    assert "AAPL" in symbols(index.search("AAP"))
+    assert "7203.T" in symbols(index.search("toyota"))
+    assert "^GSPC" in symbols(index.search("s&p 500"))
+
+
+def test_crypto_root_and_popularity(index):
+    results = symbols(index.search("eth", "crypto"))
+    assert results[:2] == ["ETH/USDT", "ETH/BTC"]
+
+
+def test_typos_are_tolerated(index):
+    assert symbols(index.search("appl"))[0] == "AAPL"
+    assert symbols(index.search("bitcion"))[0] == "BTC/USDT"
+    assert "NVDA" in symbols(index.search("nvdia"))
+
+
+def test_market_filter_and_limit(index):
+    assert all(r["market"] == "forex" for r in index.search("usd", "forex"))
+    assert len(index.search("a", limit=5)) == 5
+    assert index.search("   ") == []
+
+
+def test_replacing_a_market_keeps_the_others(index):
+    index.replace_market("crypto", [{"symbol": "SOL/USDT", "name": "Solana"}])
+    assert symbols(index.search("sol"))[0] == "SOL/USDT"
+    assert index.search("pepe", "crypto") == []
+    assert symbols(index.search("aapl"))[0] == "AAPL"
+
+
+def test_failed_crypto_refresh_retries_soon(index):
+    index.refresh_crypto(lambda: [])
+    assert symbols(index.search("pepe", "crypto")) == ["PEPE/USDT"]
+    assert index.crypto_stale() is False
+    index.crypto_loaded_at -= 61
+    assert index.crypto_stale() is True
+
+
+def test_within_one_edit():
+    assert _within_one_edit("APPL", "AAPL")
+    assert _within_one_edit("NVDIA", "NVIDIA")
+    assert _within_one_edit("BITCION", "BITCOIN")  # transposition
+    assert not _within_one_edit("AMZN", "AAPL")
@@ -0,0 +1,339 @@
+"""Live candle feeds behind /ws/chart subscriptions.
+
+One ChartFeed runs per subscribed (market, symbol, interval). It reads bars
+from a source, diffs each against the last bar it has seen and publishes
+only the change: ``update`` when the forming bar moves, ``append`` when a
+new bar opens. Each delta is encoded once and shared by every subscriber.
+Subscribers may also ask for indicators on the series; each bar is pushed
+once into the shared indicator state (an O(1) step) and the new values go
+out as ``indicator`` messages right after the bar.
+
+Deltas only make sense in order and without gaps, so nothing is dropped
+silently: when a subscriber falls too far behind (or a feed reconnects
+after missing bars) the client gets a ``resync`` message for the series
+and should reload its snapshot.
+
+With several API workers only one of them reads each series' source; the
+bars reach the other workers' feeds through the shared backend.
+
+Sources:
+- BinanceKlineSource: Binance's public kline stream (crypto, native intervals)
+- PollingSource: periodic incremental refresh through the candle store
+- ReplaySource: replays recorded bars or kline messages, for local testing
+"""
+
+import asyncio
+import contextlib
+import json
+from typing import AsyncIterator, Callable, Iterable, Tuple
+
+import numpy as np
+import orjson
+
+from services import binance, metrics
+from services.backend import Backend, backend, shared_stream
+from services.data_service import refresh_chart_data
+from services.governor import background
+from services.indicators import IndicatorSeries, dump_indicator, indicator_cache
+from services.resample import interval_seconds
+
+FeedKey = Tuple[str, str, str]  # (market, symbol, interval)
+
+QUEUE_SIZE = 256
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/ws/{stream}"
+
+# Back-off between source restarts, and stream failures before polling instead
+RETRY_SECONDS = 5.0
+MAX_STREAM_FAILURES = 3
+
+
+class ChartSubscriber:
+    """Per-connection outbox of encoded chart messages."""
+
+    def __init__(self, maxsize: int = QUEUE_SIZE):
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=maxsize)
+        self.keys: set[FeedKey] = set()
+        self.indicators: dict[FeedKey, set[tuple]] = {}
+        self.resyncs = 0
+
+    def offer(self, text: str) -> None:
+        """Enqueue without blocking.
+
+        A full queue is discarded and replaced by one ``resync`` per
+        subscription: skipping single deltas would corrupt the client's series.
+        """
+        try:
+            self.queue.put_nowait(text)
+            return
+        except asyncio.QueueFull:
+            pass
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.resyncs += 1
+        with contextlib.suppress(asyncio.QueueFull):
+            for key in self.keys:
+                self.queue.put_nowait(resync_message(key))
+
+
+def resync_message(key: FeedKey) -> str:
+    market, symbol, interval = key
+    return orjson.dumps({
+        "type": "resync", "symbol": symbol, "market": market, "interval": interval,
+    }).decode()
+
+
+def parse_kline(msg: dict) -> dict | None:
+    """Bar dict from a Binance kline event (or a plain bar dict)."""
+    k = msg.get("k")
+    if k is None:
+        return msg if "time" in msg else None
+    return {
+        "time": int(k["t"]) // 1000,
+        "open": float(k["o"]),
+        "high": float(k["h"]),
+        "low": float(k["l"]),
+        "close": float(k["c"]),
+        "volume": round(float(k["v"]), 2),
+    }
+
+
+class PollingSource:
+    """Refreshes the series incrementally and yields its changed tail."""
+
+    def __init__(self, key: FeedKey, every: float | None = None):
+        self.key = key
+        # About a dozen polls per bar, between 5s and a minute
+        self.every = every or min(max(interval_seconds(key[2]) / 12, 5.0), 60.0)
+
+    async def stream(self) -> AsyncIterator[dict]:
+        market, symbol, interval = self.key
+        last = None
+        while True:
+            with background():
+                bars = await refresh_chart_data(symbol, market, interval)
+            if bars:
+                if last is None:
+                    start = len(bars) - 1
+                else:
+                    start = int(np.searchsorted(bars.time, last, side="left"))
+                for i in range(start, len(bars)):
+                    yield bars.bar(i)
+                last = bars.last_time
+            await asyncio.sleep(self.every)
+
+
+class BinanceKlineSource:
+    """Binance's kline WebSocket stream for one pair and interval."""
+
+    def __init__(self, key: FeedKey):
+        _, symbol, interval = key
+        stream = f"{symbol.replace('/', '').lower()}@kline_{binance.INTERVAL_MAP[interval]}"
+        self.url = BINANCE_STREAM_URL.format(stream=stream)
+
+    async def stream(self) -> AsyncIterator[dict]:
+        import websockets
+
+        async with websockets.connect(self.url, ping_interval=20) as conn:
+            async for raw in conn:
+                bar = parse_kline(json.loads(raw))
+                if bar is not None:
+                    yield bar
+
+
+class ReplaySource:
+    """Yields recorded bars or kline messages, optionally paced.
+
+    ``messages`` is an iterable of dicts or the path of a JSON-lines file.
+    """
+
+    def __init__(self, messages: Iterable[dict] | str, delay: float = 0.0):
+        self.messages = messages
+        self.delay = delay
+
+    async def stream(self) -> AsyncIterator[dict]:
+        if isinstance(self.messages, str):
+            with open(self.messages, encoding="utf-8") as f:
+                messages = [json.loads(line) for line in f if line.strip()]
+        else:
+            messages = list(self.messages)
+        for msg in messages:
+            bar = parse_kline(msg)
+            if bar is not None:
+                yield bar
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        # A replay ends; keep the feed open without restarting it
+        await asyncio.Event().wait()
+
+
+def default_source(key: FeedKey):
+    market, _, interval = key
+    if market == "crypto" and interval in binance.INTERVAL_MAP:
+        return BinanceKlineSource(key)
+    return PollingSource(key)
+
+
+class ChartFeed:
+    """Diffs one series' bars and fans the deltas out to subscribers."""
+
+    def __init__(self, key: FeedKey, source, shared: Backend = backend):
+        self.key = key
+        self.source = source
+        self.backend = shared
+        self.subscribers: set[ChartSubscriber] = set()
+        self.indicators: dict[tuple, IndicatorSeries] = {}
+        self.last: dict | None = None
+        self.failures = 0
+        self.restarted = False
+        self.task: asyncio.Task | None = None
+
+    def apply(self, bar: dict) -> str | None:
+        """Record a bar; return the message it causes, if any.
+
+        That is the delta op, or ``resync`` when the source came back after
+        a restart with bars missing in between.
+        """
+        last = self.last
+        if last is not None and bar["time"] < last["time"]:
+            return None
+        if last is not None and bar["time"] == last["time"]:
+            if bar == last:
+                return None
+            op = "update"
+        elif last is not None and self.restarted and (
+            bar["time"] - last["time"] > interval_seconds(self.key[2])
+        ):
+            op = "resync"
+        else:
+            op = "append" if last is not None else "update"
+        self.restarted = False
+        self.last = bar
+        return op
+
+    def publish(self, op: str, bar: dict) -> None:
+        if op == "resync":
+            text = resync_message(self.key)
+        else:
+            market, symbol, interval = self.key
+            text = orjson.dumps({
+                "type": "bar",
+                "op": op,
+                "symbol": symbol,
+                "market": market,
+                "interval": interval,
+                "bar": bar,
+            }).decode()
+        for sub in self.subscribers:
+            sub.offer(text)
+        if self.indicators:
+            self.publish_indicators(op, bar)
+
+    def publish_indicators(self, op: str, bar: dict) -> None:
+        for spec, series in self.indicators.items():
+            if op == "resync":
+                # Bars went missing; the next snapshot sync recomputes
+                series.reset()
+                continue
+            values = series.push(bar)
+            if values is None:
+                continue
+            text = dump_indicator(
+                self.key, series, bar["time"], values, type="indicator", op=op
+            ).decode()
+            for sub in self.subscribers:
+                if spec in sub.indicators.get(self.key, ()):
+                    sub.offer(text)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                bars = shared_stream(
+                    self.backend, "chart:{}:{}:{}".format(*self.key),
+                    lambda: self.source.stream(), orjson.dumps, orjson.loads,
+                )
+                async for bar in bars:
+                    self.failures = 0
+                    op = self.apply(bar)
+                    if op is not None:
+                        self.publish(op, bar)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failures += 1
+                if not isinstance(self.source, PollingSource) and self.failures >= MAX_STREAM_FAILURES:
+                    self.source = PollingSource(self.key)
+            self.restarted = True
+            await asyncio.sleep(RETRY_SECONDS)
+
+
+class ChartHub:
+    """Reference-counted chart feeds, one per (market, symbol, interval)."""
+
+    def __init__(self, source_factory: Callable[[FeedKey], object] = default_source,
+                 shared: Backend = backend):
+        self.source_factory = source_factory
+        self.backend = shared
+        self._feeds: dict[FeedKey, ChartFeed] = {}
+
+    def subscribe(self, sub: ChartSubscriber, key: FeedKey, indicators: Iterable[tuple] = ()) -> None:
+        """Subscribe to a series' deltas, plus the given indicator specs' values."""
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = ChartFeed(key, self.source_factory(key), self.backend)
+            feed.task = asyncio.create_task(feed.run())
+        feed.subscribers.add(sub)
+        sub.keys.add(key)
+        specs = set(indicators)
+        sub.indicators[key] = specs
+        for spec in specs:
+            if spec not in feed.indicators:
+                feed.indicators[spec] = indicator_cache.get(key, spec)
+        self._prune_indicators(feed)
+
+    def unsubscribe(self, sub: ChartSubscriber, key: FeedKey) -> None:
+        sub.keys.discard(key)
+        sub.indicators.pop(key, None)
+        feed = self._feeds.get(key)
+        if feed is None:
+            return
+        feed.subscribers.discard(sub)
+        if not feed.subscribers:
+            del self._feeds[key]
+            feed.task.cancel()
+        else:
+            self._prune_indicators(feed)
+
+    @staticmethod
+    def _prune_indicators(feed: ChartFeed) -> None:
+        wanted = set()
+        for sub in feed.subscribers:
+            wanted |= sub.indicators.get(feed.key, set())
+        for spec in set(feed.indicators) - wanted:
+            del feed.indicators[spec]
+
+    def remove(self, sub: ChartSubscriber) -> None:
+        for key in list(sub.keys):
+            self.unsubscribe(sub, key)
+
+    def stats(self) -> dict:
+        return {
+            "feeds": len(self._feeds),
+            "subscriptions": sum(len(f.subscribers) for f in self._feeds.values()),
+        }
+
+    def subscriptions(self) -> dict[FeedKey, int]:
+        """Subscriber count per series."""
+        return {key: len(feed.subscribers) for key, feed in list(self._feeds.items())}
+
+
+chart_hub = ChartHub()
+
+metrics.Gauge(
+    "chartbank_chart_subscriptions", "WebSocket chart subscribers per series",
+    ["market", "symbol", "interval"],
+    collect=lambda: [
+        ({"market": m, "symbol": s, "interval": i}, n)
+        for (m, s, i), n in chart_hub.subscriptions().items()
+    ],
+)
@@ -0,0 +1,168 @@
+"""WebSocket connection lifecycle shared by the streaming endpoints.
+
+Each connection runs as a small group of tasks: a receive loop, a
+heartbeat and the endpoint's writers. Producers never await a client.
+They hand pre-encoded text to per-connection outboxes, and each writer
+drains its outbox at the client's pace. A client that stops reading (a
+send blocks past ``SEND_TIMEOUT``) or stops answering pings (nothing
+received for ``IDLE_TIMEOUT``) is closed. When any task ends, every
+other task of the connection is cancelled and awaited, so none outlives
+its socket.
+"""
+
+import asyncio
+import contextlib
+import json
+import time
+from typing import Awaitable, Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from services import metrics
+
+SEND_TIMEOUT = 10.0
+HEARTBEAT_INTERVAL = 20.0
+IDLE_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+
+PING = '{"type":"ping"}'
+
+# Close codes (RFC 6455): policy violation, internal error
+CLOSE_POLICY = 1008
+CLOSE_ERROR = 1011
+
+
+class SlowConsumer(Exception):
+    """The client stopped reading; a send did not finish in time."""
+
+
+class IdleConnection(Exception):
+    """Nothing received from the client, not even a pong, for too long."""
+
+
+class Connection:
+    """One accepted WebSocket and its send/receive bookkeeping."""
+
+    def __init__(self, ws: WebSocket):
+        self.ws = ws
+        self.endpoint = ws.scope.get("path", "")
+        self.last_sent = self.last_received = time.monotonic()
+        self._send_lock = asyncio.Lock()
+
+    async def send_text(self, text: str) -> None:
+        """Send one frame, or raise SlowConsumer if the client can't take it in time."""
+        async with self._send_lock:
+            try:
+                await asyncio.wait_for(self.ws.send_text(text), SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise SlowConsumer from None
+        self.last_sent = time.monotonic()
+        metrics.WS_SENT.inc(endpoint=self.endpoint)
+
+    async def receive(self, on_message: Callable[["Connection", dict], Awaitable[None]]) -> None:
+        """Dispatch client messages until it disconnects; pongs only refresh liveness."""
+        try:
+            while True:
+                text = await self.ws.receive_text()
+                self.last_received = time.monotonic()
+                try:
+                    msg = json.loads(text)
+                except ValueError:
+                    continue
+                if not isinstance(msg, dict) or msg.get("action") == "pong":
+                    continue
+                await on_message(self, msg)
+        except WebSocketDisconnect:
+            pass
+
+    async def heartbeat(self) -> None:
+        """Ping a quiet connection; give up on one that stopped answering."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            if now - self.last_received > IDLE_TIMEOUT:
+                raise IdleConnection
+            if now - self.last_sent >= HEARTBEAT_INTERVAL:
+                await self.send_text(PING)
+
+
+Worker = Callable[[Connection], Awaitable[None]]
+
+
+class ConnectionManager:
+    """Live connections, registered and removed in O(1)."""
+
+    def __init__(self):
+        self.active: dict[WebSocket, Connection] = {}
+        self.slow_consumers = 0
+        self.idle_closed = 0
+        self.errors = 0
+
+    async def serve(self, ws: WebSocket,
+                    on_message: Callable[[Connection, dict], Awaitable[None]],
+                    *workers: Worker) -> None:
+        """Run a connection until the client leaves or any of its tasks stops.
+
+        ``on_message`` handles each client message; ``workers`` are the
+        connection's writers. Returns once every task has finished.
+        """
+        await ws.accept()
+        conn = Connection(ws)
+        self.active[ws] = conn
+        tasks = [
+            asyncio.create_task(conn.receive(on_message)),
+            asyncio.create_task(conn.heartbeat()),
+            *(asyncio.create_task(worker(conn)) for worker in workers),
+        ]
+        code = None
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            code = self._close_code(done)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let them unwind; a cancelled serve() still propagates its own cancellation
+            with contextlib.suppress(asyncio.CancelledError):
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.active.pop(ws, None)
+            if code is not None:
+                with contextlib.suppress(Exception):
+                    await ws.close(code)
+
+    def _close_code(self, done: set[asyncio.Task]) -> int | None:
+        """Count why the connection ended; a close code if we're the one closing it."""
+        for task in done:
+            exc = task.exception() if not task.cancelled() else None
+            if isinstance(exc, SlowConsumer):
+                self.slow_consumers += 1
+                return CLOSE_POLICY
+            if isinstance(exc, IdleConnection):
+                self.idle_closed += 1
+                return CLOSE_POLICY
+            if isinstance(exc, WebSocketDisconnect):
+                return None
+            if exc is not None:
+                self.errors += 1
+                return CLOSE_ERROR
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.active),
+            "slow_consumers": self.slow_consumers,
+            "idle_closed": self.idle_closed,
+            "errors": self.errors,
+        }
+
+
+manager = ConnectionManager()
+
+
+def _connections_by_endpoint():
+    counts: dict[str, int] = {}
+    for conn in list(manager.active.values()):
+        counts[conn.endpoint] = counts.get(conn.endpoint, 0) + 1
+    return [({"endpoint": endpoint}, n) for endpoint, n in counts.items()]
+
+
+metrics.Gauge("chartbank_ws_connections", "Open WebSocket connections", ["endpoint"],
+              collect=_connections_by_endpoint)
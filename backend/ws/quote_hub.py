@@ -0,0 +1,261 @@
+"""Shared quote streaming hub.
+
+One poller runs per distinct (market, symbol) no matter how many WebSocket
+clients watch it; every update is fetched and encoded once and the same
+text is handed to each subscriber. A subscriber holds at most one pending
+quote per symbol: a client that falls behind gets the newest price when it
+catches up, never a backlog, so memory stays bounded by its symbol count.
+With several API workers the poll itself is shared too: one worker polls
+each symbol and the others receive its quotes (see ``services.backend``).
+
+Each symbol's poll cadence adapts (see ``Cadence``). While its market
+trades, a symbol whose price keeps moving sharply is polled faster and
+one whose price doesn't move is polled slower. Once the market closes,
+the symbol is polled one last time for the closing price and then not
+again until the session reopens. Quotes carry ``market_state`` ("open"
+or "closed", with ``next_open`` when closed), so clients see which
+symbols are closed.
+"""
+
+import asyncio
+from typing import AsyncIterator, Callable, Tuple, get_args
+
+import orjson
+
+from models.market_data import MarketName
+from services import market_hours, metrics, providers
+from services.backend import Backend, backend, shared_stream
+from services.data_service import get_quote
+from services.governor import background
+
+QuoteKey = Tuple[str, str]  # (market, symbol)
+
+POLL_INTERVAL = 5.0
+
+# Poll interval bounds, as multiples of the hub's base interval
+MIN_FACTOR = 0.25
+MAX_FACTOR = 6.0
+# A poll whose price moved at least this fraction counts as volatile
+VOLATILE_MOVE = 0.001
+BACKOFF = 1.5
+
+# While closed, recheck the session at least this often (the calendar is
+# an approximation; a recheck costs no upstream call)
+CLOSED_RECHECK = 3600.0
+
+SessionFn = Callable[[str, str], market_hours.Session]
+
+MARKETS = frozenset(get_args(MarketName))
+
+
+class InvalidSubscription(ValueError):
+    """A symbol list that isn't ``[{"market", "symbol", "name"?}, ...]``."""
+
+
+def parse_items(items) -> dict[QuoteKey, str]:
+    """``{(market, symbol): name}`` for a client's symbol list, or InvalidSubscription."""
+    if not isinstance(items, list):
+        raise InvalidSubscription("symbols must be a list")
+    wanted: dict[QuoteKey, str] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise InvalidSubscription(f"Expected a symbol object, got {item!r}")
+        market, symbol, name = item.get("market"), item.get("symbol"), item.get("name", "")
+        if market not in MARKETS:
+            raise InvalidSubscription(f"market must be one of {sorted(MARKETS)}, got {market!r}")
+        if not isinstance(symbol, str) or not symbol:
+            raise InvalidSubscription(f"symbol must be a non-empty string, got {symbol!r}")
+        wanted[(market, symbol)] = name if isinstance(name, str) else ""
+    return wanted
+
+
+class Subscriber:
+    """Per-connection latest-value outbox of encoded quotes."""
+
+    def __init__(self):
+        self.pending: dict[QuoteKey, str] = {}
+        self.keys: set[QuoteKey] = set()
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+
+    def offer(self, key: QuoteKey, text: str) -> None:
+        """Set the symbol's pending quote, replacing one not yet sent."""
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = text
+        self._ready.set()
+
+    async def take(self) -> dict[QuoteKey, str]:
+        """Wait for quotes, then return (and clear) everything pending."""
+        while not self.pending:
+            self._ready.clear()
+            await self._ready.wait()
+        pending, self.pending = self.pending, {}
+        return pending
+
+
+def encode_quote(quote: dict) -> str:
+    return orjson.dumps(quote).decode()
+
+
+class Cadence:
+    """Poll interval of one symbol while its market is open.
+
+    Halves after a volatile poll, grows by ``BACKOFF`` after a poll that
+    saw no change, and drifts back toward the base otherwise; always
+    within ``[base * MIN_FACTOR, base * MAX_FACTOR]``.
+    """
+
+    def __init__(self, base: float):
+        self.base = base
+        self.interval = base
+        self._last: float | None = None
+
+    def observe(self, price: float) -> float:
+        last, self._last = self._last, price
+        if last is not None:
+            if price == last:
+                self.interval *= BACKOFF
+            elif last and abs(price - last) / abs(last) >= VOLATILE_MOVE:
+                self.interval /= 2
+            else:
+                self.interval = (self.interval + self.base) / 2
+        self.interval = min(max(self.interval, self.base * MIN_FACTOR), self.base * MAX_FACTOR)
+        return self.interval
+
+    def reset(self) -> None:
+        self.interval = self.base
+        self._last = None
+
+
+class QuoteHub:
+    """Reference-counted symbol subscriptions with one poller per symbol."""
+
+    def __init__(self, fetch: Callable[[str, str, str], dict | None] = get_quote,
+                 interval: float = POLL_INTERVAL, shared: Backend = backend,
+                 session: SessionFn = market_hours.session):
+        self._fetch = fetch
+        self.interval = interval
+        self.session = session
+        self._backend = shared
+        self._subscribers: dict[QuoteKey, set[Subscriber]] = {}
+        self._names: dict[QuoteKey, str] = {}
+        self._pollers: dict[QuoteKey, asyncio.Task] = {}
+        self._latest: dict[QuoteKey, str] = {}
+        self._closed: set[QuoteKey] = set()
+        self.polls = 0
+
+    def update(self, sub: Subscriber, items: list[dict]) -> None:
+        """Replace a subscriber's symbol list, touching only what changed.
+
+        A malformed list raises InvalidSubscription and leaves the
+        subscriptions as they were.
+        """
+        wanted = parse_items(items)
+        for key in sub.keys - wanted.keys():
+            self._unsubscribe(sub, key)
+        for key in wanted.keys() - sub.keys:
+            self._subscribe(sub, key, wanted[key])
+
+    def remove(self, sub: Subscriber) -> None:
+        """Drop every subscription held by a subscriber."""
+        for key in list(sub.keys):
+            self._unsubscribe(sub, key)
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self._pollers),
+            "subscriptions": sum(len(s) for s in self._subscribers.values()),
+            "closed": len(self._closed),
+            "polls": self.polls,
+        }
+
+    def subscriptions(self) -> dict[QuoteKey, int]:
+        """Subscriber count per symbol."""
+        return {key: len(subs) for key, subs in list(self._subscribers.items())}
+
+    def _subscribe(self, sub: Subscriber, key: QuoteKey, name: str) -> None:
+        sub.keys.add(key)
+        self._subscribers.setdefault(key, set()).add(sub)
+        self._names.setdefault(key, name)
+        if key in self._latest:
+            sub.offer(key, self._latest[key])
+        if key not in self._pollers:
+            self._pollers[key] = asyncio.create_task(self._poll(key))
+
+    def _unsubscribe(self, sub: Subscriber, key: QuoteKey) -> None:
+        sub.keys.discard(key)
+        sub.pending.pop(key, None)
+        subs = self._subscribers.get(key)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscribers[key]
+            self._names.pop(key, None)
+            self._latest.pop(key, None)
+            self._closed.discard(key)
+            task = self._pollers.pop(key, None)
+            if task is not None:
+                task.cancel()
+
+    def _publish(self, key: QuoteKey, text: str) -> None:
+        self._latest[key] = text
+        for sub in self._subscribers.get(key, ()):
+            sub.offer(key, text)
+
+    async def _poll(self, key: QuoteKey) -> None:
+        """Publish the symbol's quotes; with several workers only one of them polls."""
+        market, symbol = key
+        quotes = shared_stream(
+            self._backend, f"quote:{market}:{symbol}", lambda: self._fetch_loop(key),
+            lambda text: text.encode(), lambda data: data.decode(),
+        )
+        async for text in quotes:
+            if key in self._subscribers:
+                self._publish(key, text)
+
+    async def _fetch_loop(self, key: QuoteKey) -> AsyncIterator[str]:
+        """Poll at the symbol's cadence while its market is open; once it
+        closes, publish the closing quote and wait for the next open."""
+        market, symbol = key
+        cadence = Cadence(self.interval)
+        settled = False  # polled since the market closed
+        while True:
+            state = self.session(symbol, market)
+            if state.is_open:
+                self._closed.discard(key)
+                settled = False
+            elif settled:
+                self._closed.add(key)
+                until_open = state.seconds_to_change()
+                await asyncio.sleep(CLOSED_RECHECK if until_open is None
+                                    else min(until_open, CLOSED_RECHECK))
+                cadence.reset()
+                continue
+
+            self.polls += 1
+            try:
+                with background():
+                    quote = await providers.run(
+                        market, self._fetch, symbol, self._names.get(key, ""), market
+                    )
+            except Exception:
+                quote = None
+            if quote:
+                if state.is_open:
+                    cadence.observe(quote["price"])
+                    quote = {**quote, "market_state": "open"}
+                else:
+                    settled = True
+                    quote = {**quote, "market_state": "closed", "next_open": state.next_change}
+                yield encode_quote(quote)
+            if not settled:
+                await asyncio.sleep(cadence.interval)
+
+hub = QuoteHub()
+
+metrics.Gauge(
+    "chartbank_quote_subscriptions", "WebSocket quote subscribers per symbol", ["market", "symbol"],
+    collect=lambda: [({"market": m, "symbol": s}, n) for (m, s), n in hub.subscriptions().items()],
+)
@@ -1,53 +1,145 @@
 """WebSocket endpoint for real-time price updates."""
 
-import asyncio
 import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from services.data_service import get_chart_data, get_quotes
+from fastapi import APIRouter, WebSocket
+from pydantic import ValidationError
+from models.market_data import ChartBatchRequest, ChartSpec
+from services import metrics
+from services.chart_batch import chart_batch
+from services.data_service import chart_status, get_chart_data_async, get_chart_window
+from services.governor import UpstreamError
+from services.indicators import InvalidIndicator, dump_indicator, indicator_cache, parse_spec
+from services.resample import InvalidInterval, parse_interval
+from services.serialization import dump_chart
+from ws.chart_feed import ChartSubscriber, chart_hub
+from ws.connections import Connection, manager
+from ws.quote_hub import InvalidSubscription, Subscriber, hub
 
 router = APIRouter()
 
-
-class ConnectionManager:
-    def __init__(self):
-        self.active: list[WebSocket] = []
-
-    async def connect(self, ws: WebSocket):
-        await ws.accept()
-        self.active.append(ws)
-
-    def disconnect(self, ws: WebSocket):
-        self.active.remove(ws)
-
-    async def send_json(self, ws: WebSocket, data: dict):
-        await ws.send_text(json.dumps(data))
-
-
-manager = ConnectionManager()
+# Window fields of a chart request, validated like the chart routes' query
+WINDOW_FIELDS = ("from", "to", "limit", "cursor", "format")
 
 
 @router.websocket("/ws/chart")
 async def chart_ws(ws: WebSocket):
-    """Stream latest candle data for a symbol."""
-    await manager.connect(ws)
-    try:
+    """Chart snapshots plus live candle deltas, multiplexed over one connection.
+
+    Client sends:
+      {"action": "subscribe", "symbol", "market", "interval", ...}
+          -> a "chart" snapshot (unless "snapshot": false), then "bar" messages
+             {"op": "update" | "append", "bar": {...}} as the series moves, or
+             "resync" when deltas were lost and the snapshot must be reloaded
+      {"action": "unsubscribe", "symbol", "market", "interval"}
+      {"symbol", "market", "interval"}  (no action) -> one "chart" snapshot
+      {"action": "batch", "id", "charts": [{"symbol", "market", "interval", ...}]}
+          -> a "chart" (or "error") per distinct spec as each is ready, with
+             "id" and "panels" (its positions in "charts"), then "batch_done"
+    Snapshots accept optional "from"/"to"/"limit"/"cursor" and "format";
+    a malformed request gets an "error" message, and the connection stays.
+    A subscribe may carry "indicators": [{"name": "rsi", "period": 14}, ...];
+    each gets an "indicator" snapshot (op "snapshot", same window as the
+    chart) and then "indicator" messages with the values after every bar.
+    Every message goes out through the connection's bounded queue; the
+    server pings quiet connections and the client answers {"action": "pong"}.
+    """
+    sub = ChartSubscriber()
+
+    async def pump(conn: Connection):
         while True:
-            msg = await ws.receive_text()
-            req = json.loads(msg)
-            symbol = req.get("symbol", "AAPL")
-            market = req.get("market", "stocks")
-            interval = req.get("interval", "1d")
-
-            bars = get_chart_data(symbol, market, interval)
-            await manager.send_json(ws, {
-                "type": "chart",
+            text = await sub.queue.get()
+            metrics.WS_QUEUE_DEPTH.observe(sub.queue.qsize(), endpoint="/ws/chart")
+            await conn.send_text(text)
+
+    async def on_message(conn: Connection, req: dict):
+        action = req.get("action")
+        if action == "batch":
+            await send_batch(req)
+            return
+        symbol = req.get("symbol", "AAPL")
+        market = req.get("market", "stocks")
+        interval = req.get("interval", "1d")
+
+        def error(detail: str, reason: str = "invalid"):
+            sub.offer(json.dumps({
+                "type": "error",
                 "symbol": symbol,
                 "market": market,
                 "interval": interval,
-                "data": [b.model_dump() for b in bars],
+                "detail": detail,
+                "reason": reason,
+            }, default=str))
+
+        try:
+            window = ChartSpec.model_validate({
+                "market": market, "symbol": symbol, "interval": interval,
+                **{k: req[k] for k in WINDOW_FIELDS if k in req},
             })
-    except WebSocketDisconnect:
-        manager.disconnect(ws)
+        except ValidationError as exc:
+            error(str(exc))
+            return
+        key = (market, symbol, interval)
+        start, end, limit = window.from_, window.end, window.limit
+
+        if action == "unsubscribe":
+            chart_hub.unsubscribe(sub, key)
+            return
+
+        try:
+            parse_interval(interval)
+            specs = parse_indicators(req.get("indicators", [])) if action == "subscribe" else []
+            series = []
+            if specs:
+                full = await get_chart_data_async(symbol, market, interval)
+                series = [indicator_cache.synced(key, spec, full) for spec in specs]
+            if action == "subscribe" and req.get("snapshot") is False:
+                chart_hub.subscribe(sub, key, specs)
+                return
+            bars, next_cursor = await get_chart_window(symbol, market, interval, start, end, limit)
+        except (UpstreamError, InvalidInterval, InvalidIndicator) as exc:
+            error(str(exc), getattr(exc, "reason", "invalid"))
+            return
+        # Subscribe only now so no delta is queued ahead of its snapshot
+        if action == "subscribe":
+            chart_hub.subscribe(sub, key, specs)
+        sub.offer(dump_chart(
+            symbol, market, interval, bars, window.format, type="chart", next_cursor=next_cursor,
+            **chart_status(symbol, market, interval),
+        ).decode())
+        for s in series:
+            time, values = s.window(start, end, limit)
+            sub.offer(dump_indicator(
+                key, s, time, values, type="indicator", op="snapshot"
+            ).decode())
+
+    def parse_indicators(items) -> list[tuple[str, tuple]]:
+        if not isinstance(items, list):
+            raise InvalidIndicator("indicators must be a list")
+        specs = []
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("name", ""), str):
+                raise InvalidIndicator(f"Expected an indicator object, got {item!r}")
+            params = {k: v for k, v in item.items() if k != "name"}
+            specs.append(parse_spec(item.get("name", ""), params))
+        return specs
+
+    async def send_batch(req: dict):
+        batch_id = req.get("id")
+        try:
+            specs = ChartBatchRequest.model_validate({"charts": req.get("charts")}).charts
+        except ValidationError as exc:
+            sub.offer(json.dumps({
+                "type": "error", "id": batch_id, "detail": str(exc), "reason": "invalid",
+            }))
+            return
+        async for body in chart_batch(specs, id=batch_id):
+            sub.offer(body.decode())
+        sub.offer(json.dumps({"type": "batch_done", "id": batch_id}))
+
+    try:
+        await manager.serve(ws, on_message, pump)
+    finally:
+        chart_hub.remove(sub)
 
 
 @router.websocket("/ws/quotes")
@@ -55,43 +147,32 @@ async def quotes_ws(ws: WebSocket):
     """Stream real-time quote updates for a list of symbols.
 
     Client sends: {"symbols": [{"symbol":"AAPL","name":"Apple","market":"stocks"}, ...]}
-    Server pushes updated quotes every 5 seconds.
+    Server pushes {"type": "quote_updates", "quotes": [...]} with the quotes
+    that changed since its last send, newest value per symbol only. Polling
+    and encoding are shared across clients through the quote hub. A malformed
+    symbol list gets an "error" message, keeps the previous subscriptions
+    and leaves the connection open.
     """
-    await manager.connect(ws)
-    symbols: list[dict] = []
+    sub = Subscriber()
 
-    async def push_quotes():
-        """Fetch and push quotes in a loop."""
+    async def push_quotes(conn: Connection):
+        """Send whatever has changed since the last send as one frame."""
         while True:
-            if symbols:
-                try:
-                    quotes = await asyncio.to_thread(get_quotes, symbols)
-                    await manager.send_json(ws, {
-                        "type": "quotes",
-                        "quotes": quotes,
-                    })
-                except Exception:
-                    pass
-            await asyncio.sleep(5)
-
-    push_task = asyncio.create_task(push_quotes())
+            pending = await sub.take()
+            metrics.WS_QUEUE_DEPTH.observe(len(pending), endpoint="/ws/quotes")
+            # Quotes arrive pre-encoded; joining them avoids re-serializing per client
+            await conn.send_text(
+                '{"type":"quote_updates","quotes":[' + ",".join(pending.values()) + "]}"
+            )
+
+    async def on_message(conn: Connection, req: dict):
+        if "symbols" in req:
+            try:
+                hub.update(sub, req["symbols"])
+            except InvalidSubscription as exc:
+                await conn.send_text(json.dumps({"type": "error", "detail": str(exc), "reason": "invalid"}))
 
     try:
-        while True:
-            msg = await ws.receive_text()
-            req = json.loads(msg)
-            if "symbols" in req:
-                symbols = req["symbols"]
-                # Send immediately on subscribe
-                if symbols:
-                    try:
-                        quotes = await asyncio.to_thread(get_quotes, symbols)
-                        await manager.send_json(ws, {
-                            "type": "quotes",
-                            "quotes": quotes,
-                        })
-                    except Exception:
-                        pass
-    except WebSocketDisconnect:
-        push_task.cancel()
-        manager.disconnect(ws)
+        await manager.serve(ws, on_message, push_quotes)
+    finally:
+        hub.remove(sub)
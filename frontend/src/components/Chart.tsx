@@ -5,14 +5,27 @@ import { createChart, IChartApi, ISeriesApi, CandlestickData, Time } from "light
 import { OHLCV } from "@/types/market";
 
 interface ChartProps {
+  /** The series, live bars included; a moved or new last bar is drawn in place. */
   data: OHLCV[];
   loading: boolean;
+  /** Called when the user scrolls near the oldest loaded bar. */
+  onLoadOlder?: () => void;
 }
 
-export default function Chart({ data, loading }: ChartProps) {
+/** Request older bars once fewer than this many are left of the view. */
+const LOAD_OLDER_THRESHOLD = 20;
+
+function toCandle(d: OHLCV): CandlestickData {
+  return { time: d.time as Time, open: d.open, high: d.high, low: d.low, close: d.close };
+}
+
+export default function Chart({ data, loading, onLoadOlder }: ChartProps) {
   const containerRef = useRef<HTMLDivElement>(null);
   const chartRef = useRef<IChartApi | null>(null);
   const seriesRef = useRef<ISeriesApi<"Candlestick"> | null>(null);
+  const prevDataRef = useRef<OHLCV[]>([]);
+  const onLoadOlderRef = useRef(onLoadOlder);
+  onLoadOlderRef.current = onLoadOlder;
 
   // Create chart once
   useEffect(() => {
@@ -52,6 +65,10 @@ export default function Chart({ data, loading }: ChartProps) {
     chartRef.current = chart;
     seriesRef.current = series;
 
+    chart.timeScale().subscribeVisibleLogicalRangeChange((range) => {
+      if (range && range.from < LOAD_OLDER_THRESHOLD) onLoadOlderRef.current?.();
+    });
+
     const handleResize = () => {
       if (containerRef.current) {
         chart.applyOptions({
@@ -74,17 +91,34 @@ export default function Chart({ data, loading }: ChartProps) {
   // Update data
   useEffect(() => {
     if (!seriesRef.current || data.length === 0) return;
+    const prev = prevDataRef.current;
+    prevDataRef.current = data;
+    const n = data.length;
+    const prevLast = prev[prev.length - 1];
+
+    // A live delta (the last bar moved, or one opened after it): every bar
+    // before the last is the very object drawn before. A reloaded snapshot
+    // is all new objects and is redrawn whole.
+    const kept = n > 1 && data[0] === prev[0] && data[n - 2] === prev[n - 2];
+    const moved = kept && n === prev.length && data[n - 1].time === prevLast.time;
+    const opened = kept && n === prev.length + 1;
+    if (moved || opened) {
+      seriesRef.current.update(toCandle(data[n - 1]));
+      return;
+    }
 
-    const candleData: CandlestickData[] = data.map((d) => ({
-      time: d.time as Time,
-      open: d.open,
-      high: d.high,
-      low: d.low,
-      close: d.close,
-    }));
+    // Older bars prepended to the same series: keep the user's viewport
+    const added = data.length - prev.length;
+    const isPrepend = prev.length > 0 && added > 0 && data[n - 1].time === prevLast.time;
+    const timeScale = chartRef.current?.timeScale();
+    const range = isPrepend ? timeScale?.getVisibleLogicalRange() : null;
 
-    seriesRef.current.setData(candleData);
-    chartRef.current?.timeScale().fitContent();
+    seriesRef.current.setData(data.map(toCandle));
+    if (range) {
+      timeScale?.setVisibleLogicalRange({ from: range.from + added, to: range.to + added });
+    } else {
+      timeScale?.fitContent();
+    }
   }, [data]);
 
   return (
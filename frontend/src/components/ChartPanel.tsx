@@ -30,7 +30,7 @@ export default function ChartPanel({
   onToggleWatchlist,
 }: Props) {
   const [showToolbar, setShowToolbar] = useState(false);
-  const { data, loading, error } = useMarketData(
+  const { data, loading, error, loadOlder } = useMarketData(
     panel.symbol,
     panel.market,
     panel.interval
@@ -128,7 +128,7 @@ export default function ChartPanel({
       )}
 
       {/* Chart */}
-      <Chart data={data} loading={loading} />
+      <Chart data={data} loading={loading} onLoadOlder={loadOlder} />
     </div>
   );
 }
@@ -4,6 +4,9 @@ import { useState, useEffect, useRef } from "react";
 import { fetchSymbols } from "@/lib/api";
 import { MarketType, SymbolInfo } from "@/types/market";
 
+/** Search is answered from a local server-side index, so keep this short. */
+const SEARCH_DEBOUNCE = 100;
+
 interface Props {
   market: MarketType;
   currentSymbol: string;
@@ -28,18 +31,22 @@ export default function SymbolSearch({ market, currentSymbol, onSelect }: Props)
   }, []);
 
   useEffect(() => {
+    let stale = false;
     const timer = setTimeout(async () => {
       setLoading(true);
       try {
         const res = await fetchSymbols(market, query);
-        setResults(res.results);
+        if (!stale) setResults(res.results);
       } catch {
-        setResults([]);
+        if (!stale) setResults([]);
       } finally {
-        setLoading(false);
+        if (!stale) setLoading(false);
       }
-    }, 300);
-    return () => clearTimeout(timer);
+    }, SEARCH_DEBOUNCE);
+    return () => {
+      stale = true;
+      clearTimeout(timer);
+    };
   }, [query, market]);
 
   return (
@@ -202,6 +202,11 @@ function QuoteRow({
             <span className="text-[9px] px-1 py-0 rounded bg-cb-border text-cb-muted">
               {marketLabel(quote.market)}
             </span>
+            {quote.market_state === "closed" && (
+              <span className="text-[9px] px-1 py-0 rounded bg-cb-border/60 text-cb-muted">
+                時間外
+              </span>
+            )}
           </div>
           <span className="text-[10px] text-cb-muted truncate max-w-full">{quote.name}</span>
         </div>
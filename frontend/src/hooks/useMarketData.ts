@@ -1,9 +1,21 @@
 "use client";
 
-import { useState, useEffect, useCallback } from "react";
-import { fetchChart } from "@/lib/api";
+import { useState, useEffect, useCallback, useRef } from "react";
+import { fetchChart, loadChart } from "@/lib/api";
+import { chartSocket } from "@/lib/chartSocket";
 import { OHLCV, MarketType } from "@/types/market";
 
+/** Bars requested per page: the visible window plus scroll-back margin. */
+const PAGE_SIZE = 500;
+
+/** Fold a live bar into the series: it moves the forming bar or opens a new one. */
+function mergeBar(bars: OHLCV[], bar: OHLCV): OHLCV[] {
+  const last = bars[bars.length - 1];
+  if (!last || bar.time < last.time) return bars; // the next snapshot covers it
+  if (bar.time === last.time) return [...bars.slice(0, -1), bar];
+  return [...bars, bar];
+}
+
 export function useMarketData(
   symbol: string,
   market: MarketType,
@@ -12,12 +24,19 @@ export function useMarketData(
   const [data, setData] = useState<OHLCV[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const cursorRef = useRef<number | null>(null);
+  const loadingOlderRef = useRef(false);
+  const seriesKey = `${market}:${symbol}:${interval}`;
+  const seriesKeyRef = useRef(seriesKey);
+  seriesKeyRef.current = seriesKey;
 
   const load = useCallback(async () => {
     setLoading(true);
     setError(null);
     try {
-      const res = await fetchChart(market, symbol, interval);
+      // Batched with the other panels mounting alongside this one
+      const res = await loadChart(market, symbol, interval, { limit: PAGE_SIZE });
+      cursorRef.current = res.next_cursor ?? null;
       setData(res.data);
     } catch (e: any) {
       setError(e.message ?? "Unknown error");
@@ -26,9 +45,42 @@ export function useMarketData(
     }
   }, [symbol, market, interval]);
 
+  /** Prepend the next page of older bars, if the server has any. */
+  const loadOlder = useCallback(async () => {
+    const cursor = cursorRef.current;
+    if (cursor === null || loadingOlderRef.current) return;
+    loadingOlderRef.current = true;
+    const key = seriesKeyRef.current;
+    try {
+      const res = await fetchChart(market, symbol, interval, { limit: PAGE_SIZE, cursor });
+      if (seriesKeyRef.current !== key) return; // symbol/interval changed meanwhile
+      cursorRef.current = res.next_cursor ?? null;
+      if (res.data.length > 0) setData((prev) => [...res.data, ...prev]);
+    } catch {
+      /* keep what we have; scrolling back again retries */
+    } finally {
+      loadingOlderRef.current = false;
+    }
+  }, [symbol, market, interval]);
+
   useEffect(() => {
+    cursorRef.current = null;
     load();
   }, [load]);
 
-  return { data, loading, error, reload: load };
+  /* Live deltas: the forming bar moves or a new one opens. They go into the
+     same bar list as the pages, so prepending older history keeps them. */
+  useEffect(() => {
+    return chartSocket.subscribe(market, symbol, interval, (push) => {
+      if (push.type === "bar") {
+        setData((prev) => mergeBar(prev, push.bar));
+      } else {
+        // Deltas were lost; start over from a fresh snapshot
+        cursorRef.current = null;
+        load();
+      }
+    });
+  }, [symbol, market, interval, load]);
+
+  return { data, loading, error, reload: load, loadOlder };
 }
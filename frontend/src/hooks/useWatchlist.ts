@@ -15,6 +15,16 @@ function getWsUrl(): string {
 
 const HTTP_REFRESH_INTERVAL = 30_000;
 
+/** Apply pushed quotes to the list, ordered like the watchlist. */
+function mergeQuotes(prev: QuoteData[], updates: QuoteData[], items: WatchlistItem[]): QuoteData[] {
+  const byKey = new Map(prev.map((q) => [`${q.market}|${q.symbol}`, q]));
+  updates.forEach((q) => byKey.set(`${q.market}|${q.symbol}`, q));
+  if (items.length === 0) return Array.from(byKey.values());
+  return items
+    .map((it) => byKey.get(`${it.market}|${it.symbol}`))
+    .filter((q): q is QuoteData => q !== undefined);
+}
+
 /**
  * HTTP-first hook: always loads data via REST immediately,
  * then attempts a WebSocket upgrade for real-time pushes.
@@ -76,8 +86,12 @@ export function useWatchlist(items: WatchlistItem[]) {
       ws.onmessage = (ev) => {
         try {
           const data = JSON.parse(ev.data);
-          if (data.type === "quotes" && Array.isArray(data.quotes)) {
-            setQuotes(data.quotes as QuoteData[]);
+          if (data.type === "ping") {
+            ws.send(JSON.stringify({ action: "pong" }));
+          } else if (data.type === "quote_updates" && Array.isArray(data.quotes)) {
+            // Only the quotes that changed; merge them into the current list
+            const updates = data.quotes as QuoteData[];
+            setQuotes((prev) => mergeQuotes(prev, updates, itemsRef.current));
             setLoading(false);
           }
         } catch {
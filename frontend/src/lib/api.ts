@@ -1,18 +1,140 @@
-import { ChartResponse, MarketType, QuotesResponse, SearchResult, WatchlistItem } from "@/types/market";
+import {
+  ChartColumns,
+  ChartResponse,
+  ColumnarChartResponse,
+  MarketType,
+  OHLCV,
+  QuotesResponse,
+  SearchResult,
+  WatchlistItem,
+} from "@/types/market";
 
 const API_BASE = "/api";
 
+/** Expand a columnar payload into the row-shaped bars the charts consume. */
+function columnsToBars(c: ChartColumns): OHLCV[] {
+  const bars: OHLCV[] = new Array(c.time.length);
+  for (let i = 0; i < c.time.length; i++) {
+    bars[i] = {
+      time: c.time[i],
+      open: c.open[i],
+      high: c.high[i],
+      low: c.low[i],
+      close: c.close[i],
+      volume: c.volume[i],
+    };
+  }
+  return bars;
+}
+
+export interface ChartRangeOptions {
+  /** Oldest bar time (Unix seconds). */
+  from?: number;
+  /** Newest bar time (Unix seconds). */
+  to?: number;
+  /** Keep only the newest N bars of the range. */
+  limit?: number;
+  /** `next_cursor` of a previous page: only bars older than it. */
+  cursor?: number;
+}
+
 export async function fetchChart(
   market: MarketType,
   symbol: string,
-  interval: string = "1d"
+  interval: string = "1d",
+  range: ChartRangeOptions = {}
 ): Promise<ChartResponse> {
   const encoded = encodeURIComponent(symbol);
-  const res = await fetch(
-    `${API_BASE}/${market}/chart/${encoded}?interval=${interval}`
-  );
+  const params = new URLSearchParams({ interval, format: "columnar" });
+  for (const [key, value] of Object.entries(range)) {
+    if (value !== undefined) params.set(key, String(value));
+  }
+  const res = await fetch(`${API_BASE}/${market}/chart/${encoded}?${params}`);
   if (!res.ok) throw new Error(`Failed to fetch chart: ${res.statusText}`);
-  return res.json();
+  return toChartResponse(await res.json());
+}
+
+function toChartResponse(body: ColumnarChartResponse): ChartResponse {
+  return {
+    symbol: body.symbol,
+    market: body.market,
+    interval: body.interval,
+    data: columnsToBars(body.columns),
+    next_cursor: body.next_cursor ?? null,
+    stale: body.stale,
+    reason: body.reason,
+  };
+}
+
+interface PendingChart {
+  spec: Record<string, string | number>;
+  resolve: (res: ChartResponse) => void;
+  reject: (err: Error) => void;
+}
+
+let pendingCharts: PendingChart[] = [];
+
+/**
+ * fetchChart, batched: charts requested in the same tick (a PanelGrid
+ * mounting its panels) go out as one POST /charts/batch. The server loads
+ * them concurrently and streams each back as NDJSON as soon as it is
+ * ready, so every panel resolves on its own.
+ */
+export function loadChart(
+  market: MarketType,
+  symbol: string,
+  interval: string = "1d",
+  range: ChartRangeOptions = {}
+): Promise<ChartResponse> {
+  return new Promise((resolve, reject) => {
+    if (pendingCharts.length === 0) setTimeout(flushCharts, 0);
+    const spec: Record<string, string | number> = { market, symbol, interval, format: "columnar" };
+    for (const [key, value] of Object.entries(range)) {
+      if (value !== undefined) spec[key] = value;
+    }
+    pendingCharts.push({ spec, resolve, reject });
+  });
+}
+
+async function flushCharts(): Promise<void> {
+  const batch = pendingCharts;
+  pendingCharts = [];
+  const settled = new Set<number>();
+  try {
+    const res = await fetch(`${API_BASE}/charts/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ charts: batch.map((p) => p.spec) }),
+    });
+    if (!res.ok || !res.body) throw new Error(`Failed to fetch charts: ${res.statusText}`);
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = "";
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      let newline: number;
+      while ((newline = buffered.indexOf("\n")) >= 0) {
+        const line = JSON.parse(buffered.slice(0, newline));
+        buffered = buffered.slice(newline + 1);
+        for (const i of line.panels as number[]) {
+          settled.add(i);
+          if (line.type === "chart") batch[i].resolve(toChartResponse(line));
+          else batch[i].reject(new Error(`Failed to fetch chart: ${line.detail}`));
+        }
+      }
+    }
+  } catch (e: any) {
+    batch.forEach((p, i) => {
+      if (!settled.has(i)) p.reject(e);
+    });
+    return;
+  }
+  // The stream ended without an answer for these
+  batch.forEach((p, i) => {
+    if (!settled.has(i)) p.reject(new Error("Failed to fetch chart"));
+  });
 }
 
 export async function fetchSymbols(
@@ -0,0 +1,127 @@
+import { OHLCV } from "@/types/market";
+
+/**
+ * A push from /ws/chart: a live candle delta, or "resync" when deltas were
+ * lost and the series must be reloaded.
+ */
+export type ChartPush =
+  | { type: "bar"; op: "update" | "append"; bar: OHLCV }
+  | { type: "resync" };
+
+type Listener = (push: ChartPush) => void;
+
+const RECONNECT_DELAY = 3_000;
+
+function getWsUrl(): string {
+  const apiUrl =
+    typeof window !== "undefined"
+      ? process.env.NEXT_PUBLIC_API_URL || `http://${window.location.hostname}:8000`
+      : "http://localhost:8000";
+  return apiUrl.replace(/^http/, "ws") + "/ws/chart";
+}
+
+/**
+ * One shared /ws/chart connection for every chart panel.
+ *
+ * Panels subscribe per (market, symbol, interval); the socket is opened on
+ * the first subscription, re-subscribes everything after a reconnect and is
+ * closed again when the last panel unsubscribes.
+ */
+class ChartSocket {
+  private ws: WebSocket | null = null;
+  private listeners = new Map<string, Set<Listener>>();
+  private reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+  private opened = false;
+
+  subscribe(market: string, symbol: string, interval: string, listener: Listener): () => void {
+    const key = `${market}|${symbol}|${interval}`;
+    let set = this.listeners.get(key);
+    if (!set) {
+      set = new Set();
+      this.listeners.set(key, set);
+      this.send({ action: "subscribe", market, symbol, interval, snapshot: false });
+    }
+    set.add(listener);
+    this.connect();
+
+    return () => {
+      const cur = this.listeners.get(key);
+      if (!cur) return;
+      cur.delete(listener);
+      if (cur.size > 0) return;
+      this.listeners.delete(key);
+      this.send({ action: "unsubscribe", market, symbol, interval });
+      if (this.listeners.size === 0) this.close();
+    };
+  }
+
+  private connect() {
+    if (this.ws || this.reconnectTimer || typeof window === "undefined") return;
+    try {
+      const ws = new WebSocket(getWsUrl());
+      this.ws = ws;
+
+      ws.onopen = () => {
+        const reconnected = this.opened;
+        this.opened = true;
+        this.listeners.forEach((set, key) => {
+          const [market, symbol, interval] = key.split("|");
+          this.send({ action: "subscribe", market, symbol, interval, snapshot: false });
+          // Bars may have moved while we were away
+          if (reconnected) set.forEach((fn) => fn({ type: "resync" }));
+        });
+      };
+
+      ws.onmessage = (ev) => {
+        try {
+          const msg = JSON.parse(ev.data);
+          if (msg.type === "ping") {
+            this.send({ action: "pong" });
+            return;
+          }
+          if (msg.type !== "bar" && msg.type !== "resync") return;
+          const set = this.listeners.get(`${msg.market}|${msg.symbol}|${msg.interval}`);
+          set?.forEach((fn) => fn(msg as ChartPush));
+        } catch {
+          /* ignore parse errors */
+        }
+      };
+
+      ws.onerror = () => {
+        ws.close();
+      };
+
+      ws.onclose = () => {
+        if (this.ws !== ws) return;
+        this.ws = null;
+        if (this.listeners.size > 0) {
+          this.reconnectTimer = setTimeout(() => {
+            this.reconnectTimer = null;
+            this.connect();
+          }, RECONNECT_DELAY);
+        }
+      };
+    } catch {
+      /* WebSocket unavailable — charts stay on REST data */
+    }
+  }
+
+  private send(msg: object) {
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify(msg));
+    }
+  }
+
+  private close() {
+    if (this.reconnectTimer) {
+      clearTimeout(this.reconnectTimer);
+      this.reconnectTimer = null;
+    }
+    const ws = this.ws;
+    this.ws = null;
+    this.opened = false;
+    ws?.close();
+  }
+}
+
+export const chartSocket = new ChartSocket();
@@ -12,6 +12,33 @@ export interface ChartResponse {
   market: MarketType;
   interval: string;
   data: OHLCV[];
+  /** Pass back as `cursor` to load older bars; null when there are none. */
+  next_cursor?: number | null;
+  /** Set when the upstream failed and the last known bars are served. */
+  stale?: boolean;
+  /** Why: throttled, unavailable, timeout, circuit_open, ... */
+  reason?: string;
+}
+
+/** Columnar chart payload: parallel arrays, one entry per bar. */
+export interface ChartColumns {
+  time: number[];
+  open: number[];
+  high: number[];
+  low: number[];
+  close: number[];
+  volume: number[];
+}
+
+export interface ColumnarChartResponse {
+  symbol: string;
+  market: MarketType;
+  interval: string;
+  format: "columnar";
+  columns: ChartColumns;
+  next_cursor?: number | null;
+  stale?: boolean;
+  reason?: string;
 }
 
 export interface SymbolInfo {
@@ -103,10 +130,21 @@ export interface QuoteData {
   low: number;
   volume: number;
   prev_close: number;
+  /** Live quotes only: whether the market trades now, and when it reopens (Unix s). */
+  market_state?: "open" | "closed";
+  next_open?: number | null;
+}
+
+/** A requested symbol that got no quote, and why. */
+export interface MissingQuote {
+  symbol: string;
+  market: string;
+  reason: string;
 }
 
 export interface QuotesResponse {
   quotes: QuoteData[];
+  missing?: MissingQuote[];
 }
 
 /** Watchlist item that the user can add/remove. */